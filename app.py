@@ -1,8 +1,6 @@
+import importlib
+
 import streamlit as st
-import views.blog
-import views.email
-import views.linkedin_post
-import views.video_script
 
 # 1. Global Page Config (Must be here, only once)
 st.set_page_config(
@@ -17,6 +15,7 @@ st.markdown("""
     .st-key-video_btn button, 
     .st-key-blog_btn button, 
     .st-key-linkedin_btn button,
+    .st-key-ops_btn button,
     [data-testid="stLinkButton"] a{
         width: 100%;
         border-radius: 8px;
@@ -30,6 +29,7 @@ st.markdown("""
     .st-key-video_btn button p, 
     .st-key-blog_btn button p, 
     .st-key-linkedin_btn button p,
+    .st-key-ops_btn button p,
     [data-testid="stLinkButton"] p {
         font-size: 24px !important;  /* Much larger text */
         font-weight: 800 !important; /* Extra Bold */
@@ -54,12 +54,26 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # 3. Navigation State
+# View modules are imported the first time their page is opened, so a cold start
+# (or a visit to Home only) never pays for pandas, document parsers, etc.
+PAGE_MODULES = {
+    'Email': 'views.email',
+    'Blog': 'views.blog',
+    'Video': 'views.video_script',
+    'LinkedIn': 'views.linkedin_post',
+    'Ops': 'views.ops',
+}
+
 if 'current_page' not in st.session_state:
     st.session_state.current_page = 'Home'
 
 def navigate_to(page):
     st.session_state.current_page = page
 
+def load_page(page):
+    # importlib caches in sys.modules, so only the first visit pays the import.
+    return importlib.import_module(PAGE_MODULES[page])
+
 # 4. Home Page
 def page_home():
     st.markdown('<div class="main-header">MARKETING SUITE</div>', unsafe_allow_html=True)
@@ -86,6 +100,8 @@ def page_home():
             url="https://querybot-three.vercel.app/",
             use_container_width=True
         )
+        if st.button("Ops", use_container_width=True, key="ops_btn"):
+            navigate_to("Ops")
 
             
     with col2:
@@ -110,14 +126,8 @@ def page_home():
 def main():
     if st.session_state.current_page == 'Home':
         page_home()
-    elif st.session_state.current_page == 'Email':
-        views.email.show(navigate_to)
-    elif st.session_state.current_page == 'Blog':
-        views.blog.show(navigate_to)
-    elif st.session_state.current_page == 'Video':
-        views.video_script.show(navigate_to)
-    elif st.session_state.current_page == 'LinkedIn':
-        views.linkedin_post.show(navigate_to)
+    elif st.session_state.current_page in PAGE_MODULES:
+        load_page(st.session_state.current_page).show(navigate_to)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""
+Per-endpoint circuit breakers for n8n webhook calls.
+
+After FAILURE_THRESHOLD consecutive failures (connection errors, timeouts,
+5xx/429) an endpoint's breaker opens and webhook.py fails calls to it at once
+with CircuitOpenError instead of letting every request (e.g. every bulk email
+row) wait out its own timeout. After OPEN_SECONDS one half-open probe call is
+let through: success closes the breaker, failure opens it again for twice as
+long (up to MAX_OPEN_SECONDS).
+"""
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+# --- CONFIGURATION ---
+FAILURE_THRESHOLD = 5      # consecutive failed calls that open the breaker
+OPEN_SECONDS = 30          # first cool-down before a half-open probe
+MAX_OPEN_SECONDS = 300
+PROBE_TIMEOUT = 300        # a probe that never reported back (e.g. an interrupted run) is replaced
+
+# States
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+_breakers = {}
+_lock = threading.Lock()
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of calling an endpoint whose breaker is open."""
+
+
+class Breaker:
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.open_seconds = OPEN_SECONDS
+        self.probing = False
+        self.probe_started = 0.0
+        self.rejected = 0
+        self.trips = 0
+        self.last_error = None
+
+
+def endpoint(url):
+    """Host and path the breaker is kept for."""
+    parsed = urlparse(url or "")
+    return f"{parsed.netloc}{parsed.path or '/'}"
+
+
+def _get(url):
+    key = endpoint(url)
+    breaker = _breakers.get(key)
+    if breaker is None:
+        breaker = _breakers[key] = Breaker()
+    return breaker
+
+
+def before_call(url):
+    """
+    Raises CircuitOpenError when the endpoint's breaker is open, or half-open
+    with its probe already in flight; otherwise the call may go ahead.
+    """
+    now = time.monotonic()
+    with _lock:
+        breaker = _get(url)
+        if breaker.state == OPEN and now - breaker.opened_at >= breaker.open_seconds:
+            breaker.state = HALF_OPEN
+        if breaker.state == CLOSED:
+            return
+        if breaker.state == HALF_OPEN and (not breaker.probing or now - breaker.probe_started > PROBE_TIMEOUT):
+            breaker.probing = True
+            breaker.probe_started = now
+            return
+        breaker.rejected += 1
+        retry_in = max(0.0, breaker.open_seconds - (now - breaker.opened_at))
+        error = breaker.last_error
+    raise CircuitOpenError(
+        f"n8n endpoint {endpoint(url)} is failing ({error}); "
+        f"calls paused, retrying in {retry_in:.0f}s."
+    )
+
+
+def record(url, ok, error=None):
+    """Records the outcome of a call let through by before_call()."""
+    with _lock:
+        breaker = _get(url)
+        if ok:
+            breaker.state = CLOSED
+            breaker.failures = 0
+            breaker.open_seconds = OPEN_SECONDS
+            breaker.probing = False
+            return
+        breaker.failures += 1
+        breaker.last_error = error
+        if breaker.state == HALF_OPEN:
+            # The probe failed: back off for longer before the next one.
+            breaker.open_seconds = min(MAX_OPEN_SECONDS, breaker.open_seconds * 2)
+        elif breaker.state != CLOSED or breaker.failures < FAILURE_THRESHOLD:
+            return
+        breaker.state = OPEN
+        breaker.opened_at = time.monotonic()
+        breaker.probing = False
+        breaker.trips += 1
+
+
+def is_failure(status):
+    """True for response statuses that count against an endpoint."""
+    return status == 429 or status >= 500
+
+
+def states():
+    """One dict per endpoint seen so far, for the views."""
+    now = time.monotonic()
+    with _lock:
+        rows = []
+        for key, breaker in sorted(_breakers.items()):
+            state = breaker.state
+            if state == OPEN and now - breaker.opened_at >= breaker.open_seconds:
+                state = HALF_OPEN
+            rows.append({
+                "endpoint": key,
+                "state": state,
+                "failures": breaker.failures,
+                "trips": breaker.trips,
+                "rejected": breaker.rejected,
+                "retry_in": max(0.0, breaker.open_seconds - (now - breaker.opened_at)) if state == OPEN else None,
+                "last_error": breaker.last_error,
+            })
+        return rows
+
+
+def describe(url):
+    """Warning text for a view whose endpoint is not healthy ("" while closed)."""
+    row = next((row for row in states() if row["endpoint"] == endpoint(url)), None)
+    if row is None or row["state"] == CLOSED:
+        return ""
+    if row["state"] == OPEN:
+        return (f"n8n is failing ({row['last_error']}): calls are paused for another "
+                f"{row['retry_in']:.0f}s so they fail fast instead of timing out.")
+    return f"n8n was failing ({row['last_error']}): the next call checks whether it has recovered."
+
+
+def reset(url=None):
+    """Closes one endpoint's breaker, or all of them."""
+    with _lock:
+        if url is None:
+            _breakers.clear()
+        else:
+            _breakers.pop(endpoint(url), None)
@@ -0,0 +1,350 @@
+"""
+Bulk email generation engine.
+
+Kept free of Streamlit so it can run on a background worker thread
+(see services/jobs.py); progress and cancellation go through the
+`on_progress` callback and `cancel_event` instead of UI calls.
+"""
+import json
+import math
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from services import context_handles, job_store, leads
+from services.llm_parse import parse_llm_response
+
+
+def lead_fields(row):
+    return {
+        "first_name": row.get('first_name', ''),
+        "last_name": row.get('last_name', ''),
+        "email": row.get('email', ''),
+        "org_name": row.get('org_name', ''),
+    }
+
+
+def to_email_content(data):
+    """Returns (subject, body) from one n8n email result."""
+    # Handle list wrapper
+    if isinstance(data, list):
+        data = data[0] if data else {}
+    # Check if data itself is the dict we want
+    if isinstance(data, dict) and "subject" in data and "body" in data:
+        clean_data = data
+    else:
+        # If nested inside 'output' or 'text'
+        raw_text = data.get("output", data.get("text", str(data)))
+        # Try to parse this inner text immediately
+        clean_data = parse_llm_response(raw_text)
+
+    # Normalize keys
+    clean_data = {k.lower(): v for k, v in clean_data.items()}
+
+    subject = str(clean_data.get("subject", "") or "")
+    body = str(clean_data.get("body", clean_data.get("text", "")) or "")
+    # Bodies that still contain escaped newlines are fixed once here, not on every view
+    return subject, body.replace("\\n", "\n")
+
+
+def generate_single_email(row, common_params, url, use_context_handles=False):
+    """Returns (subject, body, error); error is "" on success."""
+    payload = {
+        "action": "generate",
+        **lead_fields(row),
+        **common_params
+    }
+    return _request_email(payload, url, use_context_handles)
+
+
+def _request_email(payload, url, use_context_handles):
+    try:
+        response = context_handles.post(url, payload, enabled=use_context_handles)
+        if response.status_code == 200:
+            return (*to_email_content(response.json()), "")
+
+        return "", "", f"Generation failed: HTTP {response.status_code}"
+    except Exception as e:
+        return "", "", f"Connection error: {e}"
+
+
+def generate_rows(rows, common_params, url, use_context_handles=False):
+    """
+    Generates each (index, row) pair with its own webhook call.
+    Returns {df index: (subject, body, error)}.
+    """
+    return {index: generate_single_email(row, common_params, url, use_context_handles) for index, row in rows}
+
+
+def generate_batch(rows, common_params, url, use_context_handles=False):
+    """
+    Generates a chunk of leads in one webhook call. The shared params are sent
+    once and each lead carries its position in the chunk as "index"; n8n answers
+    with an array of {"index", "subject", "body"} (or {"index", "error"}).
+    Returns {df index: (subject, body, "")} for the leads that came back usable.
+    """
+    payload = {
+        "action": "generate_batch",
+        "leads": [{"index": position, **lead_fields(row)} for position, (_, row) in enumerate(rows)],
+        **common_params
+    }
+    try:
+        response = context_handles.post(url, payload, enabled=use_context_handles)
+        if response.status_code != 200:
+            return {}
+        data = response.json()
+    except Exception:
+        return {}
+
+    # Accept a bare array or one wrapped in "results"/"output" (possibly as a JSON string),
+    # itself possibly inside n8n's one-item list
+    if isinstance(data, list) and len(data) == 1 and isinstance(data[0], dict) and "index" not in data[0]:
+        data = data[0]
+    if isinstance(data, dict):
+        data = data.get("results", data.get("output", []))
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except ValueError:
+            return {}
+    if not isinstance(data, list):
+        return {}
+
+    results = {}
+    for item in data:
+        if not isinstance(item, dict) or item.get("error"):
+            continue
+        try:
+            position = int(item.get("index"))
+        except (TypeError, ValueError):
+            continue
+        if 0 <= position < len(rows):
+            results[rows[position][0]] = (*to_email_content(item), "")
+    return results
+
+
+def generate_bulk_emails(df, common_params, url, max_workers=8, batch_size=1, job_id=None,
+                         use_context_handles=False, on_progress=None, cancel_event=None):
+    """
+    Generates one email per lead with up to `max_workers` webhook calls in flight
+    and returns `df` with the Subject/Body/Status/Error columns filled in.
+
+    With `batch_size` > 1, leads go out in chunks of that size per call and any
+    lead missing or failed in a batch response is retried with its own call.
+    With a `job_id`, every successful row is checkpointed to the job store and
+    rows already checkpointed by an earlier (interrupted) run are not regenerated.
+    `on_progress(completed, total)` is called as rows finish; setting
+    `cancel_event` drops pending rows and returns early.
+    """
+    total_rows = len(df)
+    # Results are collected per column by row position and assigned in one go at the end.
+    subjects = [""] * total_rows
+    bodies = [""] * total_rows
+    statuses = [leads.DRAFT] * total_rows
+    errors = [""] * total_rows
+
+    # Register the shared reference content once, before workers race to do it.
+    if use_context_handles:
+        context_handles.prepare(url, common_params)
+
+    rows = list(df.iterrows())
+    positions = {index: position for position, (index, _) in enumerate(rows)}
+    batch_size = max(1, int(batch_size))
+
+    # Resume: take checkpointed rows from the store and only generate the rest.
+    done = {}
+    if job_id:
+        job_store.open_job(job_id, total_rows)
+        done = job_store.completed_rows(job_id)
+        for position, (subject, body) in done.items():
+            if position < total_rows:
+                subjects[position], bodies[position] = subject, body
+        rows = [item for position, item in enumerate(rows) if position not in done]
+
+    completed = total_rows - len(rows)
+    if on_progress:
+        on_progress(completed, total_rows)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)))
+    try:
+        if batch_size > 1:
+            chunks = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+            futures = {
+                executor.submit(generate_batch, chunk, common_params, url, use_context_handles): chunk
+                for chunk in chunks
+            }
+        else:
+            futures = {
+                executor.submit(generate_rows, [item], common_params, url, use_context_handles): [item]
+                for item in rows
+            }
+
+        pending = set(futures)
+        while pending:
+            # Wake up periodically so a cancel request is noticed between completions.
+            done_futures, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            checkpoint = []
+            for future in done_futures:
+                chunk = futures.pop(future)
+                results = future.result()
+                for index, row in chunk:
+                    if index in results:
+                        position = positions[index]
+                        subject, body, error = results[index]
+                        subjects[position], bodies[position], errors[position] = subject, body, error
+                        if error:
+                            statuses[position] = leads.FAILED
+                        else:
+                            checkpoint.append((position, subject, body))
+                        completed += 1
+                    else:
+                        # Fall back to a per-row call for leads the batch did not return.
+                        retry = executor.submit(generate_rows, [(index, row)], common_params, url, use_context_handles)
+                        futures[retry] = [(index, row)]
+                        pending.add(retry)
+            if job_id and checkpoint:
+                job_store.save_rows(job_id, checkpoint)
+            if on_progress and done_futures:
+                on_progress(completed, total_rows)
+    finally:
+        # On cancel, queued rows never start; calls already in flight finish in the
+        # background and their results are dropped.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return leads.with_emails(df, subjects, bodies, statuses, errors)
+
+
+# --- TEMPLATE MODE ---
+# Leads only differ by name/email within an organisation, so one template per
+# organisation is generated with placeholders and personalised locally.
+PLACEHOLDER_FIELDS = ["first_name", "last_name", "email", "org_name"]
+_PLACEHOLDER = re.compile(r"\{\{\s*(" + "|".join(PLACEHOLDER_FIELDS) + r")\s*\}\}", re.IGNORECASE)
+
+
+def compile_template(text):
+    """Splits `text` once into (literal, field) pieces for render_template()."""
+    pieces, position = [], 0
+    for match in _PLACEHOLDER.finditer(text):
+        pieces.append((text[position:match.start()], match.group(1).lower()))
+        position = match.end()
+    pieces.append((text[position:], None))
+    return pieces
+
+
+def render_template(pieces, fields):
+    return "".join(literal + ((fields.get(field) or "") if field else "") for literal, field in pieces)
+
+
+def segment_key(org_name):
+    return " ".join(str(org_name or "").split()).casefold()
+
+
+def generate_template(org_name, common_params, url, use_context_handles=False):
+    """
+    Generates one email for an organisation with {{first_name}}-style
+    placeholders in place of the per-lead fields.
+    Returns (subject, body, error, seconds taken).
+    """
+    payload = {
+        "action": "generate_template",
+        **{field: "{{" + field + "}}" for field in PLACEHOLDER_FIELDS},
+        "org_name": org_name,
+        "placeholders": PLACEHOLDER_FIELDS,
+        **common_params
+    }
+    started = time.monotonic()
+    subject, body, error = _request_email(payload, url, use_context_handles)
+    return subject, body, error, time.monotonic() - started
+
+
+def generate_template_emails(df, common_params, url, max_workers=8, job_id=None,
+                             use_context_handles=False, on_progress=None, cancel_event=None):
+    """
+    Template mode of generate_bulk_emails(): one webhook call per organisation,
+    personalised per lead with render_template().
+
+    Returns (df, report) where report compares the webhook calls and wall-clock
+    time against one call per lead (estimated from the measured call latency).
+    """
+    started = time.monotonic()
+    total_rows = len(df)
+    columns = {
+        field: [value if isinstance(value, str) else "" for value in df[field].tolist()]
+        if field in df.columns else [""] * total_rows
+        for field in PLACEHOLDER_FIELDS
+    }
+    subjects = [""] * total_rows
+    bodies = [""] * total_rows
+    statuses = [leads.DRAFT] * total_rows
+    errors = [""] * total_rows
+
+    if use_context_handles:
+        context_handles.prepare(url, common_params)
+
+    done = {}
+    if job_id:
+        job_store.open_job(job_id, total_rows)
+        done = job_store.completed_rows(job_id)
+        for position, (subject, body) in done.items():
+            if position < total_rows:
+                subjects[position], bodies[position] = subject, body
+
+    # Group the remaining rows by organisation; the first spelling seen is sent.
+    segments = {}
+    for position, org_name in enumerate(columns["org_name"]):
+        if position not in done:
+            segments.setdefault(segment_key(org_name), (org_name, []))[1].append(position)
+
+    completed = total_rows - sum(len(positions) for _, positions in segments.values())
+    if on_progress:
+        on_progress(completed, total_rows)
+
+    latencies = []
+    executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)))
+    try:
+        futures = {
+            executor.submit(generate_template, org_name, common_params, url, use_context_handles): positions
+            for org_name, positions in segments.values()
+        }
+        pending = set(futures)
+        while pending:
+            done_futures, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            checkpoint = []
+            for future in done_futures:
+                positions = futures.pop(future)
+                subject, body, error, seconds = future.result()
+                latencies.append(seconds)
+                if error:
+                    for position in positions:
+                        statuses[position], errors[position] = leads.FAILED, error
+                else:
+                    subject_pieces, body_pieces = compile_template(subject), compile_template(body)
+                    for position in positions:
+                        fields = {field: values[position] for field, values in columns.items()}
+                        subjects[position] = render_template(subject_pieces, fields)
+                        bodies[position] = render_template(body_pieces, fields)
+                        checkpoint.append((position, subjects[position], bodies[position]))
+                completed += len(positions)
+            if job_id and checkpoint:
+                job_store.save_rows(job_id, checkpoint)
+            if on_progress and done_futures:
+                on_progress(completed, total_rows)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    generated = sum(len(positions) for _, positions in segments.values())
+    elapsed = time.monotonic() - started
+    mean_latency = sum(latencies) / len(latencies) if latencies else 0.0
+    report = {
+        "leads": generated,
+        "webhook_calls": len(latencies),
+        "per_row_calls": generated,
+        "elapsed": elapsed,
+        # Same worker count, one call per lead, at the latency measured here.
+        "per_row_elapsed": math.ceil(generated / max(1, int(max_workers))) * mean_latency,
+    }
+    return leads.with_emails(df, subjects, bodies, statuses, errors), report
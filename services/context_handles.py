@@ -0,0 +1,118 @@
+"""
+Upload-once handles for large context fields in webhook payloads.
+
+Refining a blog or email used to re-send the whole extracted reference
+documents (often several MB) with every call. With handles, each large field is
+registered with the webhook once under its SHA-256:
+
+    {"action": "register_context", "handle": "<sha256>", "content": "<text>"}
+
+and later payloads carry `<field>_handle: "<sha256>"` in place of the text.
+Only fields that stay the same across calls are worth a handle: the output
+being refined changes on every refine, so it is always sent inline.
+If the webhook answers 409 with {"error": "unknown_context"} (e.g. its store
+was reset), the handles are registered again and the call is retried once.
+Request bodies are gzip-compressed on the wire.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from services import webhook
+
+# --- CONFIGURATION ---
+HANDLE_FIELDS = ("reference_file_content",)
+HANDLE_MIN_CHARS = 4 * 1024   # smaller fields are cheaper to just send inline
+UNKNOWN_HANDLE_STATUS = 409
+HASH_CACHE_SIZE = 4           # recent strings whose hash is remembered
+
+_registered = set()   # (url, handle) pairs the webhook is known to hold
+_registered_lock = threading.Lock()
+_hashes = OrderedDict()   # id(text) -> (text, sha256), most recent last
+_hashes_lock = threading.Lock()
+
+
+def content_hash(text):
+    # Per-row calls in bulk runs pass the same context string object, so its
+    # hash is remembered by identity for the last few strings only.
+    with _hashes_lock:
+        entry = _hashes.get(id(text))
+        if entry is not None and entry[0] is text:
+            _hashes.move_to_end(id(text))
+            return entry[1]
+    handle = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    with _hashes_lock:
+        _hashes[id(text)] = (text, handle)
+        _hashes.move_to_end(id(text))
+        while len(_hashes) > HASH_CACHE_SIZE:
+            _hashes.popitem(last=False)
+    return handle
+
+
+def register(url, text):
+    """Uploads `text` once per webhook URL and returns its handle."""
+    handle = content_hash(text)
+    with _registered_lock:
+        if (url, handle) in _registered:
+            return handle
+    response = webhook.post(
+        url, {"action": "register_context", "handle": handle, "content": text}, compress=True
+    )
+    response.raise_for_status()
+    with _registered_lock:
+        _registered.add((url, handle))
+    return handle
+
+
+def forget(url):
+    with _registered_lock:
+        _registered.difference_update({key for key in _registered if key[0] == url})
+
+
+def prepare(url, payload):
+    """Returns a copy of `payload` with large HANDLE_FIELDS replaced by handles."""
+    compact = dict(payload)
+    for field in HANDLE_FIELDS:
+        text = compact.get(field)
+        if isinstance(text, str) and len(text) >= HANDLE_MIN_CHARS:
+            compact[f"{field}_handle"] = register(url, compact.pop(field))
+    return compact
+
+
+def _is_unknown_handle(response):
+    if response.status_code != UNKNOWN_HANDLE_STATUS:
+        return False
+    try:
+        return response.json().get("error") == "unknown_context"
+    except ValueError:
+        return False
+
+
+def post(url, payload, enabled=True, **kwargs):
+    """Drop-in for webhook.post() that sends large context fields as handles."""
+    if not enabled:
+        return webhook.post(url, payload, **kwargs)
+    response = webhook.post(url, prepare(url, payload), compress=True, **kwargs)
+    if _is_unknown_handle(response):
+        forget(url)
+        response = webhook.post(url, prepare(url, payload), compress=True, **kwargs)
+    return response
+
+
+def stream_text(url, payload, enabled=True, **kwargs):
+    """Drop-in for webhook.stream_text() that sends large context fields as handles."""
+    if not enabled:
+        yield from webhook.stream_text(url, payload, **kwargs)
+        return
+    try:
+        chunks = webhook.stream_text(url, prepare(url, payload), compress=True, **kwargs)
+        first = next(chunks, None)
+    except webhook.WebhookHTTPError as e:
+        if not _is_unknown_handle(e.response):
+            raise
+        forget(url)
+        chunks = webhook.stream_text(url, prepare(url, payload), compress=True, **kwargs)
+        first = next(chunks, None)
+    if first is not None:
+        yield first
+        yield from chunks
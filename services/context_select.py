@@ -0,0 +1,204 @@
+"""
+Query-relevant selection of reference context.
+
+The combined reference text (uploaded files and fetched pages, each under a
+"--- Content from ... ---" header) is split into paragraph-packed chunks,
+repeated boilerplate paragraphs (footers, cookie banners, disclaimers) are
+dropped after their first occurrence, and the chunks are ranked with BM25
+against the topic/keywords. The best chunks that fit the character budget are
+sent, in their original order and under their original headers.
+"""
+import hashlib
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+
+# --- CONFIGURATION ---
+DEFAULT_BUDGET_CHARS = 24_000
+CHUNK_CHARS = 1_200
+BM25_K1 = 1.5
+BM25_B = 0.75
+MEMO_SIZE = 16                 # recent selections remembered, since every rerun repeats the same one
+MEMO_MAX_CHARS = 4 * DEFAULT_BUDGET_CHARS
+
+_HEADER = re.compile(r"^--- Content from (.+?) ---$", re.MULTILINE)
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_TOKEN = re.compile(r"[^\W_]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "you your we our they their".split()
+)
+
+# (sha256 of text, query, budget) -> (context or None for "the whole text", report), oldest first.
+# Keyed by hash so the multi-MB reference text itself is not kept alive.
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def tokens(text):
+    return [token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def _documents(text):
+    # [(source, body)] split on the extraction/url_fetch headers.
+    matches = list(_HEADER.finditer(text))
+    if not matches:
+        return [("", text)]
+    documents = []
+    if text[:matches[0].start()].strip():
+        documents.append(("", text[:matches[0].start()]))
+    for position, match in enumerate(matches):
+        end = matches[position + 1].start() if position + 1 < len(matches) else len(text)
+        documents.append((match.group(1), text[match.end():end]))
+    return documents
+
+
+def _pieces(paragraph):
+    # Paragraphs longer than a chunk are cut at sentence ends (hard cut as a last resort).
+    if len(paragraph) <= CHUNK_CHARS:
+        return [paragraph]
+    pieces, current = [], ""
+    for sentence in _SENTENCE_END.split(paragraph):
+        while len(sentence) > CHUNK_CHARS:
+            pieces.append(sentence[:CHUNK_CHARS])
+            sentence = sentence[CHUNK_CHARS:]
+        if current and len(current) + len(sentence) + 1 > CHUNK_CHARS:
+            pieces.append(current)
+            current = ""
+        current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_context(text):
+    """
+    Returns (chunks, duplicates_removed) where chunks are (source, text) in
+    document order, each at most about CHUNK_CHARS long.
+    """
+    chunks, seen, duplicates = [], set(), 0
+    for source, body in _documents(text):
+        current = ""
+        for paragraph in _PARAGRAPH_BREAK.split(body):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            fingerprint = " ".join(paragraph.lower().split())
+            if fingerprint in seen:
+                duplicates += 1
+                continue
+            seen.add(fingerprint)
+            for piece in _pieces(paragraph):
+                if current and len(current) + len(piece) + 2 > CHUNK_CHARS:
+                    chunks.append((source, current))
+                    current = ""
+                current = f"{current}\n\n{piece}" if current else piece
+        if current:
+            chunks.append((source, current))
+    return chunks, duplicates
+
+
+def bm25_scores(chunk_tokens, query_tokens):
+    """BM25 score of every tokenized chunk for the query terms."""
+    if not chunk_tokens:
+        return []
+    count = len(chunk_tokens)
+    average_length = sum(len(chunk) for chunk in chunk_tokens) / count or 1
+    frequencies = [Counter(chunk) for chunk in chunk_tokens]
+    terms = set(query_tokens)
+    document_frequency = {term: sum(1 for frequency in frequencies if term in frequency) for term in terms}
+    idf = {
+        term: math.log(1 + (count - df + 0.5) / (df + 0.5))
+        for term, df in document_frequency.items()
+    }
+    scores = []
+    for chunk, frequency in zip(chunk_tokens, frequencies):
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * len(chunk) / average_length)
+        scores.append(sum(
+            idf[term] * frequency[term] * (BM25_K1 + 1) / (frequency[term] + norm)
+            for term in terms if frequency[term]
+        ))
+    return scores
+
+
+def select_context(text, query, budget_chars=DEFAULT_BUDGET_CHARS):
+    """
+    Returns (context, report) with the chunks of `text` most relevant to
+    `query` that fit in `budget_chars`. A falsy budget only removes duplicate
+    boilerplate. The report has original/selected chars and chunk counts.
+    """
+    text = text or ""
+    key = (hashlib.sha256(text.encode("utf-8")).hexdigest(), query, budget_chars)
+    with _memo_lock:
+        entry = _memo.get(key)
+        if entry is not None:
+            _memo.move_to_end(key)
+    if entry is None:
+        context, report = _select(text, query, budget_chars)
+        entry = (None if context is text else context, report)
+        if entry[0] is None or len(entry[0]) <= MEMO_MAX_CHARS:
+            with _memo_lock:
+                _memo[key] = entry
+                while len(_memo) > MEMO_SIZE:
+                    _memo.popitem(last=False)
+    context, report = entry
+    # The views keep the report in session state; each gets its own copy.
+    return (text if context is None else context), dict(report)
+
+
+def _select(text, query, budget_chars):
+    chunks, duplicates = chunk_context(text)
+    if budget_chars:
+        query_tokens = tokens(query or "")
+        scores = bm25_scores([tokens(chunk) for _, chunk in chunks], query_tokens)
+        # Best score first; ties (and an empty query) keep document order.
+        ranked = sorted(range(len(chunks)), key=lambda position: (-scores[position], position))
+        chosen, used = set(), 0
+        for position in ranked:
+            size = len(chunks[position][1]) + 2
+            if used + size > budget_chars:
+                continue
+            chosen.add(position)
+            used += size
+    else:
+        chosen = set(range(len(chunks)))
+
+    parts, current_source = [], None
+    for position, (source, chunk) in enumerate(chunks):
+        if position not in chosen:
+            continue
+        if source != current_source:
+            if parts:
+                parts.append("\n")
+            if source:
+                parts.append(f"--- Content from {source} ---\n")
+            current_source = source
+        parts.append(f"{chunk}\n\n")
+    context = "".join(parts)
+    if len(context) >= len(text):
+        # Nothing was left out; send the text as it came.
+        context = text
+
+    original = len(text)
+    report = {
+        "original_chars": original,
+        "selected_chars": len(context),
+        "chunks": len(chunks),
+        "selected_chunks": len(chosen),
+        "duplicates_removed": duplicates,
+        "reduction": 1 - len(context) / original if original else 0.0,
+    }
+    return context, report
+
+
+def describe(report):
+    """One-line summary of a select_context() report for the views."""
+    if not report or not report["original_chars"]:
+        return ""
+    return (
+        f"Reference context: {report['original_chars'] / 1024:,.1f} KB → {report['selected_chars'] / 1024:,.1f} KB "
+        f"({report['reduction']:.0%} smaller) · {report['selected_chunks']:,}/{report['chunks']:,} chunks · "
+        f"{report['duplicates_removed']} repeated paragraphs dropped"
+    )
@@ -0,0 +1,89 @@
+"""
+Rate-limited, concurrent delivery of approved emails through the n8n send
+webhook.
+
+Each email carries an idempotency key (hash of the lead list it belongs to,
+recipient, subject and body), sent both as an `Idempotency-Key` header and in
+the payload. Delivered keys are logged in the job store, so a retried send of
+the same list skips emails that already went out; the log is pruned after
+job_store.SENT_TTL, and another list never matches it.
+"""
+import hashlib
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from services import job_store, webhook
+from services.leads import FAILED, SENT
+from services.rate_limit import TokenBucket
+
+
+def idempotency_key(scope, email, subject, body):
+    return hashlib.sha256(f"{scope}\n{email}\n{subject}\n{body}".encode("utf-8")).hexdigest()
+
+
+def send_one(url, email, subject, body, bucket, cancel_event=None, scope=""):
+    """Returns (status, error reason) for one email."""
+    key = idempotency_key(scope, email, subject, body)
+    if job_store.was_sent(key):
+        return SENT, ""
+    if not bucket.acquire(cancel_event):
+        return None, "Cancelled"
+
+    payload = {"email": email, "subject": subject, "body": body, "idempotency_key": key}
+    try:
+        # Not retried automatically: n8n may have sent it even if the reply got lost.
+        response = webhook.post(url, payload, idempotent=False, headers={"Idempotency-Key": key}, action="send")
+    except Exception as e:
+        return FAILED, f"Connection error: {e}"
+    if not 200 <= response.status_code < 300:
+        return FAILED, f"HTTP {response.status_code}: {response.text[:200]}"
+
+    job_store.mark_sent(key, email)
+    return SENT, ""
+
+
+def send_emails(url, messages, per_minute=60, max_workers=4, on_progress=None, cancel_event=None, scope=""):
+    """
+    Sends `messages` — a list of (row index, email, subject, body) — with at most
+    `max_workers` calls in flight and `per_minute` calls per minute overall.
+    `scope` identifies the lead list, so only its own earlier sends are skipped.
+
+    Returns a summary dict: {"results": {index: (status, error)}, "sent",
+    "failed", "elapsed", "rate"}. Rows not attempted because of a cancel are
+    left out of "results".
+    """
+    job_store.prune_sent()
+    # The first burst must stay within the per-minute limit too (1/min with 4 workers is 1 email, not 4).
+    bucket = TokenBucket(rate=per_minute / 60.0, capacity=max(1, min(max_workers, per_minute)))
+    results = {}
+    started = time.perf_counter()
+
+    executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)))
+    try:
+        futures = {
+            executor.submit(send_one, url, email, subject, body, bucket, cancel_event, scope): index
+            for index, email, subject, body in messages
+        }
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                status, error = future.result()
+                if status is not None:
+                    results[futures[future]] = (status, error)
+            if on_progress and done:
+                on_progress(len(results), len(messages))
+            if cancel_event is not None and cancel_event.is_set():
+                break
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    sent = sum(1 for status, _ in results.values() if status == SENT)
+    return {
+        "results": results,
+        "sent": sent,
+        "failed": len(results) - sent,
+        "elapsed": elapsed,
+        "rate": len(results) / elapsed if elapsed > 0 else 0.0,
+    }
@@ -0,0 +1,248 @@
+"""
+Text extraction for uploaded reference documents (TXT, PDF, DOCX, PPTX).
+
+Streamlit re-runs the whole page script on every widget interaction, so the
+same uploads are extracted over and over. Results are kept in a process-wide
+LRU cache keyed by a hash of the file bytes, bounded by CACHE_MAX_BYTES.
+
+Parser libraries (PyPDF2, python-docx, python-pptx) are imported only when a
+file of that type is actually extracted, keeping them out of app start-up.
+
+Large PDFs and decks are split into page ranges that are extracted on a
+process pool; workers read the file from a temp path and parse it once, and
+page text is streamed back in document order and joined once.
+"""
+import hashlib
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+
+# --- CONFIGURATION ---
+CACHE_MAX_BYTES = 64 * 1024 * 1024   # memory budget for cached extracted text
+PARALLEL_MIN_PAGES = 40              # smaller documents are extracted in-process
+PAGES_PER_TASK = 16                  # page range handed to one pool worker
+MAX_PROCESSES = max(1, min(8, (os.cpu_count() or 2) - 1))
+
+_cache = OrderedDict()   # (extension, sha256) -> extracted text, oldest first
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _extension(name):
+    return name.lower().rsplit(".", 1)[-1] if "." in name else ""
+
+
+# --- PAGE EXTRACTION (these run inside pool workers, keep them top-level) ---
+_worker_document = (None, None)   # ((extension, path), pages) last parsed in this worker
+
+
+def _slide_text(slide):
+    return "".join(shape.text + "\n" for shape in slide.shapes if hasattr(shape, "text"))
+
+
+def _load_pages(extension, data):
+    if extension == "pdf":
+        from PyPDF2 import PdfReader  # type: ignore
+        return PdfReader(BytesIO(data)).pages
+    from pptx import Presentation  # type: ignore
+    return list(Presentation(BytesIO(data)).slides)
+
+
+def _page_text(extension, page):
+    return (page.extract_text() or "") if extension == "pdf" else _slide_text(page)
+
+
+def _page_range(extension, path, start, stop):
+    # Workers get the path of a temp file instead of the bytes, and keep the
+    # parsed document, so each worker reads and parses a file once, not per range.
+    global _worker_document
+    if _worker_document[0] != (extension, path):
+        _worker_document = (None, None)
+        with open(path, "rb") as f:
+            _worker_document = ((extension, path), _load_pages(extension, f.read()))
+    pages = _worker_document[1]
+    return [_page_text(extension, pages[i]) for i in range(start, stop)]
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # "spawn" because forking the multi-threaded Streamlit server is unsafe.
+                _pool = ProcessPoolExecutor(
+                    max_workers=MAX_PROCESSES,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+
+def _iter_parallel(extension, data, pages):
+    total = len(pages)
+    ranges = [(start, min(start + PAGES_PER_TASK, total)) for start in range(0, total, PAGES_PER_TASK)]
+    path = None
+    try:
+        with tempfile.NamedTemporaryFile(suffix=f".{extension}", delete=False) as f:
+            f.write(data)
+            path = f.name
+        futures = [_get_pool().submit(_page_range, extension, path, start, stop) for start, stop in ranges]
+    except Exception:
+        futures = [None] * len(ranges)
+
+    try:
+        for future, (start, stop) in zip(futures, ranges):
+            try:
+                texts = future.result()
+            except Exception as e:
+                # Pool unavailable or broken: do this range in-process instead.
+                if isinstance(e, BrokenProcessPool):
+                    _reset_pool()
+                texts = [_page_text(extension, pages[i]) for i in range(start, stop)]
+            for offset, text in enumerate(texts, start=1):
+                yield start + offset, total, text
+    finally:
+        for future in futures:
+            if future is not None:
+                future.cancel()
+        if path is not None:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def _iter_pages(extension, data):
+    """Yields (pages_done, pages_total, text) for each page/slide in document order."""
+    if extension in ("pdf", "pptx"):
+        pages = _load_pages(extension, data)
+        total = len(pages)
+        if total >= PARALLEL_MIN_PAGES and MAX_PROCESSES > 1:
+            yield from _iter_parallel(extension, data, pages)
+        else:
+            for done, page in enumerate(pages, start=1):
+                yield done, total, _page_text(extension, page)
+    elif extension == "docx":
+        from docx import Document as DocxDocument  # type: ignore
+        doc = DocxDocument(BytesIO(data))
+        yield 1, 1, "\n".join(p.text for p in doc.paragraphs)
+    elif extension == "txt":
+        yield 1, 1, data.decode("utf-8", errors="ignore")
+
+
+def _parse(extension, data, on_progress=None):
+    # Pages are collected in a list and joined once (linear, not `text +=`).
+    parts = []
+    try:
+        for done, total, text in _iter_pages(extension, data):
+            parts.append(text)
+            if on_progress:
+                on_progress(done, total)
+    except Exception:
+        pass
+    return "".join(parts).strip()
+
+
+# --- CACHE ---
+def _store(key, text):
+    global _cache_bytes
+    size = sys.getsizeof(text)
+    if size > CACHE_MAX_BYTES:
+        return
+    _cache[key] = text
+    _cache_bytes += size
+    while _cache_bytes > CACHE_MAX_BYTES:
+        _, evicted = _cache.popitem(last=False)
+        _cache_bytes -= sys.getsizeof(evicted)
+        _stats["evictions"] += 1
+
+
+def cached_text(name, sha256):
+    """
+    Text of a file (by name and content hash) from the in-memory cache, or None.
+    Counts as a cache hit or miss.
+    """
+    key = (_extension(name), sha256)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return _cache[key]
+        _stats["misses"] += 1
+    return None
+
+
+def parse(name, data, on_progress=None):
+    """Extracts the text of file bytes without consulting or filling the cache."""
+    return _parse(_extension(name), data, on_progress)
+
+
+def remember(name, sha256, text):
+    """Puts text extracted or loaded elsewhere (e.g. the document library) in the cache."""
+    key = (_extension(name), sha256)
+    with _cache_lock:
+        if key not in _cache:
+            _store(key, text)
+
+
+def extract_text_from_file(file, on_progress=None):
+    """
+    Returns the plain text of an uploaded file, served from cache when seen before.
+    `on_progress(pages_done, pages_total)` is called as pages are extracted.
+    """
+    data = file.getvalue()
+    sha256 = hashlib.sha256(data).hexdigest()
+    text = cached_text(file.name, sha256)
+    if text is None:
+        # Parse outside the lock so other sessions are not blocked behind a big PDF.
+        text = parse(file.name, data, on_progress)
+        remember(file.name, sha256, text)
+    return text
+
+
+def build_file_context(files, on_progress=None, extract=extract_text_from_file):
+    """
+    Extracts every uploaded file and returns the combined reference context.
+    `on_progress(file_name, fraction)` reports overall progress across files;
+    `extract(file, on_progress)` returns one file's text (see library.extract).
+    """
+    parts = []
+    for position, f in enumerate(files):
+        def file_progress(done, total, position=position, name=f.name):
+            if on_progress:
+                on_progress(name, (position + done / max(total, 1)) / len(files))
+
+        extracted_text = extract(f, file_progress)
+        parts.append(f"--- Content from {f.name} ---\n{extracted_text}\n\n")
+        if on_progress:
+            on_progress(f.name, (position + 1) / len(files))
+    return "".join(parts)
+
+
+def cache_stats():
+    """Hit/miss/eviction counters plus current cache occupancy."""
+    with _cache_lock:
+        return {**_stats, "entries": len(_cache), "bytes": _cache_bytes}
+
+
+def clear_cache():
+    global _cache_bytes
+    with _cache_lock:
+        _cache.clear()
+        _cache_bytes = 0
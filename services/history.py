@@ -0,0 +1,197 @@
+"""
+Persistent generation history.
+
+Every blog, video script and LinkedIn post the views get back from n8n is
+recorded in SQLite with the params it was generated with, the output it was
+refined from (refine lineage) and how long the call took, so past outputs can
+be listed, searched and reopened without another webhook call. Reference
+context is stored once per content hash, which keeps a reopened output
+refinable with the context it was generated from. Search uses an FTS5 index
+when SQLite has it and falls back to LIKE otherwise.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+
+from services import sqlite_store
+
+# --- CONFIGURATION ---
+CACHE_DIR = os.environ.get("MARKETING_CACHE_DIR", ".cache")
+HISTORY_PATH = os.path.join(CACHE_DIR, "history.sqlite")
+CONTEXT_FIELD = "reference_file_content"
+SNIPPET_CHARS = 160
+
+# Kinds
+BLOG = "blog"
+VIDEO = "video"
+LINKEDIN = "linkedin"
+
+_TERM = re.compile(r"[^\W_]+")
+_fts = {}    # database path -> whether its FTS5 index exists, set when the schema is created
+
+
+def _create_schema(conn):
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS outputs (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               kind TEXT NOT NULL,
+               title TEXT NOT NULL,
+               content TEXT NOT NULL,
+               params TEXT NOT NULL,
+               fields TEXT,
+               context_sha256 TEXT,
+               action TEXT NOT NULL,
+               parent_id INTEGER,
+               instruction TEXT NOT NULL DEFAULT '',
+               seconds REAL,
+               created REAL NOT NULL
+           )"""
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS outputs_by_kind ON outputs (kind, created)")
+    conn.execute("CREATE TABLE IF NOT EXISTS contexts (sha256 TEXT PRIMARY KEY, text TEXT NOT NULL)")
+    # Run every time the schema is created: a recreated database needs its index again.
+    try:
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS outputs_fts "
+            "USING fts5(title, content, instruction, content='outputs', content_rowid='id')"
+        )
+        conn.execute(
+            """CREATE TRIGGER IF NOT EXISTS outputs_fts_insert AFTER INSERT ON outputs BEGIN
+                   INSERT INTO outputs_fts (rowid, title, content, instruction)
+                   VALUES (new.id, new.title, new.content, new.instruction);
+               END"""
+        )
+        conn.execute(
+            """CREATE TRIGGER IF NOT EXISTS outputs_fts_delete AFTER DELETE ON outputs BEGIN
+                   INSERT INTO outputs_fts (outputs_fts, rowid, title, content, instruction)
+                   VALUES ('delete', old.id, old.title, old.content, old.instruction);
+               END"""
+        )
+        _fts[HISTORY_PATH] = True
+    except sqlite3.OperationalError:
+        _fts[HISTORY_PATH] = False
+
+
+def _connect():
+    return sqlite_store.connect(HISTORY_PATH, _create_schema, row_factory=sqlite3.Row)
+
+
+def record(kind, content, params, title="", action="generate", parent_id=None, instruction="", seconds=None,
+           fields=None):
+    """
+    Saves one output and returns its id. `params` are the inputs it was
+    generated with; `parent_id` is the output a refine started from; `fields`
+    keeps a structured output (e.g. a LinkedIn post's title and hashtags).
+    """
+    params = dict(params or {})
+    context_sha256 = None
+    if CONTEXT_FIELD in params:
+        context = params.pop(CONTEXT_FIELD) or ""
+        context_sha256 = hashlib.sha256(context.encode("utf-8")).hexdigest()
+    with _connect() as conn:
+        if context_sha256 is not None:
+            conn.execute("INSERT OR IGNORE INTO contexts (sha256, text) VALUES (?, ?)", (context_sha256, context))
+        cursor = conn.execute(
+            "INSERT INTO outputs (kind, title, content, params, fields, context_sha256, action, parent_id, "
+            "instruction, seconds, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                kind, title or params.get("query") or content[:80], content,
+                json.dumps(params, ensure_ascii=False),
+                json.dumps(fields, ensure_ascii=False) if fields is not None else None,
+                context_sha256, action, parent_id,
+                instruction or "", seconds, time.time(),
+            ),
+        )
+        return cursor.lastrowid
+
+
+def _summary(row):
+    content = " ".join(row["content"].split())
+    return {
+        "id": row["id"],
+        "kind": row["kind"],
+        "title": row["title"],
+        "action": row["action"],
+        "parent_id": row["parent_id"],
+        "instruction": row["instruction"],
+        "seconds": row["seconds"],
+        "created": row["created"],
+        "snippet": content[:SNIPPET_CHARS] + ("…" if len(content) > SNIPPET_CHARS else ""),
+    }
+
+
+def search(kind=None, query="", limit=50):
+    """
+    Outputs of `kind` (all kinds when None), newest first, or best match first
+    when `query` is given (every word must match, as a prefix).
+    """
+    terms = _TERM.findall(query.lower())
+    where, args = [], []
+    if kind:
+        where.append("o.kind = ?")
+        args.append(kind)
+    with _connect() as conn:
+        if terms and _fts.get(HISTORY_PATH):
+            where.append("outputs_fts MATCH ?")
+            args.append(" ".join(f'"{term}"*' for term in terms))
+            sql = (
+                "SELECT o.* FROM outputs_fts JOIN outputs o ON o.id = outputs_fts.rowid "
+                f"WHERE {' AND '.join(where)} ORDER BY outputs_fts.rank LIMIT ?"
+            )
+        else:
+            for term in terms:
+                where.append("(o.title LIKE ? OR o.content LIKE ? OR o.instruction LIKE ?)")
+                args.extend([f"%{term}%"] * 3)
+            sql = (
+                f"SELECT o.* FROM outputs o {'WHERE ' + ' AND '.join(where) if where else ''} "
+                "ORDER BY o.created DESC LIMIT ?"
+            )
+        rows = conn.execute(sql, (*args, limit)).fetchall()
+    return [_summary(row) for row in rows]
+
+
+def get(output_id):
+    """Full output with its params (reference context restored) and fields, or None."""
+    with _connect() as conn:
+        row = conn.execute("SELECT * FROM outputs WHERE id = ?", (output_id,)).fetchone()
+        if row is None:
+            return None
+        params = json.loads(row["params"])
+        if row["context_sha256"] is not None:
+            context = conn.execute(
+                "SELECT text FROM contexts WHERE sha256 = ?", (row["context_sha256"],)
+            ).fetchone()
+            params[CONTEXT_FIELD] = context["text"] if context else ""
+    fields = json.loads(row["fields"]) if row["fields"] else None
+    return {**_summary(row), "content": row["content"], "params": params, "fields": fields}
+
+
+def lineage(output_id):
+    """Summaries from the original generation down to `output_id`."""
+    chain, seen = [], set()
+    with _connect() as conn:
+        while output_id is not None and output_id not in seen:
+            seen.add(output_id)
+            row = conn.execute("SELECT * FROM outputs WHERE id = ?", (output_id,)).fetchone()
+            if row is None:
+                break
+            chain.append(_summary(row))
+            output_id = row["parent_id"]
+    return chain[::-1]
+
+
+def remove(output_id):
+    """Deletes one output (refines made from it keep their own copy)."""
+    with _connect() as conn:
+        conn.execute("DELETE FROM outputs WHERE id = ?", (output_id,))
+        conn.execute("DELETE FROM contexts WHERE sha256 NOT IN (SELECT context_sha256 FROM outputs "
+                     "WHERE context_sha256 IS NOT NULL)")
+
+
+def stats():
+    with _connect() as conn:
+        outputs = conn.execute("SELECT COUNT(*) FROM outputs").fetchone()[0]
+    return {"outputs": outputs, "bytes": os.path.getsize(HISTORY_PATH), "full_text_search": bool(_fts.get(HISTORY_PATH))}
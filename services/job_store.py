@@ -0,0 +1,128 @@
+"""
+Checkpoint store for bulk generation jobs.
+
+Every completed lead is written to a local SQLite file as soon as it finishes,
+keyed by a job ID derived from the lead list and the generation params. If the
+tab reloads or the process restarts mid-run, loading the same list with the
+same settings finds the job again and only the unfinished rows are generated.
+
+Sent emails are logged by idempotency key, so re-running a send never
+delivers the same email twice; the log is kept for SENT_TTL.
+"""
+import hashlib
+import os
+import time
+
+from services import sqlite_store
+
+# --- CONFIGURATION ---
+STORE_DIR = os.environ.get("MARKETING_CACHE_DIR", ".cache")
+STORE_PATH = os.path.join(STORE_DIR, "jobs.sqlite")
+JOB_TTL = 14 * 24 * 3600   # jobs untouched for this long are pruned
+SENT_TTL = 7 * 24 * 3600   # sent-email log entries older than this are pruned
+
+
+def _create_schema(conn):
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS jobs (
+               job_id TEXT PRIMARY KEY,
+               total INTEGER NOT NULL,
+               created REAL NOT NULL,
+               updated REAL NOT NULL
+           )"""
+    )
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS job_emails (
+               job_id TEXT NOT NULL,
+               position INTEGER NOT NULL,
+               subject TEXT NOT NULL,
+               body TEXT NOT NULL,
+               PRIMARY KEY (job_id, position)
+           )"""
+    )
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS sent_emails (
+               idempotency_key TEXT PRIMARY KEY,
+               email TEXT NOT NULL,
+               sent REAL NOT NULL
+           )"""
+    )
+
+
+def _connect():
+    return sqlite_store.connect(STORE_PATH, _create_schema)
+
+
+def job_id(df, params_key):
+    """Stable ID for generating `df` with the params hashed as `params_key`."""
+    from pandas.util import hash_pandas_object
+
+    leads_hash = hashlib.sha256(hash_pandas_object(df, index=True).values.tobytes()).hexdigest()
+    return hashlib.sha256(f"{leads_hash}:{params_key}".encode("utf-8")).hexdigest()
+
+
+def open_job(job_id, total):
+    """Creates the job if it is new and prunes stale jobs."""
+    now = time.time()
+    with _connect() as conn:
+        stale = [row[0] for row in conn.execute("SELECT job_id FROM jobs WHERE updated < ?", (now - JOB_TTL,))]
+        for stale_id in stale:
+            conn.execute("DELETE FROM job_emails WHERE job_id = ?", (stale_id,))
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (stale_id,))
+        conn.execute(
+            "INSERT OR IGNORE INTO jobs (job_id, total, created, updated) VALUES (?, ?, ?, ?)",
+            (job_id, total, now, now),
+        )
+
+
+def completed_rows(job_id):
+    """Returns {row position: (subject, body)} for every checkpointed row of the job."""
+    with _connect() as conn:
+        rows = conn.execute("SELECT position, subject, body FROM job_emails WHERE job_id = ?", (job_id,))
+        return {position: (subject, body) for position, subject, body in rows}
+
+
+def save_rows(job_id, rows):
+    """Checkpoints an iterable of (row position, subject, body) in one transaction."""
+    with _connect() as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO job_emails (job_id, position, subject, body) VALUES (?, ?, ?, ?)",
+            [(job_id, int(position), subject, body) for position, subject, body in rows],
+        )
+        conn.execute("UPDATE jobs SET updated = ? WHERE job_id = ?", (time.time(), job_id))
+
+
+def progress(job_id):
+    """Returns (rows done, total rows), or None for an unknown job."""
+    with _connect() as conn:
+        job = conn.execute("SELECT total FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if job is None:
+            return None
+        done = conn.execute("SELECT COUNT(*) FROM job_emails WHERE job_id = ?", (job_id,)).fetchone()[0]
+    return done, job[0]
+
+
+def delete_job(job_id):
+    with _connect() as conn:
+        conn.execute("DELETE FROM job_emails WHERE job_id = ?", (job_id,))
+        conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+
+def was_sent(idempotency_key):
+    with _connect() as conn:
+        return conn.execute(
+            "SELECT 1 FROM sent_emails WHERE idempotency_key = ?", (idempotency_key,)
+        ).fetchone() is not None
+
+
+def prune_sent():
+    with _connect() as conn:
+        conn.execute("DELETE FROM sent_emails WHERE sent < ?", (time.time() - SENT_TTL,))
+
+
+def mark_sent(idempotency_key, email):
+    with _connect() as conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO sent_emails (idempotency_key, email, sent) VALUES (?, ?, ?)",
+            (idempotency_key, email, time.time()),
+        )
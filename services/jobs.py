@@ -0,0 +1,146 @@
+"""
+In-process background job runner.
+
+Long operations (bulk email generation) are submitted here instead of running
+inside the Streamlit script, so the user can navigate, review or cancel while
+they run and a browser disconnect does not kill the work. Jobs are looked up by
+ID; any session that knows the ID can poll its status.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# --- CONFIGURATION ---
+MAX_RUNNING_JOBS = 2      # jobs beyond this wait in the queue
+MAX_FINISHED_JOBS = 50    # finished jobs kept around for status lookups
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+FAILED = "failed"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+_executor = ThreadPoolExecutor(max_workers=MAX_RUNNING_JOBS, thread_name_prefix="job")
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+class Job:
+    def __init__(self, job_id, label, total):
+        self.id = job_id
+        self.label = label
+        self.total = total
+        self.completed = 0
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self._baseline = None   # rows already done when the job started (resumed rows)
+        self._future = None
+        self._lock = threading.Lock()
+
+    def report(self, completed, total=None):
+        """Progress callback for the running job."""
+        with self._lock:
+            if self._baseline is None:
+                self._baseline = completed
+            self.completed = completed
+            if total is not None:
+                self.total = total
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def snapshot(self):
+        """Point-in-time status: counts, throughput and ETA."""
+        with self._lock:
+            elapsed = ((self.finished or time.time()) - self.started) if self.started else 0.0
+            processed = self.completed - (self._baseline or 0)
+            rate = processed / elapsed if elapsed > 0 else 0.0
+            remaining = max(self.total - self.completed, 0)
+            eta = remaining / rate if rate > 0 and self.status == RUNNING else None
+            return {
+                "id": self.id,
+                "label": self.label,
+                "status": self.status,
+                "completed": self.completed,
+                "total": self.total,
+                "rate": rate,
+                "eta": eta,
+                "elapsed": elapsed,
+                "error": self.error,
+            }
+
+
+def _run(job, fn):
+    if job.cancelled:
+        job.status = CANCELLED
+        job.finished = time.time()
+        return
+    job.status = RUNNING
+    job.started = time.time()
+    try:
+        # A cancelled job keeps the partial result `fn` returned, so callers can
+        # still apply the work that finished before the cancel.
+        job.result = fn(job)
+        job.status = CANCELLED if job.cancelled else DONE
+    except Exception as e:
+        job.error = str(e)
+        job.status = FAILED
+    finally:
+        job.finished = time.time()
+
+
+def _prune():
+    finished = sorted(
+        (job for job in _jobs.values() if job.status not in ACTIVE_STATUSES),
+        key=lambda job: job.finished or 0,
+    )
+    for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+        del _jobs[job.id]
+
+
+def submit(job_id, label, total, fn):
+    """
+    Queues `fn(job)` as a background job and returns the Job. `fn` should call
+    `job.report()` as it progresses and stop early once `job.cancelled` is set.
+    If a job with this ID is already queued or running, that job is returned.
+    """
+    with _jobs_lock:
+        existing = _jobs.get(job_id)
+        if existing is not None and existing.status in ACTIVE_STATUSES:
+            return existing
+        job = Job(job_id, label, total)
+        _jobs[job_id] = job
+        _prune()
+    job._future = _executor.submit(_run, job, fn)
+    return job
+
+
+def get(job_id):
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def cancel(job_id):
+    """Requests cancellation; queued jobs never start, running ones stop at the next check."""
+    job = get(job_id)
+    if job is None or job.status not in ACTIVE_STATUSES:
+        return
+    job.cancel_event.set()
+    if job._future is not None and job._future.cancel():
+        job.status = CANCELLED
+        job.finished = time.time()
+
+
+def forget(job_id):
+    """Drops a finished job once its result has been collected."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is not None and job.status not in ACTIVE_STATUSES:
+            del _jobs[job_id]
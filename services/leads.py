@@ -0,0 +1,189 @@
+"""
+Lead table schema and ingestion.
+
+read_leads() streams an uploaded CSV (in chunks) or .xlsx (read-only rows)
+through validation, email normalization and dedupe, keeping only the lead
+columns the webhooks use. Generated emails live in typed columns next to the uploaded lead fields:
+"Subject", "Body" and "Error" as pandas string columns and "Status" as a
+categorical, so review and send read them directly instead of re-parsing JSON
+per row. Updates go through update_rows() as one batched assignment.
+"""
+import re
+from bisect import bisect_left
+
+REQUIRED_COLUMNS = ["first_name", "last_name", "email", "org_name"]
+CHUNK_ROWS = 20_000          # rows validated per step while reading a lead file
+MAX_REJECTED_ROWS = 1_000    # rejected rows kept for the report (all are counted)
+
+_EMAIL = re.compile(r"[^@\s]+@[^@\s]+\.[^@\s]+")
+_TOKEN = re.compile(r"[^\W_]+")
+SEARCH_COLUMNS = ["first_name", "last_name", "org_name", "email"]
+
+DRAFT = "Draft"
+REFINED = "Refined"
+APPROVED = "Approved"
+SENT = "Sent"
+FAILED = "Failed"
+STATUSES = [DRAFT, REFINED, APPROVED, SENT, FAILED]
+
+EMAIL_COLUMNS = ["Subject", "Body", "Status", "Error"]
+
+
+def _column_name(name):
+    # "First Name" / " EMAIL " -> first_name / email
+    return "_".join(str(name).strip().lower().split())
+
+
+def _csv_chunks(file):
+    import pandas as pd
+
+    return pd.read_csv(
+        file, chunksize=CHUNK_ROWS, dtype=str, keep_default_na=False,
+        usecols=lambda name: _column_name(name) in REQUIRED_COLUMNS,
+    )
+
+
+def _xlsx_chunks(file):
+    import openpyxl
+    import pandas as pd
+
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [_column_name(cell) if cell is not None else "" for cell in next(rows, ())]
+        keep = [position for position, name in enumerate(header) if name in REQUIRED_COLUMNS]
+        columns = [header[position] for position in keep]
+        start, batch = 0, []
+        for row in rows:
+            batch.append(["" if position >= len(row) or row[position] is None else str(row[position])
+                          for position in keep])
+            if len(batch) == CHUNK_ROWS:
+                yield pd.DataFrame(batch, columns=columns, index=range(start, start + len(batch)))
+                start, batch = start + len(batch), []
+        if batch or not start:
+            yield pd.DataFrame(batch, columns=columns, index=range(start, start + len(batch)))
+    finally:
+        workbook.close()
+
+
+def read_leads(file):
+    """
+    Reads an uploaded .csv or .xlsx lead list.
+
+    Returns (leads_df, rejected_df, rejected_count). Emails are trimmed and
+    lower-cased; rows with a missing or invalid email, or an email already seen
+    earlier in the file, are rejected with a "reason" and their source row
+    number. Raises ValueError when a required column is missing or no row
+    has a usable email.
+    """
+    import pandas as pd
+
+    name = getattr(file, "name", "").lower()
+    kept, rejected, rejected_count, seen = [], [], 0, set()
+    try:
+        chunks = _xlsx_chunks(file) if name.endswith(".xlsx") else _csv_chunks(file)
+        for chunk in chunks:
+            chunk = chunk.rename(columns=_column_name)
+            missing = [column for column in REQUIRED_COLUMNS if column not in chunk.columns]
+            if missing:
+                raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+            chunk = chunk.loc[:, ~chunk.columns.duplicated()][REQUIRED_COLUMNS]
+            chunk = chunk.apply(lambda column: column.str.strip())
+            chunk["email"] = chunk["email"].str.lower()
+
+            reasons = pd.Series("", index=chunk.index)
+            reasons[~chunk["email"].str.fullmatch(_EMAIL)] = "invalid email"
+            reasons[chunk["email"] == ""] = "missing email"
+            emails = chunk["email"].tolist()
+            # Plain set lookups; Series.isin() re-materialises `seen` on every chunk.
+            seen_before = pd.Series([email in seen for email in emails], index=chunk.index)
+            duplicate = chunk["email"].duplicated() | seen_before
+            reasons[(reasons == "") & duplicate] = "duplicate email"
+
+            bad = reasons != ""
+            rejected_count += int(bad.sum())
+            if bad.any() and sum(len(part) for part in rejected) < MAX_REJECTED_ROWS:
+                # Header is row 1 of the source file.
+                report = chunk[bad].assign(reason=reasons[bad], row=chunk.index[bad] + 2)
+                rejected.append(report)
+            good = chunk[~bad]
+            seen.update(good["email"].tolist())
+            kept.append(good)
+    except pd.errors.EmptyDataError:
+        raise ValueError("The lead file is empty.") from None
+
+    if not sum(len(part) for part in kept):
+        if rejected_count:
+            raise ValueError(f"None of the {rejected_count:,} rows has a valid, unique email.")
+        raise ValueError("The lead file has no rows.")
+    leads_df = pd.concat(kept, ignore_index=True).astype("string")
+    # Lists often repeat the same organisation many times.
+    leads_df["org_name"] = leads_df["org_name"].astype("category")
+    if rejected:
+        rejected_df = pd.concat(rejected, ignore_index=True).head(MAX_REJECTED_ROWS)
+        rejected_df = rejected_df[["row", "reason", *REQUIRED_COLUMNS]]
+    else:
+        rejected_df = pd.DataFrame(columns=["row", "reason", *REQUIRED_COLUMNS])
+    return leads_df, rejected_df, rejected_count
+
+
+def has_emails(df):
+    return "Body" in df.columns
+
+
+def with_emails(df, subjects, bodies, statuses, errors):
+    """Returns `df` with the generated-email columns set from per-row lists."""
+    import pandas as pd
+
+    return df.assign(
+        Subject=pd.array(subjects, dtype="string"),
+        Body=pd.array(bodies, dtype="string"),
+        Status=pd.Categorical(statuses, categories=STATUSES),
+        Error=pd.array(errors, dtype="string"),
+    )
+
+
+def update_rows(df, indices, **columns):
+    """
+    Sets `columns` (name -> scalar or per-row sequence) for the rows labelled
+    `indices` in one assignment per column.
+    """
+    indices = list(indices)
+    if not indices:
+        return
+    for column, values in columns.items():
+        df.loc[indices, column] = values
+
+
+class SearchIndex:
+    """
+    Token-prefix index over lead name, organisation and email for the Review
+    Queue search. Built once per upload; row labels survive generation.
+    """
+
+    def __init__(self, df):
+        postings = {}
+        for label, *values in zip(df.index, *(df[column] for column in SEARCH_COLUMNS)):
+            for value in values:
+                if isinstance(value, str):
+                    for token in _TOKEN.findall(value.lower()):
+                        postings.setdefault(token, set()).add(label)
+        self._tokens = sorted(postings)
+        self._postings = [postings[token] for token in self._tokens]
+
+    def search(self, query):
+        """
+        Returns the set of row labels where every query term is a prefix of some
+        name/org/email token, or None when the query has no terms.
+        """
+        result = None
+        for term in _TOKEN.findall(query.lower()):
+            matches = set()
+            for position in range(bisect_left(self._tokens, term), len(self._tokens)):
+                if not self._tokens[position].startswith(term):
+                    break
+                matches |= self._postings[position]
+            result = matches if result is None else result & matches
+            if not result:
+                break
+        return result
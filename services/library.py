@@ -0,0 +1,222 @@
+"""
+Persistent reference document library.
+
+Extracted text of uploaded documents is stored once per content hash in
+SQLite, with an inverted index (token -> document, count) for search. A
+re-uploaded file is recognised by its hash and never parsed again, and any
+view can attach library documents as context without uploading them.
+Least recently used documents are evicted beyond MAX_BYTES / MAX_DOCUMENTS
+(MARKETING_LIBRARY_MAX_MB / MARKETING_LIBRARY_MAX_DOCS).
+"""
+import hashlib
+import math
+import os
+import re
+import time
+from collections import Counter
+
+from services import extraction, sqlite_store
+
+# --- CONFIGURATION ---
+CACHE_DIR = os.environ.get("MARKETING_CACHE_DIR", ".cache")
+LIBRARY_PATH = os.path.join(CACHE_DIR, "library.sqlite")
+MAX_BYTES = int(os.environ.get("MARKETING_LIBRARY_MAX_MB", 200)) * 1024 * 1024
+MAX_DOCUMENTS = int(os.environ.get("MARKETING_LIBRARY_MAX_DOCS", 500))
+NAME_WEIGHT = 5            # a query term in the file name counts like this many occurrences
+
+_TOKEN = re.compile(r"[^\W_]{2,}")
+
+
+def _create_schema(conn):
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS documents (
+               sha256 TEXT PRIMARY KEY,
+               name TEXT NOT NULL,
+               text TEXT NOT NULL,
+               size INTEGER NOT NULL,
+               added REAL NOT NULL,
+               last_used REAL NOT NULL
+           )"""
+    )
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS terms (
+               token TEXT NOT NULL,
+               sha256 TEXT NOT NULL,
+               count INTEGER NOT NULL,
+               PRIMARY KEY (token, sha256)
+           ) WITHOUT ROWID"""
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS terms_by_document ON terms (sha256)")
+
+
+def _connect():
+    return sqlite_store.connect(LIBRARY_PATH, _create_schema)
+
+
+def _tokens(text):
+    return _TOKEN.findall(text.lower())
+
+
+def _index(conn, sha256, name, text):
+    counts = Counter(_tokens(text))
+    for token in _tokens(name):
+        counts[token] += NAME_WEIGHT
+    conn.executemany(
+        "INSERT OR REPLACE INTO terms (token, sha256, count) VALUES (?, ?, ?)",
+        [(token, sha256, count) for token, count in counts.items()],
+    )
+
+
+def _evict(conn):
+    total, count = conn.execute("SELECT COALESCE(SUM(size), 0), COUNT(*) FROM documents").fetchone()
+    if total <= MAX_BYTES and count <= MAX_DOCUMENTS:
+        return
+    for sha256, size in conn.execute("SELECT sha256, size FROM documents ORDER BY last_used").fetchall():
+        conn.execute("DELETE FROM documents WHERE sha256 = ?", (sha256,))
+        conn.execute("DELETE FROM terms WHERE sha256 = ?", (sha256,))
+        total -= size
+        count -= 1
+        if total <= MAX_BYTES and count <= MAX_DOCUMENTS:
+            break
+
+
+def _save(sha256, name, text):
+    # Empty text is not saved, so a file that failed to parse is tried again next time.
+    size = len(text.encode("utf-8"))
+    if not text or size > MAX_BYTES:
+        return
+    now = time.time()
+    with _connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO documents (sha256, name, text, size, added, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (sha256, name, text, size, now, now),
+        )
+        _index(conn, sha256, name, text)
+        _evict(conn)
+
+
+def extract(file, save=True, on_progress=None):
+    """
+    Returns the text of an uploaded file. Files already extracted in this
+    process or in the library are served without parsing; new ones are
+    extracted and, with `save`, stored and indexed.
+    """
+    data = file.getvalue()
+    sha256 = hashlib.sha256(data).hexdigest()
+    text = extraction.cached_text(file.name, sha256)
+    if text is not None:
+        if save:
+            # Still in memory but maybe not in the library (e.g. removed on the Ops page)
+            with _connect() as conn:
+                stored = conn.execute("SELECT 1 FROM documents WHERE sha256 = ?", (sha256,)).fetchone()
+            if stored is None:
+                _save(sha256, file.name, text)
+        return text
+
+    with _connect() as conn:
+        row = conn.execute("SELECT text FROM documents WHERE sha256 = ?", (sha256,)).fetchone()
+        if row is not None:
+            conn.execute("UPDATE documents SET last_used = ? WHERE sha256 = ?", (time.time(), sha256))
+    if row is not None:
+        extraction.remember(file.name, sha256, row[0])
+        return row[0]
+
+    text = extraction.parse(file.name, data, on_progress)
+    extraction.remember(file.name, sha256, text)
+    if save:
+        _save(sha256, file.name, text)
+    return text
+
+
+def build_file_context(files, save=True, on_progress=None):
+    """Library-aware extraction.build_file_context()."""
+    return extraction.build_file_context(
+        files, on_progress, extract=lambda f, file_progress: extract(f, save, file_progress)
+    )
+
+
+def search(query, limit=20):
+    """
+    Documents matching every query term (as a token prefix in the text or
+    name), best tf-idf score first: [{"sha256", "name", "size", "added", "score"}].
+    """
+    terms = list(dict.fromkeys(_tokens(query)))
+    if not terms:
+        return recent(limit)
+    with _connect() as conn:
+        total = conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0] or 1
+        scores = None
+        for term in terms:
+            rows = conn.execute(
+                "SELECT sha256, SUM(count) FROM terms WHERE token >= ? AND token < ? GROUP BY sha256",
+                (term, term + "\uffff"),
+            ).fetchall()
+            idf = math.log(1 + total / max(1, len(rows)))
+            term_scores = {sha256: (1 + math.log(count)) * idf for sha256, count in rows}
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {sha256: score + term_scores[sha256] for sha256, score in scores.items() if sha256 in term_scores}
+            if not scores:
+                return []
+        best = sorted(scores, key=scores.get, reverse=True)[:limit]
+        placeholders = ",".join("?" * len(best))
+        rows = conn.execute(
+            f"SELECT sha256, name, size, added FROM documents WHERE sha256 IN ({placeholders})", best
+        ).fetchall()
+    found = {sha256: {"sha256": sha256, "name": name, "size": size, "added": added, "score": scores[sha256]}
+             for sha256, name, size, added in rows}
+    return [found[sha256] for sha256 in best if sha256 in found]
+
+
+def recent(limit=20):
+    """Most recently used documents."""
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT sha256, name, size, added FROM documents ORDER BY last_used DESC LIMIT ?", (limit,)
+        ).fetchall()
+    return [{"sha256": sha256, "name": name, "size": size, "added": added, "score": None}
+            for sha256, name, size, added in rows]
+
+
+def names(hashes):
+    """{sha256: file name} for the given documents that are in the library."""
+    hashes = list(hashes)
+    if not hashes:
+        return {}
+    with _connect() as conn:
+        rows = conn.execute(
+            f"SELECT sha256, name FROM documents WHERE sha256 IN ({','.join('?' * len(hashes))})", hashes
+        ).fetchall()
+    return dict(rows)
+
+
+def build_context(hashes):
+    """Reference context for library documents, in the "--- Content from ... ---" layout."""
+    hashes = list(hashes)
+    if not hashes:
+        return ""
+    with _connect() as conn:
+        rows = conn.execute(
+            f"SELECT sha256, name, text FROM documents WHERE sha256 IN ({','.join('?' * len(hashes))})", hashes
+        ).fetchall()
+        conn.executemany("UPDATE documents SET last_used = ? WHERE sha256 = ?",
+                         [(time.time(), sha256) for sha256, _, _ in rows])
+    documents = {sha256: (name, text) for sha256, name, text in rows}
+    return "".join(
+        f"--- Content from {documents[sha256][0]} ---\n{documents[sha256][1]}\n\n"
+        for sha256 in hashes if sha256 in documents
+    )
+
+
+def remove(sha256):
+    with _connect() as conn:
+        conn.execute("DELETE FROM documents WHERE sha256 = ?", (sha256,))
+        conn.execute("DELETE FROM terms WHERE sha256 = ?", (sha256,))
+
+
+def stats():
+    with _connect() as conn:
+        documents, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM documents").fetchone()
+    return {"documents": documents, "bytes": size, "max_documents": MAX_DOCUMENTS, "max_bytes": MAX_BYTES}
@@ -0,0 +1,124 @@
+"""
+Parsing of LLM email output (subject/body) returned by the n8n webhooks.
+
+parse_llm_response() does bounded, roughly linear work per input: at most two
+C-level JSON decodes (whole text, then the outermost {...} span, which covers
+code fences and chatty preambles) and one forward scan for "subject"/"body"
+values. The scan never backtracks, so large or badly malformed bodies cannot
+blow up the way a DOTALL `.*?` search can. See tools/bench_parser.py.
+"""
+import json
+import re
+
+# strict=False accepts raw newlines/tabs inside strings, the most common way LLM "JSON" breaks.
+_JSON = json.JSONDecoder(strict=False)
+
+# A quoted (or bare) subject/body key and the quote that opens its value.
+_KEY = re.compile(r"""(["']?)\b(subject|body)\1\s*:\s*(["'])""", re.IGNORECASE)
+# What may follow the closing quote of a value: optional space, then `,` `}` or the end.
+_VALUE_END = re.compile(r"\s*(?:[,}]|$)")
+_ESCAPE = re.compile(r"\\(u[0-9a-fA-F]{4}|.)", re.DOTALL)
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
+# Plain-text emails that open with a "Subject: ..." line.
+_SUBJECT_LINE = re.compile(r"\s*\**subject\**\s*:\s*([^\n]*)\n?", re.IGNORECASE)
+
+
+def _decode(text):
+    try:
+        return _JSON.decode(text)
+    except ValueError:
+        return None
+
+
+def _as_dict(value):
+    # Accept the dict itself, n8n's one-element list wrapper, or a double-encoded JSON string.
+    if isinstance(value, list) and value:
+        value = value[0]
+    if isinstance(value, str) and value.lstrip().startswith("{"):
+        value = _decode(value.strip())
+    return value if isinstance(value, dict) else None
+
+
+def _unescape(text):
+    if "\\" not in text:
+        return text
+
+    def replace(match):
+        escaped = match.group(1)
+        if len(escaped) == 5:
+            return chr(int(escaped[1:], 16))
+        return _ESCAPES.get(escaped, escaped)
+
+    return _ESCAPE.sub(replace, text)
+
+
+def _scan_value(content, start, quote):
+    # Returns (value, end) for a string opened at `start`. Quotes inside the value
+    # only close it when followed by `,` `}` or the end; an unterminated value
+    # (truncated output) runs to the end of the text.
+    position = start
+    while True:
+        position = content.find(quote, position)
+        if position == -1:
+            return content[start:].rstrip().rstrip("}").rstrip(), len(content)
+        backslashes = 0
+        while position - 1 - backslashes >= start and content[position - 1 - backslashes] == "\\":
+            backslashes += 1
+        if backslashes % 2 == 0 and _VALUE_END.match(content, position + 1):
+            return content[start:position], position + 1
+        position += 1
+
+
+def _scan_fields(content):
+    fields = {}
+    position = 0
+    while len(fields) < 2:
+        match = _KEY.search(content, position)
+        if match is None:
+            break
+        key = match.group(2).lower()
+        value, position = _scan_value(content, match.end(), match.group(3))
+        fields.setdefault(key, _unescape(value))
+    return fields
+
+
+def parse_llm_response(content):
+    """
+    Tolerant parsing of an LLM subject/body answer. Handles:
+    1. Valid JSON (also list-wrapped or double-encoded)
+    2. JSON with raw newlines, in code fences or surrounded by prose
+    3. Python dict strings and malformed objects (unescaped quotes, truncation)
+    4. Plain text, optionally opening with a "Subject:" line
+    """
+    if not isinstance(content, str):
+        if isinstance(content, dict):
+            return content
+        return {"body": str(content)}
+
+    text = content.strip()
+
+    # Attempt 1: the whole text is JSON
+    if text[:1] in ("{", "[", '"'):
+        parsed = _as_dict(_decode(text))
+        if parsed is not None:
+            return parsed
+
+    # Attempt 2: the outermost {...} span (code fences, "Here is your email:" preambles)
+    start, end = text.find("{"), text.rfind("}")
+    if 0 <= start < end and (start, end) != (0, len(text) - 1):
+        parsed = _as_dict(_decode(text[start:end + 1]))
+        if parsed is not None:
+            return parsed
+
+    # Attempt 3: single forward scan for subject/body values
+    fields = _scan_fields(text)
+    if fields:
+        return {"subject": fields.get("subject", ""), "body": fields.get("body", "")}
+
+    # Attempt 4: "Subject: ..." first line, rest is the body
+    match = _SUBJECT_LINE.match(text)
+    if match and match.group(1).strip():
+        return {"subject": match.group(1).strip(), "body": text[match.end():].strip()}
+
+    # Return as raw text if all else fails
+    return {"subject": "", "body": content}
@@ -0,0 +1,214 @@
+"""
+In-process metrics for n8n webhook calls.
+
+webhook.py records every call here: latency, request/response bytes, status
+code (or error type) and retries, per endpoint path and action. Views record
+response-cache hits. Percentiles come from a bounded window of recent samples;
+the Prometheus export uses cumulative histogram buckets and is also written to
+METRICS_PATH at most every EXPORT_INTERVAL seconds.
+"""
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+# --- CONFIGURATION ---
+CACHE_DIR = os.environ.get("MARKETING_CACHE_DIR", ".cache")
+METRICS_PATH = os.environ.get("MARKETING_METRICS_FILE", os.path.join(CACHE_DIR, "webhook_metrics.prom"))
+EXPORT_INTERVAL = 15       # seconds between metric file rewrites
+WINDOW = 1000              # recent latencies kept per series for percentiles
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_series = {}
+_lock = threading.Lock()
+_last_export = 0.0
+
+
+class Series:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.latency_sum = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.statuses = {}
+        self.recent = deque(maxlen=WINDOW)
+
+    def percentile(self, q):
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def endpoint_label(url):
+    """Endpoint path (no host or query) used as the metric label."""
+    return urlparse(url or "").path or "/"
+
+
+def _get(url, action):
+    key = (endpoint_label(url), action or "call")
+    series = _series.get(key)
+    if series is None:
+        series = _series[key] = Series()
+    return series
+
+
+def observe(url, action, seconds, status, request_bytes=0, response_bytes=0, retries=0):
+    """
+    Records one webhook call. `status` is the HTTP status code, or the exception
+    class name when the call raised.
+    """
+    with _lock:
+        series = _get(url, action)
+        series.calls += 1
+        series.retries += retries
+        series.request_bytes += request_bytes
+        series.response_bytes += response_bytes
+        series.latency_sum += seconds
+        series.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        series.recent.append(seconds)
+        status = str(status)
+        series.statuses[status] = series.statuses.get(status, 0) + 1
+        if not status.isdigit() or int(status) >= 400:
+            series.errors += 1
+    _maybe_export()
+
+
+def record_hedge(url, action, won, request_bytes=0):
+    """Records a hedged duplicate request and whether it answered first."""
+    with _lock:
+        series = _get(url, action)
+        series.hedges += 1
+        series.hedge_wins += int(won)
+        series.request_bytes += request_bytes
+    _maybe_export()
+
+
+def latency_percentile(url, action, q, min_samples=1):
+    """Recent latency percentile for the endpoint/action, or None below `min_samples` calls."""
+    with _lock:
+        series = _series.get((endpoint_label(url), action or "call"))
+        if series is None or len(series.recent) < min_samples:
+            return None
+        return series.percentile(q)
+
+
+def record_cache(url, action, hit):
+    """Records a response-cache lookup for the endpoint/action."""
+    with _lock:
+        series = _get(url, action)
+        if hit:
+            series.cache_hits += 1
+        else:
+            series.cache_misses += 1
+    _maybe_export()
+
+
+def snapshot():
+    """One dict per endpoint/action with counters and p50/p95/p99 latency."""
+    with _lock:
+        rows = []
+        for (endpoint, action), series in sorted(_series.items()):
+            rows.append({
+                "endpoint": endpoint,
+                "action": action,
+                "calls": series.calls,
+                "errors": series.errors,
+                "retries": series.retries,
+                "hedges": series.hedges,
+                "hedge_wins": series.hedge_wins,
+                "cache_hits": series.cache_hits,
+                "cache_misses": series.cache_misses,
+                "p50": series.percentile(0.50),
+                "p95": series.percentile(0.95),
+                "p99": series.percentile(0.99),
+                "avg_request_bytes": series.request_bytes / series.calls if series.calls else 0,
+                "avg_response_bytes": series.response_bytes / series.calls if series.calls else 0,
+                "statuses": dict(series.statuses),
+            })
+        return rows
+
+
+def reset():
+    with _lock:
+        _series.clear()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text():
+    """All series in the Prometheus text exposition format."""
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    with _lock:
+        items = sorted(_series.items())
+        labelled = [(f'endpoint="{_escape(endpoint)}",action="{_escape(action)}"', series)
+                    for (endpoint, action), series in items]
+
+        family("n8n_webhook_request_duration_seconds", "histogram", "Webhook call latency, retries included.")
+        for labels, series in labelled:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), series.buckets):
+                cumulative += count
+                lines.append(f'n8n_webhook_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"n8n_webhook_request_duration_seconds_sum{{{labels}}} {series.latency_sum:.6f}")
+            lines.append(f"n8n_webhook_request_duration_seconds_count{{{labels}}} {series.calls}")
+
+        family("n8n_webhook_responses_total", "counter", "Webhook calls by HTTP status or error type.")
+        for labels, series in labelled:
+            for status, count in sorted(series.statuses.items()):
+                lines.append(f'n8n_webhook_responses_total{{{labels},status="{_escape(status)}"}} {count}')
+
+        counters = (
+            ("n8n_webhook_request_bytes_total", "request_bytes", "Request body bytes sent (per attempt, after compression)."),
+            ("n8n_webhook_response_bytes_total", "response_bytes", "Response body bytes received."),
+            ("n8n_webhook_retries_total", "retries", "Retried webhook attempts."),
+            ("n8n_webhook_hedges_total", "hedges", "Duplicate requests sent for calls slower than their recent p95."),
+            ("n8n_webhook_hedge_wins_total", "hedge_wins", "Hedged duplicates that answered first."),
+            ("n8n_webhook_cache_hits_total", "cache_hits", "Generations answered from the response cache."),
+            ("n8n_webhook_cache_misses_total", "cache_misses", "Response cache lookups that went to n8n."),
+        )
+        for name, attribute, help_text in counters:
+            family(name, "counter", help_text)
+            for labels, series in labelled:
+                lines.append(f"{name}{{{labels}}} {getattr(series, attribute)}")
+    return "\n".join(lines) + "\n"
+
+
+def export(path=METRICS_PATH):
+    """Writes prometheus_text() to `path` atomically (textfile-collector style)."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(temporary, path)
+    return path
+
+
+def _maybe_export():
+    global _last_export
+    now = time.monotonic()
+    if now - _last_export < EXPORT_INTERVAL:
+        return
+    _last_export = now
+    try:
+        export()
+    except OSError:
+        pass
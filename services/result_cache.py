@@ -0,0 +1,106 @@
+"""
+Opt-in persistent cache for webhook generation results.
+
+Identical `generate` payloads (a reload, a double click, two marketers asking
+for the same topic) are answered from a local SQLite file instead of another
+LLM round trip. Keys are a canonical hash of the normalized payload; the bulky
+`reference_file_content` is folded in as its own hash. Entries expire after a
+TTL and the least recently used ones are evicted beyond CACHE_MAX_BYTES.
+"""
+import hashlib
+import json
+import os
+import time
+
+from services import sqlite_store
+
+# --- CONFIGURATION ---
+CACHE_DIR = os.environ.get("MARKETING_CACHE_DIR", ".cache")
+CACHE_PATH = os.path.join(CACHE_DIR, "results.sqlite")
+DEFAULT_TTL = 7 * 24 * 3600          # seconds
+CACHE_MAX_BYTES = 100 * 1024 * 1024
+
+
+def _create_schema(conn):
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS results (
+               key TEXT PRIMARY KEY,
+               value TEXT NOT NULL,
+               size INTEGER NOT NULL,
+               created REAL NOT NULL,
+               expires REAL NOT NULL,
+               last_access REAL NOT NULL
+           )"""
+    )
+
+
+def _connect():
+    return sqlite_store.connect(CACHE_PATH, _create_schema)
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def payload_key(endpoint, payload):
+    """Canonical hash of `payload` as sent to `endpoint`."""
+    normalized = _normalize(payload)
+    content = normalized.pop("reference_file_content", "") or ""
+    normalized["reference_file_sha256"] = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    canonical = json.dumps(normalized, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{endpoint}\n{canonical}".encode("utf-8")).hexdigest()
+
+
+def get(key):
+    """Returns the cached result for `key`, or None when missing or expired."""
+    now = time.time()
+    with _connect() as conn:
+        row = conn.execute("SELECT value, expires FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] < now:
+            conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+        return row[0]
+
+
+def put(key, value, ttl=DEFAULT_TTL):
+    if not isinstance(value, str):
+        return
+    now = time.time()
+    size = len(value.encode("utf-8"))
+    if size > CACHE_MAX_BYTES:
+        return
+    with _connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO results (key, value, size, created, expires, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, value, size, now, now + ttl, now),
+        )
+        _evict(conn, now)
+
+
+def _evict(conn, now):
+    conn.execute("DELETE FROM results WHERE expires < ?", (now,))
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+    if total <= CACHE_MAX_BYTES:
+        return
+    # Drop least recently used entries until the file is back under budget.
+    for key, size in conn.execute("SELECT key, size FROM results ORDER BY last_access").fetchall():
+        conn.execute("DELETE FROM results WHERE key = ?", (key,))
+        total -= size
+        if total <= CACHE_MAX_BYTES:
+            break
+
+
+def stats():
+    with _connect() as conn:
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+    return {"entries": entries, "bytes": size}
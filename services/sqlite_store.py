@@ -0,0 +1,42 @@
+"""
+Shared connection handling for the local SQLite stores (result cache, job
+store, page cache, document library, history).
+
+Each `with connect(...)` opens a connection, commits (or rolls back) the work
+done in the block and always closes it. WAL mode and the store's schema are
+set up once per process per file instead of on every call.
+"""
+import contextlib
+import os
+import sqlite3
+import threading
+
+_ready = set()   # database paths whose schema exists in this process
+_ready_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def connect(path, create_schema, row_factory=None):
+    """
+    Yields a connection to the database at `path`, calling
+    `create_schema(conn)` the first time the file is used in this process
+    (or again if it was deleted).
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    new = path not in _ready or not os.path.exists(path)
+    conn = sqlite3.connect(path, timeout=10)
+    try:
+        if row_factory is not None:
+            conn.row_factory = row_factory
+        if new:
+            with _ready_lock:
+                conn.execute("PRAGMA journal_mode=WAL")
+                with conn:
+                    create_schema(conn)
+                _ready.add(path)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
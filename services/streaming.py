@@ -0,0 +1,73 @@
+"""
+Incremental markdown rendering for streamed webhook output.
+
+Finished blocks (paragraphs, lists, headings, fenced code) are rendered once
+into their own slot; only the block still being written is re-rendered as new
+text arrives, so rendering stays linear in the length of the document instead
+of re-drawing everything on every token.
+"""
+import time
+
+RENDER_INTERVAL = 0.05   # seconds between redraws of the in-progress block
+
+
+class MarkdownStream:
+    """Splits streamed text into completed markdown blocks plus an open tail."""
+
+    def __init__(self):
+        self._lines = []       # complete lines of the current block
+        self._partial = ""     # text after the last newline
+        self._in_fence = False
+
+    def feed(self, text):
+        """Adds `text` and returns the blocks it completed, in order."""
+        finished = []
+        *lines, self._partial = (self._partial + text).split("\n")
+        for line in lines:
+            if line.lstrip().startswith(("```", "~~~")):
+                self._in_fence = not self._in_fence
+            if not line.strip() and not self._in_fence:
+                if self._lines:
+                    finished.append("\n".join(self._lines))
+                    self._lines = []
+            else:
+                self._lines.append(line)
+        return finished
+
+    @property
+    def tail(self):
+        return "\n".join(self._lines + [self._partial])
+
+    def close(self):
+        """Returns whatever is left once the stream has ended."""
+        rest = self.tail.strip("\n")
+        self._lines, self._partial = [], ""
+        return [rest] if rest else []
+
+
+def render_markdown_stream(chunks, container):
+    """
+    Renders an iterable of text chunks into a Streamlit `container` as they
+    arrive and returns the full text.
+    """
+    stream = MarkdownStream()
+    parts = []
+    slot = None
+    last_render = 0.0
+
+    for chunk in chunks:
+        parts.append(chunk)
+        for block in stream.feed(chunk):
+            # Freeze the finished block in the current slot; the next block gets a new one.
+            (slot or container.empty()).markdown(block)
+            slot = None
+        now = time.monotonic()
+        if now - last_render >= RENDER_INTERVAL and stream.tail.strip():
+            slot = slot or container.empty()
+            slot.markdown(stream.tail)
+            last_render = now
+
+    for block in stream.close():
+        (slot or container.empty()).markdown(block)
+        slot = None
+    return "".join(parts)
@@ -0,0 +1,328 @@
+"""
+Reference-URL fetching for generation context.
+
+Reference URLs are fetched concurrently by the app, reduced to readable text
+and sent to n8n as context, instead of n8n fetching every page again on each
+generate/refine (and once per lead in bulk email). Pages are cached in SQLite
+by URL: fresh for their Cache-Control max-age (or DEFAULT_TTL, at least
+MIN_TTL since every Streamlit rerun rebuilds the context), then
+revalidated with If-None-Match / If-Modified-Since so an unchanged page costs a
+304 instead of a download. A cached copy is used when a refetch fails.
+Only http(s) URLs on public addresses are fetched, checked again on every
+redirect, so a typed-in URL cannot reach the app's own network.
+"""
+import codecs
+import ipaddress
+import os
+import re
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from io import BytesIO
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+from services import extraction, sqlite_store, webhook
+
+# --- CONFIGURATION ---
+CACHE_DIR = os.environ.get("MARKETING_CACHE_DIR", ".cache")
+CACHE_PATH = os.path.join(CACHE_DIR, "pages.sqlite")
+DEFAULT_TTL = 3600                   # seconds a page is served without revalidating
+MIN_TTL = 300                        # floor for no-cache / short max-age pages, so reruns don't refetch
+KEEP_FOR = 7 * 24 * 3600             # seconds an entry is kept for revalidation / fallback
+CACHE_MAX_BYTES = 50 * 1024 * 1024
+FETCH_TIMEOUT = (5, 20)              # connect, read
+MAX_PAGE_BYTES = 5 * 1024 * 1024
+MAX_PAGE_CHARS = 100_000
+MAX_WORKERS = 8
+MAX_REDIRECTS = 5
+# Local, private and link-local hosts (e.g. the cloud metadata endpoint) are refused
+# unless this is set, which the tests and tools/fetch_report.py do for their local servers.
+ALLOW_PRIVATE_HOSTS = os.environ.get("MARKETING_FETCH_ALLOW_PRIVATE") == "1"
+USER_AGENT = "Mozilla/5.0 (compatible; MarketingSuite reference fetcher)"
+
+# Result sources
+FRESH = "cache"
+REVALIDATED = "revalidated"
+FETCHED = "fetched"
+STALE = "stale"
+
+_MAX_AGE = re.compile(r"max-age\s*=\s*(\d+)", re.IGNORECASE)
+_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE)
+_SPACES = re.compile(r"[ \t\r\f\v]+")
+_BLANK_LINES = re.compile(r"\n\s*\n+")
+
+
+def _create_schema(conn):
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS pages (
+               url TEXT PRIMARY KEY,
+               text TEXT NOT NULL,
+               etag TEXT,
+               last_modified TEXT,
+               size INTEGER NOT NULL,
+               fetched REAL NOT NULL,
+               expires REAL NOT NULL
+           )"""
+    )
+
+
+def _connect():
+    return sqlite_store.connect(CACHE_PATH, _create_schema)
+
+
+# --- READABLE TEXT ---
+class _ReadableText(HTMLParser):
+    # Collects visible text, skipping page chrome; <article>/<main> text is kept
+    # separately so it can win over the rest of the page when present.
+    SKIP = {"script", "style", "noscript", "template", "svg", "nav", "header", "footer", "aside", "form", "iframe"}
+    MAIN = {"article", "main"}
+    BLOCK = {"p", "div", "section", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6",
+             "blockquote", "pre", "table", "ul", "ol", "dd", "dt"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.skip_depth = 0
+        self.main_depth = 0
+        self.in_title = False
+        self.title = ""
+        self.all_parts = []
+        self.main_parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self.skip_depth += 1
+        elif tag in self.MAIN:
+            self.main_depth += 1
+        elif tag == "title":
+            self.in_title = True
+        if tag in self.BLOCK:
+            self._append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in self.MAIN:
+            self.main_depth = max(0, self.main_depth - 1)
+        elif tag == "title":
+            self.in_title = False
+        if tag in self.BLOCK:
+            self._append("\n")
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title += data
+        elif not self.skip_depth:
+            self._append(data)
+
+    def _append(self, text):
+        self.all_parts.append(text)
+        if self.main_depth:
+            self.main_parts.append(text)
+
+
+def _tidy(text):
+    text = _SPACES.sub(" ", text)
+    text = "\n".join(line.strip() for line in text.split("\n"))
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+def readable_text(html):
+    """Returns the title and main readable text of an HTML page."""
+    parser = _ReadableText()
+    parser.feed(html)
+    parser.close()
+    main = _tidy("".join(parser.main_parts))
+    text = main if len(main) >= 200 else _tidy("".join(parser.all_parts))
+    title = _tidy(parser.title)
+    return f"{title}\n\n{text}" if title and not text.startswith(title) else text
+
+
+def _to_text(response, data):
+    content_type = response.headers.get("Content-Type", "").lower()
+    if "pdf" in content_type:
+        document = BytesIO(data)
+        document.name = "page.pdf"
+        text = extraction.extract_text_from_file(document)
+    else:
+        html = data.decode(_encoding(response, data), errors="replace")
+        text = readable_text(html) if "html" in content_type or "<html" in html[:1000].lower() else _tidy(html)
+    return text[:MAX_PAGE_CHARS]
+
+
+def _encoding(response, data):
+    # A charset in the Content-Type header wins, then <meta charset>. requests
+    # defaults text/* without a charset to ISO-8859-1, which garbles UTF-8 pages.
+    content_type = response.headers.get("Content-Type", "")
+    if "charset" in content_type.lower():
+        encoding = _known(requests.utils.get_encoding_from_headers({"content-type": content_type}))
+        if encoding:
+            return encoding
+    match = _CHARSET.search(data[:4096])
+    encoding = _known(match.group(1).decode("ascii")) if match else None
+    if encoding:
+        return encoding
+    try:
+        data.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError:
+        detected = requests.compat.chardet.detect(data) if requests.compat.chardet else None
+        return _known((detected or {}).get("encoding")) or "utf-8"
+
+
+def _known(encoding):
+    try:
+        return codecs.lookup(encoding).name if encoding else None
+    except LookupError:
+        return None
+
+
+def _ttl(response):
+    cache_control = response.headers.get("Cache-Control", "")
+    if "no-cache" in cache_control or "no-store" in cache_control:
+        return MIN_TTL
+    match = _MAX_AGE.search(cache_control)
+    return max(MIN_TTL, int(match.group(1))) if match else DEFAULT_TTL
+
+
+# --- FETCHING ---
+class BlockedURL(ValueError):
+    """Raised for URLs the app will not fetch (scheme or address)."""
+
+
+def _check_url(url):
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise BlockedURL(f"Only http(s) URLs can be fetched: {url}")
+    if ALLOW_PRIVATE_HOSTS:
+        return
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(parsed.hostname, parsed.port or None)}
+    except socket.gaierror as e:
+        raise BlockedURL(f"Could not resolve {parsed.hostname}: {e}") from None
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%", 1)[0])
+        if not ip.is_global or ip.is_multicast:
+            raise BlockedURL(f"{parsed.hostname} resolves to a local or private address ({ip})")
+
+
+def _download(url, cached):
+    headers = {"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml,text/plain,application/pdf;q=0.9"}
+    if cached and cached[1]:
+        headers["If-None-Match"] = cached[1]
+    if cached and cached[2]:
+        headers["If-Modified-Since"] = cached[2]
+
+    # Redirects are followed by hand so every hop's address is checked.
+    for _ in range(MAX_REDIRECTS + 1):
+        _check_url(url)
+        response = webhook.get_session().get(
+            url, headers=headers, timeout=FETCH_TIMEOUT, stream=True, allow_redirects=False
+        )
+        if not response.is_redirect:
+            break
+        response.close()
+        url = urljoin(url, response.headers["Location"])
+    else:
+        raise BlockedURL(f"More than {MAX_REDIRECTS} redirects")
+    try:
+        if response.status_code == 304 and cached:
+            return response, None
+        response.raise_for_status()
+        chunks, size = [], 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > MAX_PAGE_BYTES:
+                break
+        return response, b"".join(chunks)[:MAX_PAGE_BYTES]
+    finally:
+        response.close()
+
+
+def fetch(url):
+    """
+    Returns {"url", "text", "source", "error"} for one URL. `source` is one of
+    FRESH, REVALIDATED, FETCHED or STALE (cached copy after a failed refetch);
+    on failure without a cached copy `text` is "" and `error` says why.
+    """
+    now = time.time()
+    with _connect() as conn:
+        cached = conn.execute(
+            "SELECT text, etag, last_modified, expires FROM pages WHERE url = ?", (url,)
+        ).fetchone()
+    if cached and cached[3] > now:
+        return {"url": url, "text": cached[0], "source": FRESH, "error": None}
+
+    try:
+        response, data = _download(url, cached)
+        ttl = _ttl(response)
+        if data is None:
+            text, source = cached[0], REVALIDATED
+        else:
+            text, source = _to_text(response, data), FETCHED
+    except Exception as e:
+        if cached:
+            return {"url": url, "text": cached[0], "source": STALE, "error": str(e)}
+        return {"url": url, "text": "", "source": None, "error": str(e)}
+
+    now = time.time()
+    with _connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO pages (url, text, etag, last_modified, size, fetched, expires) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                url, text,
+                response.headers.get("ETag") or (cached[1] if cached else None),
+                response.headers.get("Last-Modified") or (cached[2] if cached else None),
+                len(text.encode("utf-8")), now, now + ttl,
+            ),
+        )
+        _evict(conn, now)
+    return {"url": url, "text": text, "source": source, "error": None}
+
+
+def _evict(conn, now):
+    conn.execute("DELETE FROM pages WHERE fetched < ?", (now - KEEP_FOR,))
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+    if total <= CACHE_MAX_BYTES:
+        return
+    for url, size in conn.execute("SELECT url, size FROM pages ORDER BY fetched").fetchall():
+        conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+        total -= size
+        if total <= CACHE_MAX_BYTES:
+            break
+
+
+def fetch_all(urls, max_workers=MAX_WORKERS):
+    """Fetches `urls` concurrently; results come back in the same order."""
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+        return list(executor.map(fetch, urls))
+
+
+def build_url_context(urls):
+    """
+    Fetches the reference URLs and returns (context, unfetched_urls, results).
+    `context` uses the same "--- Content from ... ---" layout as uploaded files;
+    URLs that could not be fetched are returned so n8n can still try them.
+    """
+    results = fetch_all(urls)
+    parts = [f"--- Content from {result['url']} ---\n{result['text']}\n\n" for result in results if result["text"]]
+    unfetched = [result["url"] for result in results if not result["text"]]
+    return "".join(parts), unfetched, results
+
+
+def stats():
+    with _connect() as conn:
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+    return {"entries": entries, "bytes": size}
+
+
+def clear_cache():
+    with _connect() as conn:
+        conn.execute("DELETE FROM pages")
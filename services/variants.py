@@ -0,0 +1,61 @@
+"""
+Parallel multi-variant generation.
+
+Builds tone / audience / CTA combinations from one request and runs them
+concurrently, yielding each result as soon as it finishes, so N variants take
+about as long as the slowest single generation instead of N round trips.
+"""
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# --- CONFIGURATION ---
+MAX_VARIANTS = 6
+MAX_WORKERS = 6
+
+
+def combinations(base_params, options, limit=MAX_VARIANTS):
+    """
+    Returns up to `limit` (label, params) pairs: `base_params` with every
+    combination of the non-empty value lists in `options`
+    ({"tone": [...], "target_audience": [...], ...}). Labels name only the
+    values that differ between variants.
+    """
+    fields = [(field, list(values)) for field, values in options.items() if values]
+    varying = [field for field, values in fields if len(values) > 1]
+    result = []
+    for values in itertools.islice(itertools.product(*(values for _, values in fields)), limit):
+        chosen = dict(zip((field for field, _ in fields), values))
+        label = " · ".join(str(chosen[field]) for field in varying) or "Variant"
+        result.append((label, {**base_params, **chosen}))
+    return result
+
+
+def count(options):
+    """Number of combinations `options` would produce before the limit."""
+    total = 1
+    for values in options.values():
+        total *= max(1, len(values))
+    return total
+
+
+def run(fn, items, max_workers=MAX_WORKERS):
+    """
+    Calls `fn(item)` for every item concurrently and yields
+    (position, result, error, seconds) in completion order.
+    """
+    def timed(item):
+        started = time.perf_counter()
+        try:
+            return fn(item), None, time.perf_counter() - started
+        except Exception as e:
+            return None, e, time.perf_counter() - started
+
+    items = list(items)
+    if not items:
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        futures = {executor.submit(timed, item): position for position, item in enumerate(items)}
+        for future in as_completed(futures):
+            result, error, seconds = future.result()
+            yield futures[future], result, error, seconds
@@ -0,0 +1,372 @@
+"""
+Shared HTTP client for every n8n webhook call.
+
+All views go through `post()` so calls reuse one pooled `requests.Session`
+(keep-alive per host instead of a fresh TCP+TLS handshake per call), get
+connect/read timeouts, retry transient failures with jittered backoff, and are
+hung up after a hard per-call deadline. Calls to an endpoint whose circuit
+breaker is open (services/breaker.py) fail fast, and idempotent generate calls
+that run past their recent p95 latency get one hedged duplicate request.
+Every call is recorded in services/metrics.py by endpoint and action.
+"""
+import codecs
+import gzip
+import itertools
+import json
+import queue
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from services import breaker, metrics
+
+# --- CONFIGURATION ---
+CONNECT_TIMEOUT = 5        # seconds to open the connection to n8n
+READ_TIMEOUT = 180         # seconds to wait for n8n to start/continue answering
+CALL_DEADLINE = 300        # hard wall-clock cap on one attempt, body included
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5         # seconds, doubled per attempt before jitter
+BACKOFF_MAX = 10
+RETRY_STATUSES = {429, 502, 503, 504}
+COMPRESS_MIN_BYTES = 8 * 1024   # gzip request bodies at least this large (when asked to)
+HEDGE_ACTIONS = {"generate", "generate_batch", "generate_template"}
+HEDGE_MIN_SAMPLES = 20     # recent calls needed before the p95 is trusted for hedging
+HEDGE_MIN_DELAY = 1.0      # never hedge sooner than this many seconds
+
+POOL_HOSTS = 10            # distinct hosts kept in the pool
+POOL_PER_HOST = 32         # keep-alive connections per host (>= bulk email workers)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class WebhookTimeout(requests.exceptions.Timeout):
+    """Raised when a webhook call runs past its hard deadline."""
+
+
+def get_session():
+    """Returns the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # Retries are handled in post() so they can honour `idempotent`.
+                adapter = HTTPAdapter(
+                    pool_connections=POOL_HOSTS,
+                    pool_maxsize=POOL_PER_HOST,
+                    max_retries=0,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter for the given (0-based) attempt."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def _never_sent(exc):
+    # True when the request provably never reached n8n (connect timeout,
+    # refused connection, DNS failure), so retrying cannot run a workflow twice.
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(exc.args[0], "reason", None) if exc.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def _retry_after(response):
+    try:
+        return min(BACKOFF_MAX, float(response.headers.get("Retry-After", "")))
+    except ValueError:
+        return None
+
+
+def _encode(payload, headers, compress):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    headers = {"Content-Type": "application/json", **(headers or {})}
+    if compress and len(body) >= COMPRESS_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
+
+
+def _post_once(url, body, headers, timeout, deadline, read_body):
+    started = time.monotonic()
+    response = get_session().post(url, data=body, headers=headers, timeout=timeout, stream=True)
+    if not read_body:
+        return response
+    try:
+        chunks = []
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            chunks.append(chunk)
+            if time.monotonic() - started > deadline:
+                raise WebhookTimeout(f"Webhook call exceeded {deadline}s: {url}")
+        # Hand back a regular, fully-read response (.json()/.text keep working).
+        response._content = b"".join(chunks)
+    finally:
+        response.close()
+    return response
+
+
+def _usable(outcome):
+    response, error = outcome
+    return error is None and response.status_code not in RETRY_STATUSES and response.status_code < 500
+
+
+def _post_hedged(url, body, headers, timeout, deadline, delay, action):
+    # Sends a duplicate request when the first has not answered after `delay`
+    # seconds and returns whichever answers usefully first. The slower one is
+    # left to finish in the background; its response is discarded.
+    results = queue.Queue()
+
+    def attempt(hedge):
+        try:
+            results.put((hedge, (_post_once(url, body, headers, timeout, deadline, True), None)))
+        except Exception as e:
+            results.put((hedge, (None, e)))
+
+    threading.Thread(target=attempt, args=(False,), daemon=True).start()
+    try:
+        hedge, outcome = results.get(timeout=delay)
+    except queue.Empty:
+        threading.Thread(target=attempt, args=(True,), daemon=True).start()
+        hedge, outcome = results.get()
+        if not _usable(outcome):
+            other_hedge, other = results.get()
+            if _usable(other):
+                hedge, outcome = other_hedge, other
+        metrics.record_hedge(url, action, hedge and _usable(outcome), len(body))
+    response, error = outcome
+    if error is not None:
+        raise error
+    return response
+
+
+def _hedge_delay(url, action):
+    p95 = metrics.latency_percentile(url, action, 0.95, HEDGE_MIN_SAMPLES)
+    return None if p95 is None else max(HEDGE_MIN_DELAY, p95)
+
+
+def _action(payload, action):
+    if action:
+        return action
+    return payload.get("action") if isinstance(payload, dict) else None
+
+
+def _send(url, payload, idempotent, headers, timeout, deadline, retries, read_body=True, compress=False,
+          action=None, hedge=False):
+    if not url:
+        raise ValueError("Webhook URL is not configured.")
+
+    action = _action(payload, action)
+    body, headers = _encode(payload, headers, compress)
+    hedge_delay = _hedge_delay(url, action) if hedge and read_body else None
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        breaker.before_call(url)
+        try:
+            if hedge_delay:
+                response = _post_hedged(url, body, headers, timeout, deadline, hedge_delay, action)
+            else:
+                response = _post_once(url, body, headers, timeout, deadline, read_body)
+        except WebhookTimeout as e:
+            breaker.record(url, False, type(e).__name__)
+            # A call that hung for the full deadline is not retried.
+            metrics.observe(url, action, time.monotonic() - started, type(e).__name__,
+                            len(body) * (attempt + 1), 0, attempt)
+            raise
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            breaker.record(url, False, type(e).__name__)
+            if attempt >= retries or not (idempotent or _never_sent(e)):
+                metrics.observe(url, action, time.monotonic() - started, type(e).__name__,
+                                len(body) * (attempt + 1), 0, attempt)
+                raise
+            time.sleep(backoff_delay(attempt))
+        except requests.exceptions.RequestException as e:
+            breaker.record(url, False, type(e).__name__)
+            raise
+        else:
+            breaker.record(url, not breaker.is_failure(response.status_code), f"HTTP {response.status_code}")
+            if response.status_code not in RETRY_STATUSES or not idempotent or attempt >= retries:
+                response.retries = attempt
+                response.request_bytes = len(body) * (attempt + 1)
+                if read_body:
+                    metrics.observe(url, action, time.monotonic() - started, response.status_code,
+                                    response.request_bytes, len(response.content), attempt)
+                return response
+            response.close()
+            delay = _retry_after(response)
+            time.sleep(delay if delay is not None else backoff_delay(attempt))
+        attempt += 1
+
+
+def post(url, payload=None, idempotent=True, headers=None, compress=False, action=None, hedge=None,
+         timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), deadline=CALL_DEADLINE, retries=MAX_RETRIES):
+    """
+    POSTs `payload` as JSON to `url` and returns the `requests.Response`.
+
+    Failures where the request never reached n8n are always retried. Read
+    timeouts, dropped connections and 429/5xx gateway responses are only retried
+    when `idempotent` is True, since n8n may already have run the workflow
+    (e.g. sending an email). Non-retryable errors raise as with `requests.post`.
+    With `compress`, bodies of COMPRESS_MIN_BYTES or more are sent gzip-encoded.
+    `action` labels the call in metrics (defaults to the payload's "action").
+
+    With `hedge` (default: idempotent calls whose action is in HEDGE_ACTIONS),
+    an attempt still unanswered after the endpoint's recent p95 latency gets
+    one duplicate request and the first useful answer wins. Calls to an
+    endpoint whose circuit breaker is open raise breaker.CircuitOpenError.
+    """
+    if hedge is None:
+        hedge = idempotent and _action(payload, action) in HEDGE_ACTIONS
+    return _send(url, payload, idempotent, headers, timeout, deadline, retries, compress=compress, action=action,
+                 hedge=hedge)
+
+
+# --- STREAMING ---
+STREAM_ACCEPT = "text/event-stream, application/x-ndjson;q=0.9, application/json;q=0.8"
+
+
+class WebhookHTTPError(requests.exceptions.HTTPError):
+    """Raised by stream_text() when n8n answers with a non-200 status."""
+
+
+def output_text(data):
+    """
+    Unwraps an n8n JSON body the same way the views do: list wrapper, then
+    "output"/"text". Structured outputs (e.g. LinkedIn) come back as JSON text.
+    """
+    if isinstance(data, list):
+        data = data[0] if data else {}
+    if isinstance(data, dict):
+        value = data.get("output", data.get("text"))
+        if isinstance(value, str):
+            return value
+        return json.dumps(data, ensure_ascii=False)
+    return str(data)
+
+
+def _event_text(raw):
+    # One SSE `data:` payload or NDJSON line -> the text it carries ("" for control events).
+    try:
+        event = json.loads(raw)
+    except ValueError:
+        return raw
+    if isinstance(event, dict):
+        if event.get("type") in ("begin", "end", "error"):
+            return ""
+        for key in ("content", "delta", "text", "output", "token"):
+            if isinstance(event.get(key), str):
+                return event[key]
+        return ""
+    return event if isinstance(event, str) else ""
+
+
+def _iter_chunks(response, started, deadline, url, received):
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    # chunk_size=None yields data as soon as each HTTP chunk arrives.
+    for chunk in response.iter_content(chunk_size=None):
+        received["bytes"] += len(chunk)
+        if time.monotonic() - started > deadline:
+            raise WebhookTimeout(f"Webhook call exceeded {deadline}s: {url}")
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+def _iter_lines(chunks):
+    buffer = ""
+    for text in chunks:
+        buffer += text
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    if buffer:
+        yield buffer
+
+
+def stream_text(url, payload=None, headers=None, compress=False, action=None,
+                timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), deadline=CALL_DEADLINE, retries=MAX_RETRIES):
+    """
+    POSTs `payload` and yields the generated text piece by piece as n8n sends it.
+
+    Understands Server-Sent Events (`data:` lines) and n8n's NDJSON streaming
+    (`{"type": "item", "content": ...}` per line). When the webhook answers with
+    a plain JSON body instead, the whole output is yielded once, so callers can
+    always use this in place of post(). Only the connection phase is retried.
+    The call is recorded in metrics once the stream has been consumed.
+    """
+    headers = {"Accept": STREAM_ACCEPT, **(headers or {})}
+    started = time.monotonic()
+    response = _send(url, payload, True, headers, timeout, deadline, retries, read_body=False, compress=compress,
+                     action=action)
+    received = {"bytes": 0}
+    status = response.status_code
+    try:
+        if response.status_code != 200:
+            received["bytes"] = len(response.content)
+            raise WebhookHTTPError(f"Error {response.status_code}: {response.text}", response=response)
+
+        content_type = response.headers.get("Content-Type", "").lower()
+        chunks = _iter_chunks(response, started, deadline, url, received)
+
+        if content_type.startswith(("text/plain", "text/markdown")):
+            # Raw chunked text: every chunk is output as-is.
+            yield from chunks
+            return
+
+        lines = _iter_lines(chunks)
+
+        if "text/event-stream" in content_type:
+            for line in lines:
+                if line.startswith("data:"):
+                    data = line[5:].lstrip()
+                    if data == "[DONE]":
+                        # Drain the terminating chunk so the connection returns to the pool.
+                        for _ in lines:
+                            pass
+                        break
+                    text = _event_text(data)
+                    if text:
+                        yield text
+            return
+
+        # NDJSON (possibly labelled application/json by n8n) vs. a single JSON body:
+        # stream while lines parse as events, otherwise collect and parse once.
+        first = next(lines, "")
+        try:
+            event = json.loads(first)
+        except ValueError:
+            event = None
+        if isinstance(event, dict) and event.get("type") in ("begin", "item"):
+            for line in itertools.chain([first], lines):
+                text = _event_text(line) if line.strip() else ""
+                if text:
+                    yield text
+            return
+
+        body = "\n".join(itertools.chain([first], lines))
+        try:
+            yield output_text(json.loads(body))
+        except ValueError:
+            yield body
+    except WebhookTimeout as e:
+        status = type(e).__name__
+        breaker.record(url, False, status)
+        raise
+    finally:
+        response.close()
+        # Recorded once the stream is consumed (or abandoned), so latency covers the whole body.
+        metrics.observe(url, _action(payload, action), time.monotonic() - started, status,
+                        response.request_bytes, received["bytes"], response.retries)
@@ -0,0 +1,28 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+import pytest  # noqa: E402
+
+import mock_n8n  # noqa: E402
+from services import breaker  # noqa: E402
+
+
+@pytest.fixture
+def mock_server():
+    """Starts mock n8n servers with the given options; all are shut down after the test."""
+    servers = []
+
+    def start(**options):
+        server, base_url = mock_n8n.start_in_thread(**{"token_delay": 0.0, "seed": 1, **options})
+        servers.append(server)
+        return server, base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+    breaker.reset()
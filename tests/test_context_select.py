@@ -0,0 +1,41 @@
+from services import context_select
+
+TEXT = (
+    "--- Content from report.pdf ---\n"
+    + "\n\n".join(f"Paragraph {i} about warehouse staffing and shift planning." for i in range(40))
+    + "\n\nRetail pricing strategy drives margin in every store.\n\n"
+    + "--- Content from site ---\nCookie notice.\n\nCookie notice.\n\nPricing pages explain discounts.\n"
+)
+
+
+def test_selection_prefers_query_relevant_chunks_within_budget():
+    context, report = context_select.select_context(TEXT, "pricing", 400)
+
+    assert "Retail pricing strategy" in context
+    assert len(context) <= 400 + 100   # headers are not counted against the budget
+    assert report["selected_chunks"] < report["chunks"]
+
+
+def test_repeated_boilerplate_is_dropped():
+    context, report = context_select.select_context(TEXT, "", 0)
+
+    assert context.count("Cookie notice.") == 1
+    assert report["duplicates_removed"] == 1
+
+
+def test_repeat_calls_return_independent_reports():
+    _, first = context_select.select_context(TEXT, "pricing", 400)
+    first["selected_chars"] = -1
+
+    _, second = context_select.select_context(TEXT, "pricing", 400)
+
+    assert second["selected_chars"] > 0
+
+
+def test_memo_does_not_keep_the_full_text():
+    text = "Short reference text."
+    context, _ = context_select.select_context(text, "reference", 10_000)
+
+    assert context is text
+    assert all(entry[0] is None or len(entry[0]) <= context_select.MEMO_MAX_CHARS
+               for entry in context_select._memo.values())
@@ -0,0 +1,65 @@
+import threading
+import time
+
+import pytest
+
+from services import email_send, job_store, leads
+
+
+@pytest.fixture(autouse=True)
+def store_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_store, "STORE_PATH", str(tmp_path / "jobs.sqlite"))
+
+
+@pytest.fixture
+def send_server(mock_server):
+    server, base_url = mock_server()
+    return server, f"{base_url}/webhook/email-send"
+
+
+MESSAGES = [(0, "ada@acme.com", "Hello", "Body")]
+
+
+def test_resend_of_the_same_list_is_skipped(send_server):
+    server, url = send_server
+    email_send.send_emails(url, MESSAGES, per_minute=600, scope="list-a")
+    requests_after_first = server.state["requests"]
+
+    summary = email_send.send_emails(url, MESSAGES, per_minute=600, scope="list-a")
+
+    assert summary["results"] == {0: (leads.SENT, "")}
+    assert server.state["requests"] == requests_after_first
+
+
+def test_same_email_in_another_list_is_sent(send_server):
+    server, url = send_server
+    email_send.send_emails(url, MESSAGES, per_minute=600, scope="list-a")
+    requests_after_first = server.state["requests"]
+
+    email_send.send_emails(url, MESSAGES, per_minute=600, scope="list-b")
+
+    assert server.state["requests"] == requests_after_first + 1
+
+
+def test_old_sent_log_entries_are_pruned(monkeypatch):
+    job_store.mark_sent("old-key", "ada@acme.com")
+    monkeypatch.setattr(job_store.time, "time", lambda now=time.time(): now + job_store.SENT_TTL + 1)
+
+    job_store.prune_sent()
+
+    assert not job_store.was_sent("old-key")
+
+
+def test_first_burst_stays_within_the_per_minute_limit(send_server):
+    _, url = send_server
+    messages = [(i, f"lead{i}@acme.com", "Hello", "Body") for i in range(3)]
+    started = time.monotonic()
+
+    # 1 per minute with 4 workers: one email now and the next only after a
+    # minute, so cancel shortly after the first one.
+    cancel = threading.Event()
+    threading.Timer(0.5, cancel.set).start()
+    summary = email_send.send_emails(url, messages, per_minute=1, max_workers=4, cancel_event=cancel)
+
+    assert summary["sent"] == 1
+    assert time.monotonic() - started < 5
@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+from services import history
+
+
+@pytest.fixture
+def history_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "history.sqlite")
+    monkeypatch.setattr(history, "HISTORY_PATH", path)
+    return path
+
+
+def test_search_finds_outputs_by_word_prefix(history_path):
+    history.record(history.BLOG, "Supply chain forecasting with AI", {"query": "AI in retail"})
+    history.record(history.BLOG, "Onboarding checklists", {"query": "HR"})
+
+    assert [entry["title"] for entry in history.search(history.BLOG, "forecast")] == ["AI in retail"]
+
+
+def test_search_works_after_the_database_is_recreated(history_path):
+    history.record(history.BLOG, "First draft", {"query": "old"})
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(history_path + suffix):
+            os.remove(history_path + suffix)
+
+    history.record(history.BLOG, "Second draft about pricing", {"query": "new"})
+
+    assert [entry["title"] for entry in history.search(history.BLOG, "pricing")] == ["new"]
@@ -0,0 +1,56 @@
+import io
+
+import openpyxl
+import pytest
+
+from services import leads
+
+HEADER = "first_name,last_name,org_name,email\n"
+
+
+def csv_upload(text, name="leads.csv"):
+    upload = io.BytesIO(text.encode("utf-8"))
+    upload.name = name
+    return upload
+
+
+def xlsx_upload(rows):
+    workbook = openpyxl.Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    upload = io.BytesIO()
+    workbook.save(upload)
+    upload.seek(0)
+    upload.name = "leads.xlsx"
+    return upload
+
+
+def test_valid_rows_are_kept_and_bad_ones_reported():
+    df, rejected, rejected_count = leads.read_leads(csv_upload(
+        HEADER + "Ada,Lovelace,Acme, ADA@acme.com \nBob,Smith,Acme,not-an-email\nAda,L,Acme,ada@acme.com\n"
+    ))
+
+    assert df["email"].tolist() == ["ada@acme.com"]
+    assert rejected_count == 2
+    assert rejected["reason"].tolist() == ["invalid email", "duplicate email"]
+    assert rejected["row"].tolist() == [3, 4]
+
+
+@pytest.mark.parametrize("upload", [
+    csv_upload(""),
+    csv_upload(HEADER),
+    xlsx_upload([["first_name", "last_name", "org_name", "email"]]),
+], ids=["empty csv", "header-only csv", "header-only xlsx"])
+def test_files_without_rows_raise_value_error(upload):
+    with pytest.raises(ValueError):
+        leads.read_leads(upload)
+
+
+def test_file_where_every_row_is_rejected_raises_value_error():
+    with pytest.raises(ValueError, match="valid, unique email"):
+        leads.read_leads(csv_upload(HEADER + "Bob,Smith,Acme,not-an-email\n"))
+
+
+def test_missing_column_raises_value_error():
+    with pytest.raises(ValueError, match="email"):
+        leads.read_leads(csv_upload("first_name,last_name,org_name\nAda,Lovelace,Acme\n"))
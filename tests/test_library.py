@@ -0,0 +1,55 @@
+import pytest
+
+from services import extraction, library
+
+
+class Upload:
+    def __init__(self, name, data):
+        self.name = name
+        self._data = data
+
+    def getvalue(self):
+        return self._data
+
+
+@pytest.fixture(autouse=True)
+def library_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(library, "LIBRARY_PATH", str(tmp_path / "library.sqlite"))
+    extraction.clear_cache()
+    yield
+    extraction.clear_cache()
+
+
+def test_repeat_extraction_is_served_from_memory():
+    upload = Upload("notes.txt", b"Quarterly retail forecast")
+    before = extraction.cache_stats()
+
+    library.extract(upload)
+    library.extract(upload)
+
+    stats = extraction.cache_stats()
+    assert (stats["hits"] - before["hits"], stats["misses"] - before["misses"]) == (1, 1)
+    assert [doc["name"] for doc in library.search("forecast")] == ["notes.txt"]
+
+
+def test_document_removed_from_library_is_saved_again_on_upload():
+    upload = Upload("notes.txt", b"Quarterly retail forecast")
+    library.extract(upload)
+    library.remove(library.search("forecast")[0]["sha256"])
+
+    library.extract(upload)
+
+    assert [doc["name"] for doc in library.search("forecast")] == ["notes.txt"]
+
+
+def test_empty_text_is_not_saved():
+    library.extract(Upload("broken.pdf", b"not a pdf"))
+
+    assert library.stats()["documents"] == 0
+
+
+def test_build_file_context_uses_the_library():
+    context = library.build_file_context([Upload("a.txt", b"alpha"), Upload("b.txt", b"beta")])
+
+    assert context == "--- Content from a.txt ---\nalpha\n\n--- Content from b.txt ---\nbeta\n\n"
+    assert library.stats()["documents"] == 2
@@ -0,0 +1,46 @@
+import pytest
+
+from services import webhook
+
+PAYLOAD = {"action": "generate", "query": "AI in retail", "tone": "Professional"}
+
+
+def expected_output(start, path, payload):
+    # What the non-streaming webhook returns for the same request
+    server, base_url = start(stream="none")
+    return webhook.output_text(webhook.post(f"{base_url}{path}", payload).json())
+
+
+@pytest.mark.parametrize("mode", ["sse", "ndjson", "text"])
+def test_streaming_modes_yield_the_full_output_in_pieces(mock_server, mode):
+    expected = expected_output(mock_server, "/webhook/blog", PAYLOAD)
+    _, base_url = mock_server(stream=mode)
+
+    chunks = list(webhook.stream_text(f"{base_url}/webhook/blog", PAYLOAD))
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == expected
+
+
+def test_json_response_is_yielded_once(mock_server):
+    expected = expected_output(mock_server, "/webhook/blog", PAYLOAD)
+    _, base_url = mock_server(stream="none")
+
+    chunks = list(webhook.stream_text(f"{base_url}/webhook/blog", PAYLOAD))
+
+    assert chunks == [expected]
+
+
+@pytest.mark.parametrize("shape", ["list", "string"])
+def test_json_fallback_unwraps_response_shapes(mock_server, shape):
+    expected = expected_output(mock_server, "/webhook/blog", PAYLOAD)
+    _, base_url = mock_server(stream="none", shape=shape)
+
+    assert "".join(webhook.stream_text(f"{base_url}/webhook/blog", PAYLOAD)) == expected
+
+
+def test_http_error_raises(mock_server):
+    _, base_url = mock_server(stream="sse", error_rate=1.0, error_statuses=(400,))
+
+    with pytest.raises(webhook.WebhookHTTPError):
+        list(webhook.stream_text(f"{base_url}/webhook/blog", PAYLOAD))
@@ -0,0 +1,205 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services import url_fetch
+
+ARTICLE = "<html><head>{meta}<title>Café notes</title></head><body><p>Crème brûlée for {who}.</p></body></html>"
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    # Serves self.server.pages[path] = {"body", "headers", "etag", "last_modified"}
+    def do_GET(self):
+        page = self.server.pages.get(self.path)
+        self.server.requests.append((self.path, dict(self.headers)))
+        if page is None:
+            self.send_error(503)
+            return
+        if "redirect" in page:
+            self.send_response(302)
+            self.send_header("Location", page["redirect"])
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        etag, last_modified = page.get("etag"), page.get("last_modified")
+        if (etag and self.headers.get("If-None-Match") == etag) or (
+                last_modified and self.headers.get("If-Modified-Since") == last_modified):
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        for name, value in page.get("headers", {}).items():
+            self.send_header(name, value)
+        if etag:
+            self.send_header("ETag", etag)
+        if last_modified:
+            self.send_header("Last-Modified", last_modified)
+        self.send_header("Content-Length", str(len(page["body"])))
+        self.end_headers()
+        self.wfile.write(page["body"])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def pages(tmp_path, monkeypatch):
+    monkeypatch.setattr(url_fetch, "CACHE_PATH", str(tmp_path / "pages.sqlite"))
+    monkeypatch.setattr(url_fetch, "ALLOW_PRIVATE_HOSTS", True)   # the stand-in is on loopback
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    server.pages, server.requests = {}, []
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def later(monkeypatch, seconds):
+    now = url_fetch.time.time()
+    monkeypatch.setattr(url_fetch.time, "time", lambda: now + seconds)
+
+
+def html_page(meta="", who="everyone", **extra):
+    return {"body": ARTICLE.format(meta=meta, who=who).encode("utf-8"),
+            "headers": {"Content-Type": "text/html", "Cache-Control": "max-age=600"}, **extra}
+
+
+def test_fresh_page_is_served_from_cache(pages):
+    pages.pages["/a"] = html_page()
+
+    first = url_fetch.fetch(pages.base_url + "/a")
+    second = url_fetch.fetch(pages.base_url + "/a")
+
+    assert first["source"] == url_fetch.FETCHED
+    assert second == {**first, "source": url_fetch.FRESH}
+    assert len(pages.requests) == 1
+
+
+@pytest.mark.parametrize("validator", [{"etag": '"v1"'}, {"last_modified": "Wed, 01 Jan 2025 00:00:00 GMT"}])
+def test_expired_page_is_revalidated_with_304(pages, monkeypatch, validator):
+    pages.pages["/a"] = html_page(**validator)
+    first = url_fetch.fetch(pages.base_url + "/a")
+
+    later(monkeypatch, 601)
+    second = url_fetch.fetch(pages.base_url + "/a")
+
+    assert second["source"] == url_fetch.REVALIDATED
+    assert second["text"] == first["text"]
+    sent = pages.requests[-1][1]
+    assert sent.get("If-None-Match") == validator.get("etag")
+    assert sent.get("If-Modified-Since") == validator.get("last_modified")
+
+
+def test_changed_page_is_downloaded_again_after_expiry(pages, monkeypatch):
+    pages.pages["/a"] = html_page(etag='"v1"')
+    url_fetch.fetch(pages.base_url + "/a")
+
+    pages.pages["/a"] = html_page(who="the new team", etag='"v2"')
+    later(monkeypatch, 601)
+    result = url_fetch.fetch(pages.base_url + "/a")
+
+    assert result["source"] == url_fetch.FETCHED
+    assert "the new team" in result["text"]
+
+
+def test_no_cache_pages_stay_fresh_for_min_ttl(pages, monkeypatch):
+    pages.pages["/a"] = {**html_page(), "headers": {"Content-Type": "text/html", "Cache-Control": "no-cache"}}
+    url_fetch.fetch(pages.base_url + "/a")
+
+    later(monkeypatch, url_fetch.MIN_TTL - 1)
+    assert url_fetch.fetch(pages.base_url + "/a")["source"] == url_fetch.FRESH
+    later(monkeypatch, url_fetch.MIN_TTL + 1)
+    assert url_fetch.fetch(pages.base_url + "/a")["source"] == url_fetch.FETCHED
+
+
+def test_stale_copy_is_used_when_refetch_fails(pages, monkeypatch):
+    pages.pages["/a"] = html_page()
+    first = url_fetch.fetch(pages.base_url + "/a")
+
+    del pages.pages["/a"]    # the stand-in now answers 503
+    later(monkeypatch, 601)
+    result = url_fetch.fetch(pages.base_url + "/a")
+
+    assert result["source"] == url_fetch.STALE
+    assert result["text"] == first["text"]
+
+
+def test_download_is_capped_at_max_page_bytes(pages, monkeypatch):
+    monkeypatch.setattr(url_fetch, "MAX_PAGE_BYTES", 1000)
+    pages.pages["/big"] = {"body": b"word " * 20_000, "headers": {"Content-Type": "text/plain"}}
+
+    result = url_fetch.fetch(pages.base_url + "/big")
+
+    assert result["source"] == url_fetch.FETCHED
+    assert 0 < len(result["text"]) <= 1000
+
+
+@pytest.mark.parametrize("meta, content_type, encoding", [
+    ('<meta charset="utf-8">', "text/html", "utf-8"),
+    ("", "text/html", "utf-8"),
+    ("", "text/html; charset=windows-1252", "cp1252"),
+    ('<meta http-equiv="Content-Type" content="text/html; charset=iso-8859-1">', "text/html", "latin-1"),
+])
+def test_pages_are_decoded_with_their_charset(pages, meta, content_type, encoding):
+    pages.pages["/a"] = {"body": ARTICLE.format(meta=meta, who="everyone").encode(encoding),
+                         "headers": {"Content-Type": content_type}}
+
+    text = url_fetch.fetch(pages.base_url + "/a")["text"]
+
+    assert "Café notes" in text
+    assert "Crème brûlée for everyone." in text
+
+
+class FakeResolver:
+    # Stands in for the socket module in url_fetch's address check only.
+    gaierror = socket.gaierror
+
+    def __init__(self, addresses):
+        self.addresses = addresses
+
+    def getaddrinfo(self, host, port):
+        return [(socket.AF_INET, socket.SOCK_STREAM, 0, "", (self.addresses[host], port or 0))]
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://10.0.0.5/admin",
+    "http://[::1]/",
+    "file:///etc/passwd",
+    "ftp://example.com/file",
+])
+def test_local_private_and_non_http_urls_are_refused(monkeypatch, tmp_path, url):
+    monkeypatch.setattr(url_fetch, "CACHE_PATH", str(tmp_path / "pages.sqlite"))
+
+    result = url_fetch.fetch(url)
+
+    assert result["text"] == "" and result["source"] is None
+    assert "address" in result["error"] or "http(s)" in result["error"]
+
+
+def test_redirect_to_a_private_address_is_refused(pages, monkeypatch):
+    port = pages.server_address[1]
+    pages.pages["/a"] = {"redirect": f"http://internal.test:{port}/secret", "body": b""}
+    pages.pages["/secret"] = html_page()
+    monkeypatch.setattr(url_fetch, "ALLOW_PRIVATE_HOSTS", False)
+    # The first hop "looks" public to the check; the redirect target does not.
+    monkeypatch.setattr(url_fetch, "socket", FakeResolver({"127.0.0.1": "93.184.216.34", "internal.test": "10.1.2.3"}))
+
+    result = url_fetch.fetch(pages.base_url + "/a")
+
+    assert "private address" in result["error"]
+    assert [path for path, _ in pages.requests] == ["/a"]
+
+
+def test_redirects_are_followed(pages):
+    pages.pages["/old"] = {"redirect": "/a", "body": b""}
+    pages.pages["/a"] = html_page()
+
+    result = url_fetch.fetch(pages.base_url + "/old")
+
+    assert result["source"] == url_fetch.FETCHED
+    assert "Crème brûlée" in result["text"]
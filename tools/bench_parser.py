@@ -0,0 +1,111 @@
+"""
+Per-call latency of services.llm_parse.parse_llm_response over a corpus of
+malformed n8n/LLM email outputs (tools/parser_corpus.json) plus generated
+large and pathological inputs, next to the previous json -> ast -> regex parser.
+
+Usage:
+    python tools/bench_parser.py [--repeat 200] [--large-kb 256]
+"""
+import argparse
+import ast
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.llm_parse import parse_llm_response  # noqa: E402
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "parser_corpus.json")
+
+
+def legacy_parse(content):
+    # The parser this module replaced, kept here as the baseline.
+    if not isinstance(content, str):
+        if isinstance(content, dict):
+            return content
+        return {"body": str(content)}
+    try:
+        parsed = json.loads(content)
+        if isinstance(parsed, dict): return parsed
+    except: pass  # noqa: E701,E722
+    try:
+        parsed = ast.literal_eval(content.replace('\n', '\\n'))
+        if isinstance(parsed, dict): return parsed
+    except: pass  # noqa: E701,E722
+    try:
+        subject_match = re.search(r"['\"]subject['\"]\s*:\s*['\"](.*?)['\"](?:\s*,|\s*})", content, re.IGNORECASE | re.DOTALL)
+        body_match = re.search(r"['\"]body['\"]\s*:\s*['\"](.*?)['\"](?:\s*,|\s*})", content, re.IGNORECASE | re.DOTALL)
+        if subject_match or body_match:
+            return {
+                "subject": subject_match.group(1) if subject_match else "",
+                "body": body_match.group(1) if body_match else ""
+            }
+    except: pass  # noqa: E701,E722
+    return {"subject": "", "body": content}
+
+
+def generated_cases(large_kb):
+    paragraph = "We help retail teams forecast demand and cut stock-outs across every store. "
+    body = "Hi Dana,\n\n" + paragraph * (large_kb * 1024 // len(paragraph)) + "\n\nBest regards"
+    return [
+        {"name": f"large_valid_{large_kb}kb", "input": json.dumps({"subject": "Quick idea", "body": body}),
+         "subject": "Quick idea", "body": body},
+        {"name": f"large_raw_newlines_{large_kb}kb", "input": '{"subject": "Quick idea", "body": "' + body + '"}',
+         "subject": "Quick idea", "body": body},
+        # No value ever terminates: every `"body": "` start makes a DOTALL .*? search rescan the rest.
+        {"name": "repeated_unterminated_keys", "input": '"body": "x" y ' * 4000,
+         "subject": None, "body": None},
+    ]
+
+
+def time_calls(parse, text, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parse(text)
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+def correct(parse, case):
+    if case["subject"] is None:
+        return "-"
+    result = {str(k).lower(): v for k, v in parse(case["input"]).items()}
+    ok = result.get("subject", "") == case["subject"] and result.get("body", "") == case["body"]
+    return "ok" if ok else "WRONG"
+
+
+def fmt(seconds):
+    return f"{seconds * 1e6:,.1f}µs" if seconds < 1e-3 else f"{seconds * 1e3:,.2f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM email parser latency, new vs. previous implementation.")
+    parser.add_argument("--repeat", type=int, default=200, help="calls per case (generated cases use fewer)")
+    parser.add_argument("--large-kb", type=int, default=256, help="body size of the generated large cases")
+    args = parser.parse_args()
+
+    with open(CORPUS, encoding="utf-8") as f:
+        cases = json.load(f)
+    generated = generated_cases(args.large_kb)
+
+    print(f"{'Case':<30}{'Size':>9}{'New p50':>12}{'New p95':>12}{'Old p50':>12}{'Old p95':>12}{'New':>7}{'Old':>7}")
+    totals = {"new": 0.0, "old": 0.0}
+    for case in cases + generated:
+        repeat = args.repeat if case not in generated else max(3, args.repeat // 20)
+        new_p50, new_p95 = time_calls(parse_llm_response, case["input"], repeat)
+        old_p50, old_p95 = time_calls(legacy_parse, case["input"], repeat)
+        totals["new"] += new_p50
+        totals["old"] += old_p50
+        print(f"{case['name']:<30}{len(case['input']):>9,}{fmt(new_p50):>12}{fmt(new_p95):>12}"
+              f"{fmt(old_p50):>12}{fmt(old_p95):>12}{correct(parse_llm_response, case):>7}{correct(legacy_parse, case):>7}")
+    print(f"{'Sum of p50':<39}{fmt(totals['new']):>12}{'':>12}{fmt(totals['old']):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Throughput and latency benchmarks against the local mock n8n server
+(tools/mock_n8n.py), so nothing touches n8n cloud:
+
+    bulk email   leads/s for per-lead, batched and template generation
+    blog/video   time to first output (streaming) vs. full response
+    refine       round-trip time for email refine and blog refine with and
+                 without context handles
+    tail         p50/p95/p99 of generate calls with and without hedging, and
+                 how long bulk email takes to fail against a failing endpoint
+                 with and without the circuit breaker
+
+Usage:
+    python tools/bench_throughput.py [--leads 200] [--latency 0.5 --latency-dist lognormal]
+                                     [--error-rate 0.05] [--shape mixed]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import mock_n8n  # noqa: E402
+from refine_bytes import reference_text  # noqa: E402
+from services import breaker, bulk_email, context_handles, metrics, webhook  # noqa: E402
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def lead_table(count, organisations):
+    import pandas as pd
+
+    return pd.DataFrame({
+        "first_name": [f"Lead{i}" for i in range(count)],
+        "last_name": [f"Surname{i}" for i in range(count)],
+        "email": [f"lead{i}@example.com" for i in range(count)],
+        "org_name": [f"Organisation {i % organisations}" for i in range(count)],
+    })
+
+
+def bench_bulk_email(base_url, server, args):
+    url = f"{base_url}/webhook/email-generate"
+    df = lead_table(args.leads, args.organisations)
+    params = {"query": "Cutting stock-outs with AI", "tone": "Professional", "word_limit": 300,
+              "cta_choice": "Book a free consultation", "reference_urls": [], "reference_file_content": ""}
+
+    print(f"\nBulk email: {args.leads} leads across {args.organisations} organisations")
+    print(f"{'Mode':<26}{'Workers':>8}{'Calls':>8}{'Failed':>8}{'Seconds':>10}{'Leads/s':>10}")
+    runs = [("per lead", workers, 1) for workers in args.workers]
+    runs += [(f"batch of {size}", max(args.workers), size) for size in args.batch_sizes if size > 1]
+    runs += [("template per org", max(args.workers), None)]
+    for label, workers, batch_size in runs:
+        before = server.state["requests"]
+        started = time.perf_counter()
+        if batch_size is None:
+            result, _ = bulk_email.generate_template_emails(df, params, url, workers)
+        else:
+            result = bulk_email.generate_bulk_emails(df, params, url, workers, batch_size)
+        elapsed = time.perf_counter() - started
+        failed = int((result["Status"] == "Failed").sum())
+        print(f"{label:<26}{workers:>8}{server.state['requests'] - before:>8}{failed:>8}"
+              f"{elapsed:>10.2f}{args.leads / elapsed:>10.1f}")
+
+
+def bench_time_to_output(base_url, stream_url, args):
+    print(f"\nTime to output ({args.runs} runs each, p50 / p95 in seconds)")
+    print(f"{'Endpoint':<16}{'Full response':>18}{'Stream first text':>22}{'Stream complete':>20}")
+    for name in ("blog", "video-script"):
+        payload = {"action": "generate", "query": "AI in retail", "tone": "Professional",
+                   "target_audience": "Retail", "cta_choice": "Talk to our experts"}
+        full, first, complete = [], [], []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            try:
+                webhook.post(f"{base_url}/webhook/{name}", payload)
+            except Exception:
+                continue
+            full.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            try:
+                for i, _chunk in enumerate(webhook.stream_text(f"{stream_url}/webhook/{name}", payload)):
+                    if i == 0:
+                        first.append(time.perf_counter() - started)
+            except Exception:
+                continue
+            complete.append(time.perf_counter() - started)
+
+        def cell(samples):
+            return f"{percentile(samples, 0.5):.2f} / {percentile(samples, 0.95):.2f}" if samples else "n/a"
+
+        print(f"{name:<16}{cell(full):>18}{cell(first):>22}{cell(complete):>20}")
+
+
+def bench_refine(base_url, server, args):
+    context = reference_text(args.context_kb)
+    print(f"\nRefine round trip ({args.runs} runs each, {args.context_kb} KB reference context)")
+    print(f"{'Call':<28}{'p50 (s)':>10}{'p95 (s)':>10}{'Bytes/call':>14}")
+
+    email_payload = {"current_subject": "Quick idea", "current_email": "Hi Dana,\n\nShort note.",
+                     "instruction": "Make it warmer", "reference_file_content": context}
+    blog_payload = {"action": "refine", "current_blog_content": mock_n8n.render_document({"query": "AI"}),
+                    "refine_instruction": "Add a summary", "query": "AI", "reference_file_content": context}
+    calls = [
+        ("email refine", f"{base_url}/webhook/email-refine", email_payload, False),
+        ("email refine (handles)", f"{base_url}/webhook/email-refine", email_payload, True),
+        ("blog refine", f"{base_url}/webhook/blog", blog_payload, False),
+        ("blog refine (handles)", f"{base_url}/webhook/blog", blog_payload, True),
+    ]
+    for label, url, payload, handles in calls:
+        if handles:
+            # Registration is a one-off per context; keep it out of the round-trip numbers.
+            context_handles.prepare(url, payload)
+        samples = []
+        before = server.state["request_bytes"]
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            try:
+                context_handles.post(url, payload, enabled=handles)
+            except Exception:
+                continue
+            samples.append(time.perf_counter() - started)
+        if samples:
+            per_call = (server.state["request_bytes"] - before) / args.runs
+            print(f"{label:<28}{statistics.median(samples):>10.3f}{percentile(samples, 0.95):>10.3f}{per_call:>14,.0f}")
+
+
+def bench_tail(base_url, server, args):
+    url = f"{base_url}/webhook/blog"
+    payload = {"action": "generate", "query": "AI in retail", "tone": "Professional"}
+    print(f"\nTail latency ({args.tail_runs} sequential generate calls, seconds)")
+    # Mock latencies are far below real generate calls; let the p95 alone decide when to hedge.
+    min_delay, webhook.HEDGE_MIN_DELAY = webhook.HEDGE_MIN_DELAY, 0.0
+    print(f"{'Hedging':<12}{'p50':>8}{'p95':>8}{'p99':>8}{'Max':>8}{'Extra requests':>16}")
+    for hedge in (False, True):
+        metrics.reset()
+        for _ in range(webhook.HEDGE_MIN_SAMPLES):
+            webhook.post(url, payload, hedge=False)
+        before = server.state["requests"]
+        samples = []
+        for _ in range(args.tail_runs):
+            started = time.perf_counter()
+            try:
+                webhook.post(url, payload, hedge=hedge)
+            except Exception:
+                continue
+            samples.append(time.perf_counter() - started)
+        extra = server.state["requests"] - before - args.tail_runs
+        print(f"{'on' if hedge else 'off':<12}{percentile(samples, 0.5):>8.2f}{percentile(samples, 0.95):>8.2f}"
+              f"{percentile(samples, 0.99):>8.2f}{max(samples):>8.2f}{extra:>16}")
+    webhook.HEDGE_MIN_DELAY = min_delay
+
+    failing, failing_url = mock_n8n.start_in_thread(latency=args.latency, error_rate=1.0, error_statuses=(503,))
+    df = lead_table(args.tail_leads, args.organisations)
+    params = {"query": "Cutting stock-outs with AI", "tone": "Professional", "reference_file_content": ""}
+    print(f"\nFailing endpoint ({args.tail_leads} leads, every call answers 503)")
+    print(f"{'Circuit breaker':<18}{'Calls':>8}{'Seconds':>10}")
+    threshold = breaker.FAILURE_THRESHOLD
+    for enabled in (False, True):
+        breaker.reset()
+        breaker.FAILURE_THRESHOLD = threshold if enabled else float("inf")
+        before = failing.state["requests"]
+        started = time.perf_counter()
+        bulk_email.generate_bulk_emails(df, params, f"{failing_url}/webhook/email-generate", 4, 1)
+        print(f"{'on' if enabled else 'off':<18}{failing.state['requests'] - before:>8}"
+              f"{time.perf_counter() - started:>10.2f}")
+    breaker.FAILURE_THRESHOLD = threshold
+    breaker.reset()
+    failing.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput benchmarks against the mock n8n server.")
+    parser.add_argument("--leads", type=int, default=200)
+    parser.add_argument("--organisations", type=int, default=20)
+    parser.add_argument("--workers", default="1,8,32", help="comma-separated worker counts for per-lead runs")
+    parser.add_argument("--batch-sizes", default="10", help="comma-separated leads-per-request sizes")
+    parser.add_argument("--runs", type=int, default=10, help="samples per time-to-output / refine row")
+    parser.add_argument("--context-kb", type=int, default=512)
+    parser.add_argument("--tail-runs", type=int, default=200, help="generate calls per hedging row")
+    parser.add_argument("--tail-leads", type=int, default=40, help="leads in the failing-endpoint run")
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--latency-dist", choices=["fixed", "uniform", "lognormal", "exponential"], default="lognormal")
+    parser.add_argument("--jitter", type=float, default=0.4)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--shape", choices=mock_n8n.SHAPES + ["mixed"], default="native")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--skip", default="", help="comma-separated sections to skip: bulk,output,refine,tail")
+    args = parser.parse_args()
+    args.workers = [int(w) for w in args.workers.split(",")]
+    args.batch_sizes = [int(b) for b in args.batch_sizes.split(",") if b.strip()]
+    skip = set(args.skip.split(","))
+
+    options = dict(latency=args.latency, latency_dist=args.latency_dist, jitter=args.jitter,
+                   token_delay=args.token_delay, error_rate=args.error_rate, shape=args.shape, seed=args.seed)
+    server, base_url = mock_n8n.start_in_thread(**options)
+    stream_server, stream_url = mock_n8n.start_in_thread(stream="sse", **options)
+    print(f"Mock n8n: latency {args.latency}s {args.latency_dist} (jitter {args.jitter}), "
+          f"error rate {args.error_rate:.0%}, shape {args.shape}")
+
+    if "bulk" not in skip:
+        bench_bulk_email(base_url, server, args)
+    if "output" not in skip:
+        bench_time_to_output(base_url, stream_url, args)
+    if "refine" not in skip:
+        bench_refine(base_url, server, args)
+    if "tail" not in skip:
+        bench_tail(base_url, server, args)
+
+    server.shutdown()
+    stream_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
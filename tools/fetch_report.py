@@ -0,0 +1,76 @@
+"""
+Reference-URL fetching against the mock server's /pages/ (tools/mock_n8n.py):
+cold concurrent fetch vs. one-by-one, fresh cache hits, and 304 revalidation
+once pages expire. Uses a throwaway cache directory. Pages stay fresh for at
+least url_fetch.MIN_TTL, so the cache's clock is moved past it instead of
+waiting.
+
+Usage:
+    python tools/fetch_report.py [--pages 8] [--page-latency 0.3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ["MARKETING_CACHE_DIR"] = tempfile.mkdtemp(prefix="fetch-report-")
+os.environ["MARKETING_FETCH_ALLOW_PRIVATE"] = "1"   # the mock server is on localhost
+
+import mock_n8n  # noqa: E402
+from services import url_fetch  # noqa: E402
+
+
+class ShiftedClock:
+    # Stands in for the `time` module inside url_fetch, running `offset` seconds ahead.
+    def __init__(self):
+        self.offset = 0.0
+
+    def time(self):
+        return time.time() + self.offset
+
+
+def run(label, server, fn):
+    before = {key: server.state[key] for key in ("page_requests", "page_not_modified", "page_bytes")}
+    started = time.perf_counter()
+    results = fn()
+    elapsed = time.perf_counter() - started
+    sources = {}
+    for result in results:
+        sources[result["source"]] = sources.get(result["source"], 0) + 1
+    print(f"{label:<28}{elapsed:>9.2f}s{server.state['page_requests'] - before['page_requests']:>10}"
+          f"{server.state['page_not_modified'] - before['page_not_modified']:>8}"
+          f"{server.state['page_bytes'] - before['page_bytes']:>12,}   {sources}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reference-URL fetch timings and cache behaviour.")
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--page-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    server, base_url = mock_n8n.start_in_thread(page_latency=args.page_latency, page_max_age=1)
+    clock = url_fetch.time = ShiftedClock()
+    urls = [f"{base_url}/pages/retail-insight-{i}" for i in range(args.pages)]
+
+    print(f"{args.pages} pages, {args.page_latency}s server latency, max-age 1s (fresh for MIN_TTL "
+          f"{url_fetch.MIN_TTL}s)")
+    print(f"{'Run':<28}{'Time':>10}{'Requests':>10}{'304s':>8}{'Body bytes':>12}   Sources")
+    run("one by one (cold)", server, lambda: [url_fetch.fetch(url) for url in urls])
+    url_fetch.clear_cache()
+    results = run("concurrent (cold)", server, lambda: url_fetch.fetch_all(urls))
+    run("concurrent (fresh cache)", server, lambda: url_fetch.fetch_all(urls))
+    clock.offset += url_fetch.MIN_TTL + 1
+    run("concurrent (expired, 304)", server, lambda: url_fetch.fetch_all(urls))
+
+    text = results[0]["text"]
+    print(f"\nReadable text of one page: {len(text):,} chars (navigation, script and footer dropped)")
+    print(text[:300])
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
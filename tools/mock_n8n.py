@@ -0,0 +1,430 @@
+"""
+Local stand-in for the n8n webhooks, for development and benchmarks without
+touching n8n cloud.
+
+    python tools/mock_n8n.py --port 5678 --stream sse --latency 2 --latency-dist lognormal
+
+Then point .streamlit/secrets.toml at it:
+
+    [n8n]
+    blog_api = "http://localhost:5678/webhook/blog"
+    video_script_api = "http://localhost:5678/webhook/video-script"
+    email_generate_api = "http://localhost:5678/webhook/email-generate"
+    email_refine_api = "http://localhost:5678/webhook/email-refine"
+    email_send_api = "http://localhost:5678/webhook/email-send"
+    linkedin_api = "http://localhost:5678/webhook/linkedin"
+    image_api = "http://localhost:5678/webhook/image"
+
+Latency: `--latency` is the typical (median) delay before a response starts,
+spread by `--latency-dist` (fixed, uniform, lognormal, exponential) and
+`--jitter`. `--error-rate` answers that share of calls with one of
+`--error-statuses` instead.
+
+Reference pages: GET /pages/<name> serves an HTML article with ETag and
+Last-Modified headers (Cache-Control max-age from `--page-max-age`) and answers
+conditional requests with 304, as a stand-in for reference URLs.
+
+Response shapes (`--shape`):
+    native  what each workflow returns today: {"output": text} for blog/video,
+            {"output": {...}} for LinkedIn, a JSON-encoded string in "output"
+            for email generate, a list-wrapped one for email refine and
+            [{"success": true, "post": {"image": ...}}] for images
+    list    every object response wrapped in a one-element list
+    string  structured outputs JSON-encoded as a string inside "output"
+    mixed   one of the above per response
+
+Context handles: payloads may carry `<field>_handle` instead of a large field;
+handles are registered with {"action": "register_context", "handle", "content"}
+and unknown handles are answered with 409 {"error": "unknown_context"}.
+gzip-encoded request bodies are accepted.
+
+Streaming modes:
+    none    one JSON body {"output": "..."} (what n8n returns today)
+    sse     text/event-stream, one `data: {"text": ...}` event per token
+    ndjson  n8n-style JSON lines: begin / item {"content": ...} / end
+    text    raw chunked text/plain
+"""
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import math
+import random
+import sys
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SAMPLE_DOCUMENT = """# {title}
+
+Artificial intelligence is changing how {audience} teams plan, build and measure their work.
+This piece walks through where it pays off first and how to get started.
+
+## Why it matters now
+
+- Faster decisions backed by live data
+- Less manual reporting and fewer hand-offs
+- Measurable impact within a quarter
+
+## Getting started
+
+1. Pick one process with a clear owner and metric.
+2. Run a four-week pilot.
+3. Scale what works.
+
+**{cta}** to see what this looks like for your organisation.
+"""
+
+
+def render_document(payload):
+    return SAMPLE_DOCUMENT.format(
+        title=payload.get("query") or payload.get("text") or "Untitled",
+        audience=(payload.get("target_audience") or "business").lower(),
+        cta=payload.get("cta_choice") or "Talk to our experts",
+    )
+
+
+def tokenize(text):
+    # Word-sized pieces including their trailing whitespace, like LLM tokens.
+    pieces, current = [], ""
+    for char in text:
+        current += char
+        if char in " \n":
+            pieces.append(current)
+            current = ""
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def document_handler(payload):
+    if payload.get("action") == "refine":
+        current = payload.get("current_blog_content") or payload.get("current_video_content") or ""
+        return current + f"\n\n_Refined: {payload.get('refine_instruction', '')}_\n"
+    return render_document(payload)
+
+
+def linkedin_handler(payload):
+    topic = payload.get("text", "")
+    return {
+        "output": {
+            "post title": f"What {topic[:40]} means for your team",
+            "post content": render_document({"query": topic}),
+            "image description": f"Minimal illustration about {topic[:40]}",
+            "Hashtags": ["#AI", "#Marketing"],
+        }
+    }
+
+
+def email_for(lead, payload):
+    return {
+        "subject": f"{lead.get('first_name', '')}, a quick idea for {lead.get('org_name', 'your team')}",
+        "body": (
+            f"Hi {lead.get('first_name', '')},\n\n"
+            f"{payload.get('query', '')}\n\n"
+            f"{payload.get('cta_choice', 'Talk to our experts')}.\n\nBest regards"
+        ),
+    }
+
+
+SAMPLE_PAGE = """<!doctype html>
+<html><head><title>{title}</title><script>var tracking = 1;</script></head>
+<body>
+<nav><a href="/">Home</a> | <a href="/pricing">Pricing</a></nav>
+<article>
+<h1>{title}</h1>
+{paragraphs}
+</article>
+<footer>© Example Corp. All rights reserved.</footer>
+</body></html>
+"""
+PAGE_MODIFIED = formatdate(time.time() - 86400, usegmt=True)
+
+
+def render_page(name):
+    title = name.replace("-", " ").title()
+    paragraphs = "\n".join(
+        f"<p>{title}: retail teams that forecast demand weekly cut stock-outs by {10 + i}% "
+        f"and free up working capital for growth.</p>"
+        for i in range(40)
+    )
+    return SAMPLE_PAGE.format(title=title, paragraphs=paragraphs)
+
+
+def email_refine_handler(payload):
+    body = (payload.get("current_email") or "").rstrip()
+    instruction = payload.get("instruction") or "Polished"
+    email = {"subject": payload.get("current_subject", ""), "body": f"{body}\n\nP.S. {instruction}."}
+    return [{"output": json.dumps(email)}]
+
+
+# 1x1 transparent PNG
+SAMPLE_IMAGE = base64.b64encode(bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082"
+)).decode()
+
+
+def image_handler(payload):
+    return [{"success": True, "post": {"prompt": payload.get("prompt", ""), "image": SAMPLE_IMAGE}}]
+
+
+def email_generate_handler(payload):
+    if payload.get("action") == "generate_batch":
+        return {"results": [{"index": lead["index"], **email_for(lead, payload)} for lead in payload.get("leads", [])]}
+    # "generate_template" sends {{first_name}}-style placeholders as the lead fields,
+    # which email_for() carries through like a template-aware LLM prompt would.
+    # n8n returns the LLM output as a JSON-encoded string inside "output"
+    return {"output": json.dumps(email_for(payload, payload))}
+
+
+def email_send_handler(payload):
+    return {"success": True, "email": payload.get("email")}
+
+
+ROUTES = {
+    "/webhook/email-generate": email_generate_handler,
+    "/webhook/email-refine": email_refine_handler,
+    "/webhook/email-send": email_send_handler,
+    "/webhook/blog": document_handler,
+    "/webhook/video-script": document_handler,
+    "/webhook/linkedin": linkedin_handler,
+    "/webhook/image": image_handler,
+}
+SHAPES = ["native", "list", "string"]
+
+
+def shape_response(result, shape):
+    """Applies a --shape to a handler result (str results become {"output": text})."""
+    if isinstance(result, str):
+        result = {"output": result}
+    if shape == "list":
+        return result if isinstance(result, list) else [result]
+    if shape == "string":
+        items = result if isinstance(result, list) else [result]
+        for item in items:
+            if isinstance(item, dict) and isinstance(item.get("output"), (dict, list)):
+                item["output"] = json.dumps(item["output"])
+    return result
+
+
+def sample_latency(config, rng):
+    median, jitter = config.latency, config.jitter
+    if median <= 0:
+        return 0.0
+    if config.latency_dist == "uniform":
+        return rng.uniform(median * max(0.0, 1 - jitter), median * (1 + jitter))
+    if config.latency_dist == "lognormal":
+        return median * math.exp(rng.gauss(0, jitter))
+    if config.latency_dist == "exponential":
+        return rng.expovariate(math.log(2) / median)
+    return median
+
+
+class UnknownHandle(Exception):
+    pass
+
+
+class MockN8nHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None    # argparse.Namespace, set in make_server()
+    state = None     # shared per server: context store and wire counters
+
+    def log_message(self, *args):
+        if not self.config.quiet:
+            super().log_message(*args)
+
+    def _read_payload(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        with self.state["lock"]:
+            self.state["requests"] += 1
+            self.state["request_bytes"] += length
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        return json.loads(body or b"{}")
+
+    def _resolve_handles(self, payload):
+        contexts = self.state["contexts"]
+        for key in [k for k in payload if k.endswith("_handle")]:
+            handle = payload.pop(key)
+            if handle not in contexts:
+                raise UnknownHandle(handle)
+            payload[key[:-len("_handle")]] = contexts[handle]
+        return payload
+
+    def _send_json(self, data, status=200, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunked(self, content_type, pieces):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for piece in pieces:
+            data = piece.encode("utf-8")
+            self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+            time.sleep(self.config.token_delay)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _stream(self, text):
+        tokens = tokenize(text)
+        mode = self.config.stream
+        if mode == "sse":
+            events = [f"data: {json.dumps({'text': t})}\n\n" for t in tokens] + ["data: [DONE]\n\n"]
+            self._send_chunked("text/event-stream", events)
+        elif mode == "ndjson":
+            lines = [json.dumps({"type": "begin"}) + "\n"]
+            lines += [json.dumps({"type": "item", "content": t}) + "\n" for t in tokens]
+            lines += [json.dumps({"type": "end"}) + "\n"]
+            self._send_chunked("application/json; charset=utf-8", lines)
+        else:
+            self._send_chunked("text/plain; charset=utf-8", tokens)
+
+    def do_GET(self):
+        if not self.path.startswith("/pages/"):
+            self._send_json({"message": f"Unknown page {self.path}"}, status=404)
+            return
+        body = render_page(self.path[len("/pages/"):]).encode("utf-8")
+        etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        with self.state["lock"]:
+            self.state["page_requests"] += 1
+        time.sleep(self.config.page_latency)
+        self.send_response(304 if self.headers.get("If-None-Match") == etag else 200)
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", PAGE_MODIFIED)
+        self.send_header("Cache-Control", f"max-age={self.config.page_max_age}")
+        if self.headers.get("If-None-Match") == etag:
+            with self.state["lock"]:
+                self.state["page_not_modified"] += 1
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        with self.state["lock"]:
+            self.state["page_bytes"] += len(body)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        handler = ROUTES.get(self.path)
+        if handler is None:
+            self._send_json({"message": f"Unknown webhook {self.path}"}, status=404)
+            return
+        payload = self._read_payload()
+        if payload.get("action") == "register_context":
+            self.state["contexts"][payload["handle"]] = payload.get("content", "")
+            self._send_json({"registered": payload["handle"]})
+            return
+        try:
+            payload = self._resolve_handles(payload)
+        except UnknownHandle as e:
+            self._send_json({"error": "unknown_context", "handle": str(e)}, status=409)
+            return
+
+        with self.state["lock"]:
+            rng = self.state["rng"]
+            delay = sample_latency(self.config, rng)
+            failure = rng.random() < self.config.error_rate
+            status = rng.choice(self.config.error_statuses) if failure else 200
+            shape = rng.choice(SHAPES) if self.config.shape == "mixed" else self.config.shape
+            if failure:
+                self.state["errors"] += 1
+        time.sleep(delay)
+        if failure:
+            self._send_json({"message": "Mock n8n failure"}, status=status,
+                            headers={"Retry-After": "0"} if status == 429 else None)
+            return
+        result = handler(payload)
+
+        streams = self.config.stream != "none" and "text/event-stream" in self.headers.get("Accept", "")
+        if not streams or not isinstance(result, (str, dict)):
+            self._send_json(shape_response(result, shape))
+        elif isinstance(result, str):
+            self._stream(result)
+        else:
+            # Structured outputs (LinkedIn) stream just the post text.
+            output = result.get("output", "")
+            self._stream(output.get("post content", "") if isinstance(output, dict) else str(output))
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients drop keep-alive connections after error responses they do not read.
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+def make_server(host="127.0.0.1", port=5678, **options):
+    """Builds (but does not start) a mock server; options mirror the CLI flags."""
+    defaults = {
+        "stream": "none", "latency": 0.0, "latency_dist": "fixed", "jitter": 0.5, "token_delay": 0.01,
+        "error_rate": 0.0, "error_statuses": (500, 502, 503, 429), "shape": "native", "seed": None, "quiet": True,
+        "page_latency": 0.0, "page_max_age": 60,
+    }
+    config = argparse.Namespace(**{**defaults, **options})
+    state = {
+        "lock": threading.Lock(), "contexts": {}, "requests": 0, "request_bytes": 0, "errors": 0,
+        "page_requests": 0, "page_not_modified": 0, "page_bytes": 0,
+        "rng": random.Random(config.seed),
+    }
+    handler = type("ConfiguredMockN8nHandler", (MockN8nHandler,), {"config": config, "state": state})
+    server = MockServer((host, port), handler)
+    server.state = state
+    return server
+
+
+def start_in_thread(**options):
+    """Starts a mock server on a free port in a daemon thread and returns (server, base_url)."""
+    server = make_server(port=0, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{server.server_address[0]}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the n8n webhooks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5678)
+    parser.add_argument("--stream", choices=["none", "sse", "ndjson", "text"], default="none")
+    parser.add_argument("--latency", type=float, default=0.0, help="median seconds before the response starts")
+    parser.add_argument("--latency-dist", choices=["fixed", "uniform", "lognormal", "exponential"], default="fixed")
+    parser.add_argument("--jitter", type=float, default=0.5,
+                        help="spread: +/- fraction for uniform, sigma for lognormal")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds between streamed tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered with an error")
+    parser.add_argument("--error-statuses", default="500,502,503,429", help="comma-separated error status codes")
+    parser.add_argument("--shape", choices=SHAPES + ["mixed"], default="native")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--page-latency", type=float, default=0.0, help="seconds before a /pages/ response")
+    parser.add_argument("--page-max-age", type=int, default=60, help="Cache-Control max-age of /pages/")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+
+    server = make_server(
+        args.host, args.port, stream=args.stream, latency=args.latency, latency_dist=args.latency_dist,
+        jitter=args.jitter, token_delay=args.token_delay, error_rate=args.error_rate,
+        error_statuses=tuple(int(code) for code in args.error_statuses.split(",") if code.strip()),
+        shape=args.shape, seed=args.seed, page_latency=args.page_latency, page_max_age=args.page_max_age,
+        quiet=args.quiet,
+    )
+    print(f"Mock n8n listening on http://{args.host}:{args.port} "
+          f"(stream={args.stream}, latency={args.latency}s {args.latency_dist}, "
+          f"errors={args.error_rate:.0%}, shape={args.shape})")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Measures request bytes per blog refine with and without context handles,
+against the local mock n8n server (tools/mock_n8n.py).
+
+The blog being refined changes on every call, so it is sent inline either way;
+only the reference context is replaced by a handle. Both sizes are set here so
+the figures reflect a realistic refine, not a stub document.
+With handles, request bodies are also gzip-compressed, which is part of the
+difference (the generated word lists here compress better than real prose).
+
+Usage:
+    python tools/refine_bytes.py [--context-kb 2048] [--document-kb 12] [--refines 5]
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import mock_n8n  # noqa: E402
+from services import context_handles  # noqa: E402
+
+WORDS = ("revenue pipeline customer platform analytics retention onboarding forecast "
+         "inventory supplier margin compliance workflow dashboard migration").split()
+
+
+def reference_text(kilobytes, seed=7):
+    rng = random.Random(seed)
+    words, size = [], 0
+    while size < kilobytes * 1024:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+def run(url, server, use_handles, context, document, refines):
+    params = {"query": "AI in retail", "tone": "Professional", "reference_file_content": context}
+    context_handles.post(url, {"action": "generate", **params}, enabled=use_handles)
+
+    per_refine = []
+    for i in range(refines):
+        before = server.state["request_bytes"]
+        payload = {
+            "action": "refine",
+            "current_blog_content": document,
+            "refine_instruction": f"Refinement #{i + 1}",
+            **params,
+        }
+        document = context_handles.post(url, payload, enabled=use_handles).json()["output"]
+        per_refine.append(server.state["request_bytes"] - before)
+    return per_refine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request bytes per refine, with vs. without context handles.")
+    parser.add_argument("--context-kb", type=int, default=2048, help="size of the extracted reference text")
+    parser.add_argument("--document-kb", type=int, default=12, help="size of the blog being refined")
+    parser.add_argument("--refines", type=int, default=5)
+    args = parser.parse_args()
+
+    context = reference_text(args.context_kb)
+    document = reference_text(args.document_kb, seed=11)
+    results = {}
+    for label, use_handles in (("inline", False), ("handles", True)):
+        server, base_url = mock_n8n.start_in_thread()
+        results[label] = run(f"{base_url}/webhook/blog", server, use_handles, context, document, args.refines)
+        server.shutdown()
+
+    print(f"Reference context: {len(context) / 1024:.0f} KB, blog: {len(document) / 1024:.0f} KB "
+          f"(sent inline both ways), {args.refines} refines")
+    print(f"{'Refine':<8}{'Inline (bytes)':>16}{'Handles (bytes)':>18}{'Reduction':>12}")
+    for i, (inline, handles) in enumerate(zip(results["inline"], results["handles"]), start=1):
+        print(f"{i:<8}{inline:>16,}{handles:>18,}{1 - handles / inline:>12.1%}")
+    inline_avg = sum(results["inline"]) / args.refines
+    handles_avg = sum(results["handles"]) / args.refines
+    print(f"{'Average':<8}{inline_avg:>16,.0f}{handles_avg:>18,.0f}{1 - handles_avg / inline_avg:>12.1%}")
+
+
+if __name__ == "__main__":
+    main()
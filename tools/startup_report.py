@@ -0,0 +1,92 @@
+"""
+Startup timing report: import cost of each page with lazy view loading versus
+the old app.py, which imported every view (and with them pandas, PyPDF2,
+python-docx, python-pptx and markdown) on every cold start.
+
+Each scenario is timed in a fresh interpreter so nothing is already cached in
+sys.modules. The old app.py is timed against the views as they were at the
+baseline commit (exported to a temporary directory), not today's views, which
+import the newer services modules.
+
+Usage:
+    python tools/startup_report.py [--runs 5] [--baseline <commit>]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VIEWS = ["views.blog", "views.email", "views.linkedin_post", "views.video_script"]
+PARSERS = ["PyPDF2", "docx", "pptx"]
+
+# What the previous app.py pulled in at import time, regardless of page; imported
+# from the baseline checkout, where the views load pandas, markdown and the parsers.
+EAGER = ["streamlit"] + VIEWS
+
+SCENARIOS = [
+    ("Home page", ["streamlit"]),
+    ("LinkedIn page", ["streamlit", "views.linkedin_post"]),
+    ("Blog page, no uploads", ["streamlit", "views.blog"]),
+    ("Video page, no uploads", ["streamlit", "views.video_script"]),
+    ("Email page, no uploads", ["streamlit", "views.email"]),
+    ("Email page, lead list loaded", ["streamlit", "views.email", "pandas"]),
+    ("Blog page, files uploaded", ["streamlit", "views.blog"] + PARSERS),
+]
+
+TIMER = (
+    "import importlib, sys, time\n"
+    "t = time.perf_counter()\n"
+    "for name in sys.argv[1:]:\n"
+    "    importlib.import_module(name)\n"
+    "print(time.perf_counter() - t)\n"
+)
+
+
+def git(*args):
+    return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, check=True).stdout
+
+
+def export_views(commit, directory):
+    # Only views/ is needed: the original views imported nothing from the repo.
+    with tarfile.open(fileobj=BytesIO(git("archive", "--format=tar", commit, "views"))) as archive:
+        archive.extractall(directory, filter="data")
+
+
+def time_imports(modules, runs, cwd=ROOT):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", TIMER, *modules],
+            cwd=cwd, capture_output=True, text=True, check=True,
+        )
+        samples.append(float(out.stdout.strip()))
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per scenario")
+    parser.add_argument("--baseline", help="commit with the old app.py (default: the first commit)")
+    args = parser.parse_args()
+    baseline = args.baseline or git("rev-list", "--max-parents=0", "HEAD").decode().split()[0]
+
+    with tempfile.TemporaryDirectory(prefix="startup-report-") as directory:
+        export_views(baseline, directory)
+        eager = time_imports(EAGER, args.runs, cwd=directory)
+    print(f"Baseline: views at {baseline[:10]}")
+    print(f"{'Scenario':<32}{'Import (ms)':>12}{'Saved (ms)':>12}{'Saved':>8}")
+    print(f"{'Eager imports (old app.py)':<32}{eager * 1000:>12.0f}{'-':>12}{'-':>8}")
+    for label, modules in SCENARIOS:
+        lazy = time_imports(modules, args.runs)
+        saved = eager - lazy
+        print(f"{label:<32}{lazy * 1000:>12.0f}{saved * 1000:>12.0f}{saved / eager:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,8 @@
 import streamlit as st
-import requests
+from services import breaker, context_handles, context_select, extraction, history, library, metrics, result_cache, streaming, url_fetch, variants, webhook
+from views import history_panel, library_panel
 import json
-from PyPDF2 import PdfReader  # type: ignore
-from docx import Document as DocxDocument  # type: ignore
-from pptx import Presentation  # type: ignore
+import time
 
 def show(navigate_to):
 
@@ -22,6 +21,8 @@ def show(navigate_to):
 
     # REPLACE THIS WITH YOUR ACTUAL N8N WEBHOOK URL
     N8N_WEBHOOK_URL = st.secrets.get("n8n").get("blog_api")
+    # Send large context once and refer to it by hash afterwards (needs handle support in n8n)
+    USE_CONTEXT_HANDLES = st.secrets.get("n8n").get("context_handles", False)
 
     # Initialize Session State
     if "blog_output" not in st.session_state:
@@ -30,31 +31,22 @@ def show(navigate_to):
     if "last_params" not in st.session_state:
         st.session_state.last_params = {}  # Stores context for refinement
 
-    # -----------------------------------------------------------------------------
-    # HELPER FUNCTIONS
-    # -----------------------------------------------------------------------------
-    def extract_text_from_file(file):
-        text = ""
-        name = file.name.lower()
-        try:
-            if name.endswith(".txt"):
-                text = file.read().decode("utf-8", errors="ignore")
-            elif name.endswith(".pdf"):
-                pdf = PdfReader(file)
-                for page in pdf.pages:
-                    text += page.extract_text() or ""
-            elif name.endswith(".docx"):
-                doc = DocxDocument(file)
-                text = "\n".join([p.text for p in doc.paragraphs])
-            elif name.endswith(".pptx"):
-                ppt = Presentation(file)
-                for slide in ppt.slides:
-                    for shape in slide.shapes:
-                        if hasattr(shape, "text"):
-                            text += shape.text + "\n"
-        except Exception:
-            pass
-        return text.strip()
+    if "blog_history_id" not in st.session_state:
+        st.session_state.blog_history_id = None  # History entry of the output on screen
+
+    if "blog_variants" not in st.session_state:
+        st.session_state.blog_variants = []  # Results of the last multi-variant run
+
+    def save_output(text, action, seconds, instruction=""):
+        # Every n8n output is kept in the history so it can be reopened without another call
+        st.session_state.blog_history_id = history.record(
+            history.BLOG, text, st.session_state.last_params,
+            title=st.session_state.last_params.get("query", ""),
+            action=action,
+            parent_id=st.session_state.blog_history_id if action == "refine" else None,
+            instruction=instruction,
+            seconds=seconds,
+        )
 
     # -----------------------------------------------------------------------------
     # SIDEBAR: CONTENT CONFIGURATION
@@ -62,23 +54,17 @@ def show(navigate_to):
     with st.sidebar:
         st.markdown("## ⚙️ Content Configuration")
 
-        tone = st.selectbox(
-            "🎨 Tone",
-            [
-                "Professional", "Friendly", "Authoritative", "Playful", "Inspirational",
-                "Conversational", "Casual", "Semi-casual", "Business professional",
-                "Approachable", "Informative", "Assertive", "Engaging",
-                "Visionary (for Thought Leadership)", "Confident", "Data-driven",
-                "Plainspoken / Direct", "Witty", "Storytelling"
-            ],
-            key="blog_tone",
-        )
+        tone_options = [
+            "Professional", "Friendly", "Authoritative", "Playful", "Inspirational",
+            "Conversational", "Casual", "Semi-casual", "Business professional",
+            "Approachable", "Informative", "Assertive", "Engaging",
+            "Visionary (for Thought Leadership)", "Confident", "Data-driven",
+            "Plainspoken / Direct", "Witty", "Storytelling"
+        ]
+        tone = st.selectbox("🎨 Tone", tone_options, key="blog_tone")
 
-        target_audience = st.selectbox(
-            "🎯 Target Audience",
-            ["Senior Management", "Middle Management", "Junior / Entry Level Staff"],
-            key="blog_audience",
-        )
+        audience_options = ["Senior Management", "Middle Management", "Junior / Entry Level Staff"]
+        target_audience = st.selectbox("🎯 Target Audience", audience_options, key="blog_audience")
 
         industry = st.text_input(
             "🏢 Industry (optional)",
@@ -98,8 +84,57 @@ def show(navigate_to):
         primary_keyword = st.text_input("Primary Keyword", key="blog_pk")
         lsi_keywords_input = st.text_input("LSI / Variations (comma-separated)", key="blog_lsi")
         lsi_keywords = [k.strip() for k in lsi_keywords_input.split(",") if k.strip()]
+
+        st.subheader("🔀 Variants")
+        variant_mode = st.checkbox(
+            "Generate several variants at once",
+            value=False,
+            help="Sends one request per tone / audience / CTA combination in parallel and shows each as it arrives.",
+            key="blog_variant_mode",
+        )
+        variant_options = {}
+        if variant_mode:
+            variant_options = {
+                "tone": st.multiselect("Tones", tone_options, default=[tone], key="blog_variant_tones"),
+                "target_audience": st.multiselect(
+                    "Audiences", audience_options, default=[target_audience], key="blog_variant_audiences"
+                ),
+                "cta_choice": st.multiselect("CTAs", cta_options, default=[cta_choice], key="blog_variant_ctas"),
+            }
+            combination_count = variants.count(variant_options)
+            if combination_count > variants.MAX_VARIANTS:
+                st.caption(f"{variants.MAX_VARIANTS} variants (first {variants.MAX_VARIANTS} of {combination_count} combinations)")
+            else:
+                st.caption(f"{combination_count} variant{'s' if combination_count != 1 else ''}")
         
 
+        st.subheader("⚡ Output Streaming")
+        stream_output = st.checkbox(
+            "Show text as it is written",
+            value=True,
+            help="Renders the output progressively when the n8n webhook streams it; otherwise waits for the full response.",
+            key="blog_stream_output",
+        )
+
+        st.subheader("♻️ Response Cache")
+        use_cache = st.checkbox(
+            "Reuse results for identical requests",
+            value=False,
+            help="Answers a repeated Generate with the same inputs from a local cache instead of calling n8n again.",
+            key="blog_use_cache",
+        )
+
+        st.subheader("📚 Reference Context")
+        context_budget_kb = st.select_slider(
+            "Context budget (KB)",
+            options=["All", 8, 16, 24, 48, 96],
+            value=24,
+            help="Sends only the reference passages most relevant to the topic, up to this size. "
+                 "'All' sends every document (repeated boilerplate is still dropped).",
+            key="blog_context_budget",
+        )
+        context_budget = 0 if context_budget_kb == "All" else context_budget_kb * 1024
+
     # -----------------------------------------------------------------------------
     # TOP SECTION: FILES & URLS
     # -----------------------------------------------------------------------------
@@ -120,9 +155,20 @@ def show(navigate_to):
         # Process files immediately to be ready for generation
         file_context = ""
         if uploaded_files:
-            for f in uploaded_files:
-                extracted_text = extract_text_from_file(f) 
-                file_context += f"--- Content from {f.name} ---\n{extracted_text}\n\n"
+            extraction_progress = st.progress(0.0)
+            file_context = library.build_file_context(
+                uploaded_files,
+                on_progress=lambda name, fraction: extraction_progress.progress(
+                    fraction, text=f"Extracting {name}..."
+                )
+            )
+            extraction_progress.empty()
+            stats = extraction.cache_stats()
+            st.caption(f"Extraction cache: {stats['hits']} hits · {stats['misses']} misses")
+
+        # Documents saved earlier (by any view) are attached without uploading or parsing again
+        library_docs = library_panel.document_picker("blog")
+        file_context += library.build_context(library_docs)
 
     with col2:
         st.markdown("#### 🔗 Reference URLs")
@@ -135,11 +181,85 @@ def show(navigate_to):
         )
         url_list = [url.strip() for url in reference_urls.split(",") if url.strip()]
 
+        # Fetch the pages here (cached by URL) and send their text as context;
+        # only URLs that could not be fetched are left for n8n to fetch.
+        url_context, unfetched_urls = "", []
+        if url_list:
+            with st.spinner("Fetching reference URLs..."):
+                url_context, unfetched_urls, url_results = url_fetch.build_url_context(url_list)
+            cached = sum(result["source"] in (url_fetch.FRESH, url_fetch.REVALIDATED) for result in url_results)
+            fetched = sum(1 for result in url_results if result["text"])
+            st.caption(f"Reference pages: {fetched}/{len(url_results)} read · {cached} from cache")
+            for result in url_results:
+                if not result["text"]:
+                    st.warning(f"Could not read {result['url']}: {result['error'] or 'no text found'}")
+
     st.divider()
 
     # -----------------------------------------------------------------------------
     # MAIN LAYOUT: INPUTS VS OUTPUT
     # -----------------------------------------------------------------------------
+    def fetch_variant(payload, read_cache):
+        # Runs on a worker thread, so no Streamlit calls in here.
+        # Returns (text, served_from_cache).
+        cache_key = result_cache.payload_key(N8N_WEBHOOK_URL, payload)
+        if use_cache and read_cache:
+            cached_text = result_cache.get(cache_key)
+            metrics.record_cache(N8N_WEBHOOK_URL, "generate", hit=cached_text is not None)
+            if cached_text is not None:
+                return cached_text, True
+        response = context_handles.post(N8N_WEBHOOK_URL, payload, enabled=USE_CONTEXT_HANDLES)
+        if response.status_code != 200:
+            raise webhook.WebhookHTTPError(f"Error {response.status_code}: {response.text}", response=response)
+        try:
+            result_text = webhook.output_text(response.json())
+        except ValueError:
+            result_text = response.text
+        if use_cache:
+            result_cache.put(cache_key, result_text)
+        return result_text, False
+
+    def generate_variants(payload, options, read_cache=True):
+        # Every combination is requested at once and drawn as soon as it comes back
+        combos = variants.combinations(payload, options)
+        if USE_CONTEXT_HANDLES:
+            try:
+                # Upload the shared reference context once instead of once per variant
+                context_handles.prepare(N8N_WEBHOOK_URL, payload)
+            except Exception:
+                pass
+
+        columns = st.columns(2)
+        slots = []
+        for position, (label, _) in enumerate(combos):
+            with columns[position % 2].container(border=True):
+                st.markdown(f"**{label}**")
+                slots.append(st.empty())
+                slots[-1].caption("⏳ Generating...")
+
+        started = time.perf_counter()
+        results = [None] * len(combos)
+        items = [params for _, params in combos]
+        for position, result, error, seconds in variants.run(lambda params: fetch_variant(params, read_cache), items):
+            label, params = combos[position]
+            params = {key: value for key, value in params.items() if key != "action"}
+            variant = {"label": label, "params": params, "text": "", "error": None, "seconds": seconds, "history_id": None}
+            if error is not None:
+                variant["error"] = str(error)
+                slots[position].error(variant["error"])
+            else:
+                result_text, from_cache = result
+                variant["text"] = result_text
+                if not from_cache:
+                    # Cache hits were recorded when they were first generated
+                    variant["history_id"] = history.record(
+                        history.BLOG, result_text, params, title=f"{params['query']} ({label})", seconds=seconds
+                    )
+                slots[position].markdown(result_text)
+            results[position] = variant
+        st.session_state.blog_variants = results
+        st.session_state.blog_variants_elapsed = time.perf_counter() - started
+
     left, right = st.columns([1, 2])
 
     with left:
@@ -149,7 +269,15 @@ def show(navigate_to):
 
 
         st.markdown("<br>", unsafe_allow_html=True)
+        breaker_warning = breaker.describe(N8N_WEBHOOK_URL)
+        if breaker_warning:
+            st.warning(breaker_warning)
         generate_button = st.button("Generate Blog", type="primary", use_container_width=True)
+        regenerate_button = False
+        if use_cache:
+            regenerate_button = st.button("🔄 Regenerate (bypass cache)", use_container_width=True, key="blog_regenerate")
+        if st.session_state.get("blog_context_report"):
+            st.caption(context_select.describe(st.session_state.blog_context_report))
 
         # -------------------------------------------------------------------------
         # REFINE SECTION (Only shows if we have output)
@@ -172,14 +300,25 @@ def show(navigate_to):
 
     with right:
         # st.markdown("### 📝 Output")
+
+        reopened = history_panel.history_panel(history.BLOG)
+        if reopened:
+            st.session_state.blog_output = reopened["content"]
+            st.session_state.last_params = reopened["params"]
+            st.session_state.blog_history_id = reopened["id"]
+            st.rerun()
         
         # -------------------------------------------------------------------------
         # LOGIC: GENERATE NEW BLOG
         # -------------------------------------------------------------------------
-        if generate_button and query:
+        if (generate_button or regenerate_button) and query:
             with st.spinner("🚀 Generating blog via n8n..."):
                 
                 # 1. CAPTURE CONTEXT
+                # Only the reference passages relevant to the topic are sent (within the budget)
+                reference_context, st.session_state.blog_context_report = context_select.select_context(
+                    file_context + url_context, " ".join([query, primary_keyword, *lsi_keywords]), context_budget
+                )
                 # We save all inputs to session_state so we can re-send them during refinement
                 st.session_state.last_params = {
                     "query": query,
@@ -190,8 +329,8 @@ def show(navigate_to):
                     "cta_choice": cta_choice,
                     "primary_keyword": primary_keyword,
                     "lsi_keywords": lsi_keywords,
-                    "reference_urls": url_list,
-                    "reference_file_content": file_context  # CRITICAL: Keeps file text in memory
+                    "reference_urls": unfetched_urls,
+                    "reference_file_content": reference_context  # CRITICAL: Keeps file text in memory
                 }
 
                 # 2. PREPARE PAYLOAD
@@ -200,22 +339,57 @@ def show(navigate_to):
                     **st.session_state.last_params # Unpack all params
                 }
 
+                st.session_state.blog_variants = []
+                if variant_mode:
+                    generate_variants(payload, variant_options, read_cache=not regenerate_button)
+                    # Nothing is refined until one of the variants is picked
+                    st.session_state.blog_output = ""
+                    st.session_state.blog_history_id = None
+                    st.rerun()
+
+                # 3. CHECK THE RESPONSE CACHE (opt-in)
+                cache_key = result_cache.payload_key(N8N_WEBHOOK_URL, payload)
+                cached_text = result_cache.get(cache_key) if use_cache and not regenerate_button else None
+                if use_cache:
+                    metrics.record_cache(N8N_WEBHOOK_URL, "generate", hit=cached_text is not None)
+
+                if cached_text is not None:
+                    st.session_state.blog_output = cached_text
+                    st.session_state.blog_history_id = None
+                    st.rerun()
+
+                started = time.perf_counter()
                 try:
-                    response = requests.post(N8N_WEBHOOK_URL, json=payload)
+                    if stream_output:
+                        result_text = streaming.render_markdown_stream(
+                            context_handles.stream_text(N8N_WEBHOOK_URL, payload, enabled=USE_CONTEXT_HANDLES),
+                            st.container(border=True)
+                        )
+                        if use_cache:
+                            result_cache.put(cache_key, result_text)
+                        st.session_state.blog_output = result_text
+                        save_output(result_text, "generate", time.perf_counter() - started)
+                        st.rerun()
+
+                    response = context_handles.post(N8N_WEBHOOK_URL, payload, enabled=USE_CONTEXT_HANDLES)
                     
                     if response.status_code == 200:
                         try:
-                            data = response.json()
-                            result_text = data.get("output", data.get("text", str(data)))
+                            result_text = webhook.output_text(response.json())
                         except:
                             result_text = response.text
                             
+                        if use_cache:
+                            result_cache.put(cache_key, result_text)
                         st.session_state.blog_output = result_text
+                        save_output(result_text, "generate", time.perf_counter() - started)
                         st.success("Blog generated successfully!")
                         st.rerun() # Rerun to show the Refine options
                     else:
                         st.error(f"Error {response.status_code}: {response.text}")
                         
+                except webhook.WebhookHTTPError as e:
+                    st.error(str(e))
                 except Exception as e:
                     st.error(f"Connection Error: {e}")
 
@@ -247,25 +421,63 @@ def show(navigate_to):
                     "word_limit": context_params.get("word_limit", 1000)
                 }
                 
+                started = time.perf_counter()
                 try:
-                    response = requests.post(N8N_WEBHOOK_URL, json=payload)
+                    if stream_output:
+                        st.session_state.blog_output = streaming.render_markdown_stream(
+                            context_handles.stream_text(N8N_WEBHOOK_URL, payload, enabled=USE_CONTEXT_HANDLES),
+                            st.container(border=True)
+                        )
+                        save_output(st.session_state.blog_output, "refine", time.perf_counter() - started,
+                                    refine_instruction)
+                        st.rerun()
+
+                    response = context_handles.post(N8N_WEBHOOK_URL, payload, enabled=USE_CONTEXT_HANDLES)
                     
                     if response.status_code == 200:
                         try:
-                            data = response.json()
-                            result_text = data.get("output", data.get("text", str(data)))
+                            result_text = webhook.output_text(response.json())
                         except:
                             result_text = response.text
                             
                         st.session_state.blog_output = result_text
+                        save_output(result_text, "refine", time.perf_counter() - started, refine_instruction)
                         st.success("Refinement applied!")
                         st.rerun()
                     else:
                         st.error("Failed to refine content.")
+                except webhook.WebhookHTTPError:
+                    st.error("Failed to refine content.")
                 except Exception as e:
                     st.error(f"Error: {e}")
 
 
+        # -------------------------------------------------------------------------
+        # DISPLAY VARIANTS (multi-variant runs)
+        # -------------------------------------------------------------------------
+        if st.session_state.blog_variants:
+            finished = [variant for variant in st.session_state.blog_variants if not variant["error"]]
+            st.markdown(f"### 🔀 {len(finished)} of {len(st.session_state.blog_variants)} Variants")
+            st.caption(
+                f"{st.session_state.blog_variants_elapsed:.1f}s in parallel · "
+                f"{sum(variant['seconds'] for variant in st.session_state.blog_variants):.1f}s one after another"
+            )
+            tabs = st.tabs([variant["label"] for variant in st.session_state.blog_variants])
+            for position, (tab, variant) in enumerate(zip(tabs, st.session_state.blog_variants)):
+                with tab:
+                    if variant["error"]:
+                        st.error(variant["error"])
+                        continue
+                    if st.button("✅ Use this variant", key=f"blog_use_variant_{position}"):
+                        st.session_state.blog_output = variant["text"]
+                        st.session_state.last_params = variant["params"]
+                        st.session_state.blog_history_id = variant["history_id"]
+                        st.session_state.blog_variants = []
+                        st.rerun()
+                    st.caption(f"{variant['seconds']:.1f}s")
+                    with st.container(border=True):
+                        st.markdown(variant["text"])
+
         # -------------------------------------------------------------------------
         # DISPLAY OUTPUT CONTAINER
         # -------------------------------------------------------------------------
@@ -1,13 +1,9 @@
 import streamlit as st
-import pandas as pd
-import requests
-import json
-import ast  # Added for parsing dictionary strings
-import re   # Added for regex fallback
-from io import StringIO
-from PyPDF2 import PdfReader  # type: ignore
-from docx import Document as DocxDocument  # type: ignore
-from pptx import Presentation  # type: ignore
+from services import breaker, bulk_email, context_handles, context_select, email_send, extraction, job_store, jobs, leads, library, result_cache, url_fetch
+from services.llm_parse import parse_llm_response
+from views import library_panel
+import hashlib
+import time
 
 
 def show(navigate_to):
@@ -26,6 +22,9 @@ def show(navigate_to):
     
     GENERATE_WEBHOOK_URL = st.secrets.get("n8n").get("email_generate_api")
     REFINE_WEBHOOK_URL = st.secrets.get("n8n").get("email_refine_api")
+    SEND_WEBHOOK_URL = st.secrets.get("n8n").get("email_send_api")
+    # Send large context once and refer to it by hash afterwards (needs handle support in n8n)
+    USE_CONTEXT_HANDLES = st.secrets.get("n8n").get("context_handles", False)
 
     st.set_page_config(page_title="Email Generator", layout="wide")
 
@@ -36,168 +35,129 @@ def show(navigate_to):
         st.session_state.processing = False
     if "file_context" not in st.session_state:
         st.session_state.file_context = ""
+    if "generation_job_id" not in st.session_state:
+        st.session_state.generation_job_id = None
+    if "lead_list_id" not in st.session_state:
+        st.session_state.lead_list_id = None  # Scopes sent-email deduplication to this list
+    if "send_job_id" not in st.session_state:
+        st.session_state.send_job_id = None
+    if "send_summary" not in st.session_state:
+        st.session_state.send_summary = None
+    if "lead_rejections" not in st.session_state:
+        st.session_state.lead_rejections = None
+    if "lead_index" not in st.session_state:
+        st.session_state.lead_index = None
+    if "review_nonce" not in st.session_state:
+        st.session_state.review_nonce = 0
+    if "generation_report" not in st.session_state:
+        st.session_state.generation_report = None
 
     # --- HELPER FUNCTIONS ---
-    def extract_text_from_file(file):
-        text = ""
-        name = file.name.lower()
-        try:
-            if name.endswith(".txt"):
-                text = file.read().decode("utf-8", errors="ignore")
-            elif name.endswith(".pdf"):
-                pdf = PdfReader(file)
-                for page in pdf.pages:
-                    text += page.extract_text() or ""
-            elif name.endswith(".docx"):
-                doc = DocxDocument(file)
-                text = "\n".join([p.text for p in doc.paragraphs])
-            elif name.endswith(".pptx"):
-                ppt = Presentation(file)
-                for slide in ppt.slides:
-                    for shape in slide.shapes:
-                        if hasattr(shape, "text"):
-                            text += shape.text + "\n"
-        except Exception:
-            pass
-        return text.strip()
-
-    def parse_llm_response(content):
-        """
-        Robust parsing function that handles:
-        1. Valid JSON
-        2. Python Dictionary Strings (ast.literal_eval)
-        3. Dirty/Malformed strings using Regex
-        """
-        if not isinstance(content, str):
-            if isinstance(content, dict):
-                return content
-            return {"body": str(content)}
-
-        parsed = None
-        
-        # Attempt 1: Standard JSON
-        try:
-            parsed = json.loads(content)
-            if isinstance(parsed, dict): return parsed
-        except: pass
-
-        # Attempt 2: AST Literal Eval (for Python dict strings with single quotes)
-        try:
-            # Sanitize raw newlines which break ast.literal_eval
-            # We replace actual newlines with literal \n characters for the eval
-            sanitized_content = content.replace('\n', '\\n') 
-            parsed = ast.literal_eval(sanitized_content)
-            if isinstance(parsed, dict): return parsed
-        except: pass
-        
-        # Attempt 3: Regex Extraction (The "Nuclear Option")
-        # This looks for 'subject': '...' or "subject": "..." patterns
-        try:
-            subject_match = re.search(r"['\"]subject['\"]\s*:\s*['\"](.*?)['\"](?:\s*,|\s*})", content, re.IGNORECASE | re.DOTALL)
-            body_match = re.search(r"['\"]body['\"]\s*:\s*['\"](.*?)['\"](?:\s*,|\s*})", content, re.IGNORECASE | re.DOTALL)
-            
-            if subject_match or body_match:
-                return {
-                    "subject": subject_match.group(1) if subject_match else "",
-                    "body": body_match.group(1) if body_match else ""
-                }
-        except: pass
-        
-        # Return as raw text if all else fails
-        return {"subject": "", "body": content}
+    def sendable_messages(df, statuses):
+        """(row index, email, subject, body) for every row whose Status is in `statuses`."""
+        ready = df[df['Status'].isin(statuses) & (df['Body'].fillna("").str.len() > 0)]
+        subjects = ready['Subject'].fillna("").replace("", "Your Custom Subject")
+        return list(zip(ready.index, ready['email'], subjects, ready['Body']))
+
+    def apply_send_results(summary):
+        results = summary["results"]
+        leads.update_rows(
+            st.session_state.leads_df, results.keys(),
+            Status=[status for status, _ in results.values()],
+            Error=[error for _, error in results.values()],
+        )
 
-    def generate_bulk_emails(df, common_params):
-        progress_bar = st.progress(0)
-        total_rows = len(df)
-        generated_emails = []
-        
-        for index, row in df.iterrows():
-            payload = {
-                "action": "generate",
-                "first_name": row.get('first_name', ''),
-                "last_name": row.get('last_name', ''),
-                "email": row.get('email', ''),
-                "org_name": row.get('org_name', ''),
-                **common_params
+    @st.fragment(run_every=1.0)
+    def job_status_panel(job_id, noun, url):
+        # Re-runs on its own every second; only this panel refreshes while the job works.
+        job = jobs.get(job_id)
+        if job is None:
+            return
+        status = job.snapshot()
+        if status["status"] not in jobs.ACTIVE_STATUSES:
+            st.rerun(scope="app")
+
+        total = max(status["total"], 1)
+        if status["status"] == jobs.QUEUED:
+            text = "Queued, waiting for a free worker..."
+        else:
+            eta = ""
+            if status["eta"] is not None:
+                eta = f" · ETA {status['eta']:.0f}s" if status["eta"] < 90 else f" · ETA {status['eta'] / 60:.0f} min"
+            text = (
+                f"{status['completed']}/{status['total']} emails {noun} · "
+                f"{status['rate']:.1f} emails/s{eta}"
+            )
+        st.progress(status["completed"] / total, text=text)
+        breaker_warning = breaker.describe(url)
+        if breaker_warning:
+            st.warning(breaker_warning)
+        if st.button("⏹️ Cancel", key=f"cancel_{job_id}"):
+            jobs.cancel(job_id)
+            st.rerun(scope="app")
+
+    @st.fragment
+    def review_queue(common_params):
+        # Filtering, paging and row selection only rerun this fragment, not the page.
+        df = st.session_state.leads_df
+        if st.session_state.lead_index is None:
+            st.session_state.lead_index = leads.SearchIndex(df)
+
+        filter_col, search_col, size_col = st.columns([2, 2, 1])
+        with filter_col:
+            status_filter = st.multiselect(
+                "Status", leads.STATUSES,
+                default=[leads.DRAFT, leads.REFINED, leads.APPROVED, leads.FAILED],
+                key="review_status_filter"
+            )
+        with search_col:
+            search = st.text_input("Search", placeholder="Name, organization or email", key="review_search")
+        with size_col:
+            page_size = st.selectbox("Rows per page", [25, 50, 100, 250], key="review_page_size")
+
+        labels = df.index[df['Status'].isin(status_filter)]
+        hits = st.session_state.lead_index.search(search)
+        if hits is not None:
+            labels = labels[labels.isin(list(hits))]
+
+        pages = max(1, -(-len(labels) // page_size))
+        if st.session_state.get("review_page", 1) > pages:
+            # Dropping the key lets the widget start again from its default page
+            st.session_state.pop("review_page")
+        page = st.number_input(f"Page (of {pages})", 1, pages, 1, key="review_page")
+        page_labels = labels[(page - 1) * page_size:page * page_size]
+        st.caption(f"{len(labels):,} of {len(df):,} leads match")
+
+        selection = st.dataframe(
+            df.loc[page_labels].drop(columns=['Body']),
+            use_container_width=True,
+            hide_index=True,
+            on_select="rerun", 
+            selection_mode="single-row",
+            key=f"review_table_{st.session_state.review_nonce}",
+            column_config={
+                "first_name": st.column_config.TextColumn("First Name"),
+                "last_name": st.column_config.TextColumn("Last Name"),
+                "org_name": st.column_config.TextColumn("Organization"),
+                "email": st.column_config.TextColumn("Email"),
+                "Status": st.column_config.SelectboxColumn(
+                    "Status", 
+                    options=leads.STATUSES,
+                    width="small"
+                )
             }
-            
-            try:
-                response = requests.post(GENERATE_WEBHOOK_URL, json=payload)
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    # Check if data itself is the dict we want
-                    if isinstance(data, dict) and "subject" in data and "body" in data:
-                        clean_data = data
-                    else:
-                        # If nested inside 'output' or 'text'
-                        raw_text = data.get("output", data.get("text", str(data)))
-                        # Try to parse this inner text immediately
-                        clean_data = parse_llm_response(raw_text)
-                    
-                    # Normalize keys
-                    clean_data = {k.lower(): v for k, v in clean_data.items()}
-                    
-                    # Store as Valid JSON String
-                    email_content = json.dumps({
-                        "subject": clean_data.get("subject", ""),
-                        "body": clean_data.get("body", clean_data.get("text", ""))
-                    }, ensure_ascii=False)
-                    
-                else:
-                    email_content = json.dumps({"subject": "Error", "body": f"Error: {response.status_code}"})
-            except Exception as e:
-                email_content = json.dumps({"subject": "Connection Error", "body": str(e)})
-                
-            generated_emails.append(email_content)
-            progress_bar.progress((index + 1) / total_rows)
-            
-        df['Generated Email'] = generated_emails
-        df['Status'] = 'Draft' 
-        return df
-
-    def send_final_emails(df):
-        count = 0
-        progress_bar = st.progress(0)
-        total = len(df)
-        
-        for index, row in df.iterrows():
-            if row['Status'] in ['Draft', 'Refined', 'Approved']:
-                
-                raw_content = row['Generated Email']
-                parsed = parse_llm_response(raw_content)
-                
-                payload = {
-                    "email": row['email'],
-                    "subject": parsed.get('subject', "Your Custom Subject"),
-                    "body": parsed.get('body', raw_content)
-                }
-                try:
-                    requests.post(SEND_WEBHOOK_URL, json=payload)
-                    st.session_state.leads_df.at[index, 'Status'] = 'Sent'
-                    count += 1
-                except:
-                    st.session_state.leads_df.at[index, 'Status'] = 'Failed'
-            progress_bar.progress((index + 1) / total)
-            
-        return count
+        )
+
+        if selection.selection.rows:
+            selected_index = page_labels[selection.selection.rows[0]]
+            email_editor_dialog(selected_index, df.loc[selected_index], common_params)
 
     @st.dialog("Review & Refine Email", width="large")
     def email_editor_dialog(index, row_data, common_params):
         st.write(f"**Lead:** {row_data.get('first_name')} {row_data.get('last_name')} | **Org:** {row_data.get('org_name')}")
         
-        # 1. PARSE CONTENT
-        raw_content = row_data['Generated Email']
-        parsed_data = parse_llm_response(raw_content)
-
-        # 2. Extract specific fields
-        current_subject = parsed_data.get("subject", "")
-        current_body = parsed_data.get("body", "")
-
-        # Cleanup: If body still contains escaped newlines literal characters, fix them for display
-        # (e.g., if it shows "Hi\n\nThere", we want actual line breaks)
-        if isinstance(current_body, str):
-            current_body = current_body.replace("\\n", "\n")
+        current_subject = row_data['Subject'] if isinstance(row_data['Subject'], str) else ""
+        current_body = row_data['Body'] if isinstance(row_data['Body'], str) else ""
 
         col1, col2 = st.columns([2, 1])
         
@@ -218,7 +178,9 @@ def show(navigate_to):
                         **common_params 
                     }
                     try:
-                        response = requests.post(REFINE_WEBHOOK_URL, json=payload)
+                        response = context_handles.post(
+                            REFINE_WEBHOOK_URL, payload, enabled=USE_CONTEXT_HANDLES, action="refine"
+                        )
                         if response.status_code == 200:
                             data = response.json()
                             # Handle list wrapper
@@ -235,14 +197,12 @@ def show(navigate_to):
                             # If the refined response is just text, use it as body. If it's json, parse it.
                             final_body = refined_parsed.get("body") if refined_parsed.get("body") else refined_body_text
 
-                            updated_full_content = json.dumps({
-                                "subject": new_subject,
-                                "body": final_body
-                            }, ensure_ascii=False)
-                            
-                            st.session_state.leads_df.at[index, 'Generated Email'] = updated_full_content
-                            st.session_state.leads_df.at[index, 'Status'] = 'Refined'
+                            leads.update_rows(
+                                st.session_state.leads_df, [index],
+                                Subject=new_subject, Body=final_body, Status=leads.REFINED, Error=""
+                            )
                             st.success("Refined!")
+                            st.session_state.review_nonce += 1
                             st.rerun()
                         else:
                             st.error("Refinement failed.")
@@ -250,12 +210,11 @@ def show(navigate_to):
                         st.error(f"Error: {e}")
 
         if st.button("✅ Approve & Save"):
-            final_content = json.dumps({
-                "subject": new_subject,
-                "body": new_body
-            }, ensure_ascii=False)
-            st.session_state.leads_df.at[index, 'Generated Email'] = final_content
-            st.session_state.leads_df.at[index, 'Status'] = 'Approved'
+            leads.update_rows(
+                st.session_state.leads_df, [index],
+                Subject=new_subject, Body=new_body, Status=leads.APPROVED, Error=""
+            )
+            st.session_state.review_nonce += 1
             st.rerun()
 
     # --- SIDEBAR UI ---
@@ -280,19 +239,53 @@ def show(navigate_to):
             "Book Assessment", "Contact us today", "Download the full guide", "Request a demo",
         ]
         cta_choice = st.selectbox("📢 Call-to-Action (CTA)", cta_options, key="email_cta_choice")
+
+        context_budget_kb = st.select_slider(
+            "📚 Reference Context Budget (KB)",
+            options=["All", 8, 16, 24, 48, 96],
+            value=24,
+            help="Sends only the reference passages most relevant to the topic, up to this size. "
+                 "'All' sends every document (repeated boilerplate is still dropped).",
+            key="email_context_budget",
+        )
+        context_budget = 0 if context_budget_kb == "All" else context_budget_kb * 1024
+
+        max_workers = st.slider(
+            "⚡ Parallel Requests", 1, 32, 8,
+            help="How many leads are generated at the same time.",
+            key="email_max_workers"
+        )
+        template_mode = st.toggle(
+            "🧩 One Template per Organization",
+            value=False,
+            help="Generates one email per organization with name placeholders and fills them in "
+                 "locally for each lead, instead of one webhook call per lead.",
+            key="email_template_mode"
+        )
+        batch_size = st.slider(
+            "📦 Leads per Request", 1, 50, 1,
+            help="Sends several leads per webhook call with the shared settings sent once. "
+                 "Needs a batch-capable n8n workflow; leads a batch misses are retried one by one.",
+            key="email_batch_size"
+        )
         
         st.divider()
         
         st.header("Upload Leads")
-        st.write("Upload Lead CSV with columns: first_name, last_name, email, org_name")
+        st.write("Upload a lead CSV or Excel file with columns: first_name, last_name, email, org_name")
         uploaded_file = st.file_uploader(
-            "Choose a CSV file", 
-            type=["csv", "excel"],
+            "Choose a CSV or Excel file", 
+            type=["csv", "xlsx"],
             key="lead_file"
         )
         
         if st.button("Clear Data"):
             st.session_state.leads_df = None
+            st.session_state.lead_rejections = None
+            st.session_state.lead_index = None
+            st.session_state.generation_report = None
+            st.session_state.generation_job_id = None
+            st.session_state.lead_list_id = None
             st.rerun()
 
     # --- MAIN PAGE UI ---
@@ -311,9 +304,20 @@ def show(navigate_to):
         
         file_context = ""
         if uploaded_files:
-            for f in uploaded_files:
-                extracted_text = extract_text_from_file(f) 
-                file_context += f"--- Content from {f.name} ---\n{extracted_text}\n\n"
+            extraction_progress = st.progress(0.0)
+            file_context = library.build_file_context(
+                uploaded_files,
+                on_progress=lambda name, fraction: extraction_progress.progress(
+                    fraction, text=f"Extracting {name}..."
+                )
+            )
+            extraction_progress.empty()
+            stats = extraction.cache_stats()
+            st.caption(f"Extraction cache: {stats['hits']} hits · {stats['misses']} misses")
+
+        # Documents saved earlier (by any view) are attached without uploading or parsing again
+        library_docs = library_panel.document_picker("email")
+        file_context += library.build_context(library_docs)
 
     with col2:
         st.markdown("#### 🔗 Reference URLs")
@@ -326,6 +330,19 @@ def show(navigate_to):
         )
         url_list = [url.strip() for url in reference_urls.split(",") if url.strip()]
 
+        # Fetch the pages here (cached by URL) and send their text as context;
+        # only URLs that could not be fetched are left for n8n to fetch.
+        url_context, unfetched_urls = "", []
+        if url_list:
+            with st.spinner("Fetching reference URLs..."):
+                url_context, unfetched_urls, url_results = url_fetch.build_url_context(url_list)
+            cached = sum(result["source"] in (url_fetch.FRESH, url_fetch.REVALIDATED) for result in url_results)
+            fetched = sum(1 for result in url_results if result["text"])
+            st.caption(f"Reference pages: {fetched}/{len(url_results)} read · {cached} from cache")
+            for result in url_results:
+                if not result["text"]:
+                    st.warning(f"Could not read {result['url']}: {result['error'] or 'no text found'}")
+
 
     st.markdown("### ✍️ Query & Instructions")
     query = st.text_area("Email Topic", key="email_topic", height=100)
@@ -335,56 +352,183 @@ def show(navigate_to):
     # --- BULK GENERATION LOGIC ---
     if uploaded_file and st.session_state.leads_df is None:
         try:
-            df = pd.read_csv(uploaded_file)
+            with st.spinner("Reading leads..."):
+                df, rejected, rejected_count = leads.read_leads(uploaded_file)
             st.session_state.leads_df = df
-            st.success("CSV Loaded! Ready to generate.")
+            st.session_state.lead_list_id = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+            st.session_state.lead_index = leads.SearchIndex(df)
+            st.session_state.lead_rejections = (rejected, rejected_count) if rejected_count else None
+            st.success(f"{len(df):,} leads loaded! Ready to generate.")
+        except ValueError as e:
+            st.error(f"Error reading leads: {e}")
         except Exception as e:
-            st.error(f"Error reading CSV: {e}")
+            st.error(f"Error reading file: {e}")
+
+    if st.session_state.lead_rejections:
+        rejected, rejected_count = st.session_state.lead_rejections
+        with st.expander(f"⚠️ {rejected_count:,} rows skipped (missing, invalid or duplicate email)"):
+            if rejected_count > len(rejected):
+                st.caption(f"Showing the first {len(rejected):,}.")
+            st.dataframe(rejected, use_container_width=True, hide_index=True)
+            st.download_button(
+                "⬇️ Download skipped rows",
+                rejected.to_csv(index=False),
+                file_name="skipped_leads.csv",
+                mime="text/csv",
+            )
 
     if st.session_state.leads_df is not None:
         df = st.session_state.leads_df
+
+        # Only the reference passages relevant to the topic are sent (within the budget)
+        reference_context, context_report = context_select.select_context(
+            file_context + url_context, query, context_budget
+        )
+        if context_report["original_chars"]:
+            st.caption(context_select.describe(context_report))
         
         common_params = {
             "query": query,
             "tone": tone,
             "word_limit": word_limit,
             "cta_choice": cta_choice,
-            "reference_urls": url_list,
-            "reference_file_content": file_context 
+            "reference_urls": unfetched_urls,
+            "reference_file_content": reference_context
         }
 
-        if "Generated Email" not in df.columns:
-            if st.button("🚀 Generate Email", type="primary", use_container_width=True):
-                if not query:
-                    st.warning("Please enter an Email Topic before generating.")
-                else:
-                    with st.spinner("Generating emails... this may take a moment"):
-                        st.session_state.leads_df = generate_bulk_emails(df, common_params)
-                    st.rerun()
+        if not leads.has_emails(df):
+            # Same lead list + same settings = same saved rows, so an interrupted run can resume.
+            # The submitted job itself is tracked by its id in session state, since editing the
+            # settings (or widgets reset by leaving the page) changes the content hash.
+            mode = "template" if template_mode else "per_lead"
+            job_id = job_store.job_id(df, result_cache.payload_key(GENERATE_WEBHOOK_URL, {**common_params, "mode": mode}))
+            job = jobs.get(st.session_state.generation_job_id) if st.session_state.generation_job_id else None
+
+            if job is not None and job.status == jobs.DONE:
+                st.session_state.leads_df, st.session_state.generation_report = job.result
+                jobs.forget(job.id)
+                st.session_state.generation_job_id = None
+                st.rerun()
+
+            if job is not None and job.status in jobs.ACTIVE_STATUSES:
+                job_status_panel(job.id, "generated", GENERATE_WEBHOOK_URL)
+            else:
+                if job is not None and job.status == jobs.CANCELLED:
+                    st.warning("Generation cancelled. Rows finished so far are saved.")
+                elif job is not None and job.status == jobs.FAILED:
+                    st.error(f"Generation failed: {job.error}")
+
+                saved = job_store.progress(job_id)
+                resuming = bool(saved and saved[0])
+                if resuming:
+                    st.info(
+                        f"Found a saved run for this lead list and settings: {saved[0]}/{saved[1]} emails "
+                        "already generated. Generating will pick up where it stopped."
+                    )
+                    if st.button("🗑️ Discard saved run"):
+                        job_store.delete_job(job_id)
+                        st.rerun()
+
+                breaker_warning = breaker.describe(GENERATE_WEBHOOK_URL)
+                if breaker_warning:
+                    st.warning(breaker_warning)
+                label = "▶️ Resume Generation" if resuming else "🚀 Generate Email"
+                if st.button(label, type="primary", use_container_width=True):
+                    if not query:
+                        st.warning("Please enter an Email Topic before generating.")
+                    else:
+                        # Runs on a background worker; this page only polls its status.
+                        if template_mode:
+                            run = lambda job: bulk_email.generate_template_emails(
+                                df, common_params, GENERATE_WEBHOOK_URL, max_workers, job_id,
+                                use_context_handles=USE_CONTEXT_HANDLES,
+                                on_progress=job.report,
+                                cancel_event=job.cancel_event,
+                            )
+                        else:
+                            run = lambda job: (bulk_email.generate_bulk_emails(
+                                df, common_params, GENERATE_WEBHOOK_URL, max_workers, batch_size, job_id,
+                                use_context_handles=USE_CONTEXT_HANDLES,
+                                on_progress=job.report,
+                                cancel_event=job.cancel_event,
+                            ), None)
+                        jobs.submit(job_id, "Email generation", len(df), run)
+                        st.session_state.generation_job_id = job_id
+                        st.rerun()
                 
         else:
+            report = st.session_state.generation_report
+            if report and report["leads"]:
+                saved_calls = 1 - report["webhook_calls"] / report["per_row_calls"]
+                speedup = report["per_row_elapsed"] / report["elapsed"] if report["elapsed"] else 0
+                st.info(
+                    f"🧩 Template mode: {report['webhook_calls']:,} webhook calls for {report['leads']:,} leads "
+                    f"({saved_calls:.0%} fewer than one per lead) · {report['elapsed']:.1f}s vs "
+                    f"~{report['per_row_elapsed']:.1f}s estimated per lead ({speedup:.0f}× faster)"
+                )
+
             st.subheader("Review Queue")
-            new_df = df.drop(columns=['Generated Email'], errors='ignore')
-            selection = st.dataframe(
-                new_df,
-                use_container_width=True,
-                hide_index=True,
-                on_select="rerun", 
-                selection_mode="single-row",
-                column_config={
-                    "first_name": st.column_config.TextColumn("First Name"),
-                    "last_name": st.column_config.TextColumn("Last Name"),
-                    "org_name": st.column_config.TextColumn("Organization"),
-                    "email": st.column_config.TextColumn("Email"),
-                    "Status": st.column_config.SelectboxColumn(
-                        "Status", 
-                        options=["Draft", "Refined", "Approved", "Sent", "Failed"],
-                        width="small"
+            review_queue(common_params)
+
+            # --- SEND STAGE ---
+            st.subheader("📤 Send Emails")
+            send_job = jobs.get(st.session_state.send_job_id) if st.session_state.send_job_id else None
+
+            if send_job is not None and send_job.status in jobs.ACTIVE_STATUSES:
+                job_status_panel(send_job.id, "sent", SEND_WEBHOOK_URL)
+            else:
+                if send_job is not None:
+                    if send_job.status == jobs.DONE:
+                        apply_send_results(send_job.result)
+                        st.session_state.send_summary = send_job.result
+                    elif send_job.status == jobs.CANCELLED:
+                        if send_job.result:
+                            apply_send_results(send_job.result)
+                            st.session_state.send_summary = send_job.result
+                        st.warning("Sending cancelled. Emails already delivered are logged and will be skipped next time.")
+                    elif send_job.status == jobs.FAILED:
+                        st.error(f"Sending failed: {send_job.error}")
+                    jobs.forget(send_job.id)
+                    st.session_state.send_job_id = None
+
+                summary = st.session_state.send_summary
+                if summary:
+                    st.success(
+                        f"Sent {summary['sent']} · Failed {summary['failed']} · "
+                        f"{summary['elapsed']:.1f}s ({summary['rate']:.1f} emails/s)"
                     )
-                }
-            )
-
-            if selection.selection.rows:
-                selected_index = selection.selection.rows[0]
-                selected_row = df.iloc[selected_index]
-                email_editor_dialog(selected_index, selected_row, common_params)
\ No newline at end of file
+                    failures = [
+                        {"email": df.at[index, 'email'], "reason": error}
+                        for index, (status, error) in summary["results"].items()
+                        if status == leads.FAILED
+                    ]
+                    if failures:
+                        st.dataframe(failures, use_container_width=True, hide_index=True)
+
+                send_col1, send_col2, send_col3 = st.columns(3)
+                with send_col1:
+                    per_minute = st.number_input("Emails per minute", 1, 600, 60, key="email_send_rate")
+                with send_col2:
+                    send_workers = st.number_input("Parallel sends", 1, 16, 4, key="email_send_workers")
+                with send_col3:
+                    include_drafts = st.checkbox("Also send Draft / Refined", value=False, key="email_send_drafts")
+
+                statuses = [leads.APPROVED, leads.FAILED] + ([leads.DRAFT, leads.REFINED] if include_drafts else [])
+                messages = sendable_messages(df, statuses)
+                if st.button(f"📤 Send {len(messages)} Emails", disabled=not messages or not SEND_WEBHOOK_URL):
+                    send_job_id = f"send-{time.time_ns()}"
+                    send_scope = st.session_state.lead_list_id or ""
+                    jobs.submit(
+                        send_job_id, "Email sending", len(messages),
+                        lambda job: email_send.send_emails(
+                            SEND_WEBHOOK_URL, messages, per_minute, send_workers,
+                            on_progress=job.report,
+                            cancel_event=job.cancel_event,
+                            scope=send_scope,
+                        )
+                    )
+                    st.session_state.send_job_id = send_job_id
+                    st.session_state.send_summary = None
+                    st.rerun()
+                if not SEND_WEBHOOK_URL:
+                    st.caption("Set `email_send_api` under `[n8n]` in secrets to enable sending.")
\ No newline at end of file
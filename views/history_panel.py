@@ -0,0 +1,47 @@
+import streamlit as st
+from datetime import datetime
+from services import history
+
+
+def _label(entry):
+    when = datetime.fromtimestamp(entry["created"]).strftime("%d %b %H:%M")
+    action = "refined" if entry["action"] == "refine" else "generated"
+    return f"#{entry['id']} · {entry['title'][:60]} · {action} {when}"
+
+
+def history_panel(kind):
+    """Search and reopen past outputs of `kind`; returns the full entry when Open is pressed."""
+    with st.expander("🕘 History"):
+        query = st.text_input(
+            "Search past outputs",
+            placeholder="Words from the topic, text or refine instruction",
+            key=f"{kind}_history_search"
+        )
+        entries = history.search(kind, query)
+        if not entries:
+            st.caption("No matching outputs." if query.strip() else "Generated outputs are saved here.")
+            return None
+
+        labels = {entry["id"]: _label(entry) for entry in entries}
+        if st.session_state.get(f"{kind}_history_pick") not in labels:
+            # The previous pick was deleted or is not in these results
+            st.session_state.pop(f"{kind}_history_pick", None)
+        chosen = st.selectbox("Output", list(labels), format_func=labels.get, key=f"{kind}_history_pick")
+        steps = []
+        for step in history.lineage(chosen):
+            text = f"“{step['instruction']}”" if step["action"] == "refine" else "generated"
+            if step["seconds"] is not None:
+                text += f" ({step['seconds']:.1f}s)"
+            steps.append(text)
+        st.caption(" → ".join(steps))
+        st.caption(next(entry["snippet"] for entry in entries if entry["id"] == chosen))
+
+        open_col, delete_col = st.columns(2)
+        with open_col:
+            if st.button("📂 Open", use_container_width=True, key=f"{kind}_history_open"):
+                return history.get(chosen)
+        with delete_col:
+            if st.button("🗑️ Delete", use_container_width=True, key=f"{kind}_history_delete"):
+                history.remove(chosen)
+                st.rerun()
+    return None
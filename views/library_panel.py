@@ -0,0 +1,32 @@
+import streamlit as st
+from services import library
+
+
+def document_picker(kind):
+    """Searchable library picker shared by the generator views; returns the chosen document hashes."""
+    selected_key = f"{kind}_library_docs"
+    with st.expander("📚 Document Library"):
+        query = st.text_input(
+            "Search the library",
+            placeholder="Words from a document or its file name",
+            key=f"{kind}_library_search"
+        )
+        results = library.search(query) if query.strip() else library.recent()
+        # Keep earlier picks selectable while the search results change
+        options = list(dict.fromkeys([*st.session_state.get(selected_key, []), *(doc["sha256"] for doc in results)]))
+        names = library.names(options)
+        if selected_key in st.session_state:
+            # Drop picks that were evicted or removed since the last run
+            st.session_state[selected_key] = [sha256 for sha256 in st.session_state[selected_key] if sha256 in names]
+        chosen = st.multiselect(
+            "Attach as reference context",
+            [sha256 for sha256 in options if sha256 in names],
+            format_func=lambda sha256: names[sha256],
+            key=selected_key
+        )
+        stats = library.stats()
+        st.caption(
+            f"{stats['documents']:,} documents · {stats['bytes'] / 1024 ** 2:.1f} of "
+            f"{stats['max_bytes'] / 1024 ** 2:.0f} MB · uploads are saved here automatically"
+        )
+    return chosen
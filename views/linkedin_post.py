@@ -1,5 +1,8 @@
 import streamlit as st
-import requests
+import json
+import time
+from services import breaker, history, streaming, variants, webhook
+from views import history_panel
 
 def show(navigate_to):
     # Init services
@@ -11,6 +14,82 @@ def show(navigate_to):
     with col_title:
         st.title("💼 LinkedIn Post Creator")
 
+    # --- CONFIGURATION ---
+    # Falls back to the original workflow URLs when not set under [n8n] in secrets.
+    N8N_WEBHOOK_URL = st.secrets.get("n8n", {}).get(
+        "linkedin_api", "https://n8n-app.app.n8n.cloud/webhook/8b60934c-0ead-43c0-4da0-eb3f1f5b1881"
+    )
+    IMAGE_N8N_URL = st.secrets.get("n8n", {}).get(
+        "image_api", "http://localhost:5678/webhook/8b91c2ce-255e-4582-a7f6-4ffb06465fdf"
+    )
+
+    TONE_OPTIONS = ["Professional", "Conversational", "Inspirational", "Authoritative", "Witty", "Storytelling"]
+    AUDIENCE_OPTIONS = ["Senior Management", "Middle Management", "Junior / Entry Level Staff"]
+    CTA_OPTIONS = [
+        "Talk to our experts", "Learn more about our solutions", "Book a free consultation",
+        "Contact us today", "Download the full guide", "Request a demo",
+    ]
+
+    if "linkedin_variants" not in st.session_state:
+        st.session_state.linkedin_variants = []  # Results of the last multi-variant run
+
+    def post_data(data):
+        # n8n may wrap the item in a list and/or send "output" as a JSON string
+        if isinstance(data, list):
+            data = data[0] if data else {}
+        if isinstance(data, dict) and isinstance(data.get("output"), str):
+            try:
+                data = {**data, "output": json.loads(data["output"])}
+            except ValueError:
+                data = {**data, "output": {"post content": data["output"]}}
+        return data
+
+    def save_post(data, params, seconds, label=""):
+        # Kept in the history so the post can be reopened without another call
+        inner = data.get("output") if isinstance(data, dict) else None
+        inner = inner if isinstance(inner, dict) else {}
+        title = inner.get("post title") or params["text"]
+        return history.record(
+            history.LINKEDIN, str(inner.get("post content") or data), params,
+            title=f"{title} ({label})" if label else title,
+            seconds=seconds,
+            fields=data,
+        )
+
+    def fetch_post(payload):
+        # Runs on a worker thread, so no Streamlit calls in here
+        response = webhook.post(N8N_WEBHOOK_URL, payload, action="generate")
+        response.raise_for_status()
+        return post_data(response.json())
+
+    def generate_variants(payload, options):
+        # Every combination is requested at once and drawn as soon as it comes back
+        combos = variants.combinations(payload, options)
+        with right:
+            columns = st.columns(2)
+        slots = []
+        for position, (label, _) in enumerate(combos):
+            with columns[position % 2].container(border=True):
+                st.markdown(f"**{label}**")
+                slots.append(st.empty())
+                slots[-1].caption("⏳ Generating...")
+
+        started = time.perf_counter()
+        results = [None] * len(combos)
+        for position, data, error, seconds in variants.run(fetch_post, [params for _, params in combos]):
+            label, params = combos[position]
+            if error is not None:
+                slots[position].error(str(error))
+                results[position] = {"label": label, "data": {"error": str(error)}, "seconds": seconds}
+                continue
+            save_post(data, params, seconds, label)
+            inner = data.get("output") if isinstance(data, dict) else None
+            inner = inner if isinstance(inner, dict) else {"post content": str(data)}
+            slots[position].markdown(f"**{inner.get('post title', '')}**\n\n{inner.get('post content', '')}")
+            results[position] = {"label": label, "data": data, "seconds": seconds}
+        st.session_state.linkedin_variants = results
+        st.session_state.linkedin_variants_elapsed = time.perf_counter() - started
+
     left, right = st.columns([1, 2])
     # ---------------- LEFT SIDE ----------------
     with left:
@@ -19,23 +98,97 @@ def show(navigate_to):
             "Enter the topic for your LinkedIn post",
             height=400
         )
+        stream_output = st.checkbox("Show text as it is written", value=True, key="linkedin_stream_output")
+        variant_mode = st.checkbox(
+            "Generate several variants at once",
+            value=False,
+            help="Sends one request per tone / audience / CTA combination in parallel and shows each as it arrives.",
+            key="linkedin_variant_mode",
+        )
+        variant_options = {}
+        if variant_mode:
+            variant_options = {
+                "tone": st.multiselect(
+                    "Tones", TONE_OPTIONS, default=["Professional", "Conversational"], key="linkedin_variant_tones"
+                ),
+                "target_audience": st.multiselect("Audiences", AUDIENCE_OPTIONS, key="linkedin_variant_audiences"),
+                "cta_choice": st.multiselect("CTAs", CTA_OPTIONS, key="linkedin_variant_ctas"),
+            }
+            combination_count = variants.count(variant_options)
+            if combination_count > variants.MAX_VARIANTS:
+                st.caption(f"{variants.MAX_VARIANTS} variants (first {variants.MAX_VARIANTS} of {combination_count} combinations)")
+            else:
+                st.caption(f"{combination_count} variant{'s' if combination_count != 1 else ''}")
+        breaker_warning = breaker.describe(N8N_WEBHOOK_URL)
+        if breaker_warning:
+            st.warning(breaker_warning)
         if st.button("Create LinkedIn Post"):
             if not user_input.strip():
                 st.warning("Please enter a topic.")
+            elif variant_mode:
+                st.session_state.pop("output", None)
+                generate_variants({"text": user_input}, variant_options)
+                st.rerun()
             else:
+                st.session_state.linkedin_variants = []
+                started = time.perf_counter()
                 try:
-                    # BLOG GENERATOR WORKFLOW (already working)
-                    N8N_WEBHOOK_URL = "https://n8n-app.app.n8n.cloud/webhook/8b60934c-0ead-43c0-4da0-eb3f1f5b1881"
                     payload = {"text": user_input}
-                    response = requests.post(N8N_WEBHOOK_URL, json=payload)
-                    data = response.json()
+                    if stream_output:
+                        # Draw the post into the output column while it streams, then
+                        # clear it so the normal output section below takes over.
+                        stream_slot = right.empty()
+                        text = streaming.render_markdown_stream(
+                            webhook.stream_text(N8N_WEBHOOK_URL, payload, action="generate"),
+                            stream_slot.container(border=True)
+                        )
+                        stream_slot.empty()
+                        try:
+                            data = json.loads(text)
+                        except ValueError:
+                            data = {"output": {"post content": text}}
+                        if isinstance(data, dict) and "output" not in data:
+                            # A string-encoded "output" arrives already unwrapped
+                            data = {"output": data}
+                    else:
+                        response = webhook.post(N8N_WEBHOOK_URL, payload, action="generate")
+                        data = post_data(response.json())
                     st.session_state["output"] = data
+                    save_post(data, payload, time.perf_counter() - started)
                 except Exception as e:
                     st.session_state["output"] = {"error": str(e)}
 
     # ---------------- RIGHT SIDE ----------------
     with right:
         st.header("Generated Output")
+        reopened = history_panel.history_panel(history.LINKEDIN)
+        if reopened:
+            st.session_state["output"] = reopened["fields"] or {"output": {"post content": reopened["content"]}}
+            st.session_state.linkedin_variants = []
+            st.rerun()
+        if st.session_state.linkedin_variants and "output" not in st.session_state:
+            finished = [variant for variant in st.session_state.linkedin_variants if "error" not in variant["data"]]
+            st.markdown(f"### 🔀 {len(finished)} of {len(st.session_state.linkedin_variants)} Variants")
+            st.caption(
+                f"{st.session_state.linkedin_variants_elapsed:.1f}s in parallel · "
+                f"{sum(variant['seconds'] for variant in st.session_state.linkedin_variants):.1f}s one after another"
+            )
+            tabs = st.tabs([variant["label"] for variant in st.session_state.linkedin_variants])
+            for position, (tab, variant) in enumerate(zip(tabs, st.session_state.linkedin_variants)):
+                with tab:
+                    if "error" in variant["data"]:
+                        st.error(variant["data"]["error"])
+                        continue
+                    if st.button("✅ Use this variant", key=f"linkedin_use_variant_{position}"):
+                        st.session_state["output"] = variant["data"]
+                        st.session_state.linkedin_variants = []
+                        st.rerun()
+                    inner = variant["data"].get("output") if isinstance(variant["data"], dict) else None
+                    inner = inner if isinstance(inner, dict) else {"post content": str(variant["data"])}
+                    st.caption(f"{variant['seconds']:.1f}s")
+                    with st.container(border=True):
+                        st.subheader(inner.get("post title", ""))
+                        st.write(inner.get("post content", ""))
         if "output" in st.session_state:
             data = st.session_state["output"]
             if "error" in data:
@@ -64,9 +217,6 @@ def show(navigate_to):
                     st.success("Great! You liked the blog 🎉")
                     if st.button("Create Image"):
                         st.info("Generating Image from n8n...")
-                        # 👉 YOUR IMAGE GENERATOR WEBHOOK URL
-                        # Note: Using the local URL from your workflow JSON for local testing
-                        IMAGE_N8N_URL = "http://localhost:5678/webhook/8b91c2ce-255e-4582-a7f6-4ffb06465fdf"
                         try:
                             payload = {
                                 "prompt": heading,
@@ -74,15 +224,15 @@ def show(navigate_to):
                                 "hashtags": hashtags,
                                 "image_description": image_description
                             } # sending blog title
-                            img_response = requests.post(IMAGE_N8N_URL, json=payload)
+                            img_response = webhook.post(IMAGE_N8N_URL, payload, action="image")
                             img_data = img_response.json()
                             # ----------------------------------------------------
                             # 👇 THE FIX: Correctly access the nested 'image' key
                             # ----------------------------------------------------
                             if isinstance(img_data, list) and len(img_data) > 0:
                                 # img_data[0] is the top-level dict (e.g., {"success": true, "post": {...}})
-                                post_data = img_data[0].get("post", {})
-                                image_base64 = post_data.get("image", "")
+                                image_post = img_data[0].get("post", {})
+                                image_base64 = image_post.get("image", "")
                             else:
                                 image_base64 = ""
                             # ----------------------------------------------------
@@ -97,5 +247,5 @@ def show(navigate_to):
                 # If NO
                 elif user_feedback.lower().strip() == "no":
                     st.warning("No problem! Try another topic 😊")
-        else:
+        elif not st.session_state.linkedin_variants:
             st.info("Output will appear here after generating.")
\ No newline at end of file
@@ -0,0 +1,142 @@
+import streamlit as st
+from services import breaker, extraction, history, library, metrics, result_cache, url_fetch
+
+
+def show(navigate_to):
+
+
+    col_nav, _ = st.columns([1, 5])
+    with col_nav:
+        if st.button("← Home"):
+            navigate_to("Home")
+
+    st.title("📈 Ops")
+    st.caption("n8n webhook calls made by this app process since it started.")
+
+    @st.fragment(run_every=5.0)
+    def webhook_panel():
+        rows = metrics.snapshot()
+        if not rows:
+            st.info("No webhook calls recorded yet.")
+            return
+
+        calls = sum(row["calls"] for row in rows)
+        errors = sum(row["errors"] for row in rows)
+        retries = sum(row["retries"] for row in rows)
+        hits = sum(row["cache_hits"] for row in rows)
+        lookups = hits + sum(row["cache_misses"] for row in rows)
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Webhook calls", f"{calls:,}")
+        col2.metric("Errors", f"{errors:,}", f"{errors / calls:.1%}" if calls else None, delta_color="inverse")
+        col3.metric("Retries", f"{retries:,}")
+        col4.metric("Cache hit rate", f"{hits / lookups:.0%}" if lookups else "–")
+
+        def ms(seconds):
+            return None if seconds is None else round(seconds * 1000)
+
+        st.dataframe(
+            [
+                {
+                    "Endpoint": row["endpoint"],
+                    "Action": row["action"],
+                    "Calls": row["calls"],
+                    "Errors": row["errors"],
+                    "p50 (ms)": ms(row["p50"]),
+                    "p95 (ms)": ms(row["p95"]),
+                    "p99 (ms)": ms(row["p99"]),
+                    "Avg request (KB)": round(row["avg_request_bytes"] / 1024, 1),
+                    "Avg response (KB)": round(row["avg_response_bytes"] / 1024, 1),
+                    "Retries": row["retries"],
+                    "Hedges (won)": f"{row['hedges']} ({row['hedge_wins']})",
+                    "Cache hits": row["cache_hits"],
+                    "Statuses": ", ".join(f"{status}: {count}" for status, count in sorted(row["statuses"].items())),
+                }
+                for row in rows
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+        st.markdown("**Circuit breakers**")
+        st.caption(
+            f"An endpoint's breaker opens after {breaker.FAILURE_THRESHOLD} failed calls in a row; calls then fail "
+            f"fast until a single probe call succeeds ({breaker.OPEN_SECONDS}s cool-down, doubled per failed probe)."
+        )
+        icons = {breaker.CLOSED: "🟢 closed", breaker.HALF_OPEN: "🟡 half-open", breaker.OPEN: "🔴 open"}
+        st.dataframe(
+            [
+                {
+                    "Endpoint": row["endpoint"],
+                    "State": icons[row["state"]],
+                    "Failures in a row": row["failures"],
+                    "Times opened": row["trips"],
+                    "Calls failed fast": row["rejected"],
+                    "Probe in (s)": None if row["retry_in"] is None else round(row["retry_in"]),
+                    "Last error": row["last_error"] or "",
+                }
+                for row in breaker.states()
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+        if st.button("🔁 Close all breakers"):
+            breaker.reset()
+            st.rerun()
+
+    webhook_panel()
+
+    st.subheader("Prometheus export")
+    st.caption(
+        f"Written to `{metrics.METRICS_PATH}` every {metrics.EXPORT_INTERVAL}s while calls are made "
+        "(node_exporter textfile-collector format)."
+    )
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button(
+            "⬇️ Download metrics", metrics.prometheus_text(),
+            file_name="webhook_metrics.prom", mime="text/plain", use_container_width=True
+        )
+    with col2:
+        if st.button("💾 Write export file now", use_container_width=True):
+            st.toast(f"Wrote {metrics.export()}")
+    with col3:
+        if st.button("🧹 Reset counters", use_container_width=True):
+            metrics.reset()
+            st.rerun()
+
+    st.subheader("Caches")
+    extraction_stats = extraction.cache_stats()
+    result_stats = result_cache.stats()
+    page_stats = url_fetch.stats()
+    library_stats = library.stats()
+    history_stats = history.stats()
+    st.write(
+        f"**Extraction cache:** {extraction_stats['hits']} hits · {extraction_stats['misses']} misses · "
+        f"{extraction_stats['entries']} files · {extraction_stats['bytes'] / 1024 ** 2:.1f} MB  \n"
+        f"**Response cache:** {result_stats['entries']} entries · {result_stats['bytes'] / 1024 ** 2:.1f} MB  \n"
+        f"**Reference page cache:** {page_stats['entries']} pages · {page_stats['bytes'] / 1024 ** 2:.1f} MB  \n"
+        f"**Document library:** {library_stats['documents']} of {library_stats['max_documents']} documents · "
+        f"{library_stats['bytes'] / 1024 ** 2:.1f} of {library_stats['max_bytes'] / 1024 ** 2:.0f} MB  \n"
+        f"**Generation history:** {history_stats['outputs']} outputs · {history_stats['bytes'] / 1024 ** 2:.1f} MB · "
+        f"{'full-text' if history_stats['full_text_search'] else 'LIKE'} search"
+    )
+
+    st.subheader("Document library")
+    st.caption(
+        "Least recently used documents are evicted past the limits "
+        "(MARKETING_LIBRARY_MAX_MB / MARKETING_LIBRARY_MAX_DOCS)."
+    )
+    documents = library.recent(limit=library_stats["documents"] or 1)
+    if documents:
+        names = {doc["sha256"]: f"{doc['name']} ({doc['size'] / 1024:,.0f} KB)" for doc in documents}
+        if "ops_library_remove" in st.session_state:
+            st.session_state.ops_library_remove = [
+                sha256 for sha256 in st.session_state.ops_library_remove if sha256 in names
+            ]
+        to_remove = st.multiselect("Documents to remove", list(names), format_func=names.get, key="ops_library_remove")
+        if st.button("🗑️ Remove from library", disabled=not to_remove):
+            for sha256 in to_remove:
+                library.remove(sha256)
+            st.rerun()
+    else:
+        st.info("The library is empty. Documents uploaded in the generators are saved here.")
@@ -1,10 +1,8 @@
 import streamlit as st
-import requests
+from services import breaker, context_handles, context_select, extraction, history, library, metrics, result_cache, streaming, url_fetch, webhook
+from views import history_panel, library_panel
 import json
-from PyPDF2 import PdfReader  # type: ignore
-from docx import Document as DocxDocument  # type: ignore
-from pptx import Presentation  # type: ignore
-import markdown
+import time
 
 def show(navigate_to):
 
@@ -21,6 +19,8 @@ def show(navigate_to):
     # REPLACE THIS WITH YOUR ACTUAL N8N WEBHOOK URL
     # N8N_WEBHOOK_URL = "http://localhost:5678/webhook/Video-script"
     N8N_WEBHOOK_URL = st.secrets.get("n8n").get("video_script_api")
+    # Send large context once and refer to it by hash afterwards (needs handle support in n8n)
+    USE_CONTEXT_HANDLES = st.secrets.get("n8n").get("context_handles", False)
 
     # Initialize Session State
     if "video_output" not in st.session_state:
@@ -29,31 +29,19 @@ def show(navigate_to):
     if "last_params" not in st.session_state:
         st.session_state.last_params = {}  # Stores context for refinement
 
-    # -----------------------------------------------------------------------------
-    # HELPER FUNCTIONS
-    # -----------------------------------------------------------------------------
-    def extract_text_from_file(file):
-        text = ""
-        name = file.name.lower()
-        try:
-            if name.endswith(".txt"):
-                text = file.read().decode("utf-8", errors="ignore")
-            elif name.endswith(".pdf"):
-                pdf = PdfReader(file)
-                for page in pdf.pages:
-                    text += page.extract_text() or ""
-            elif name.endswith(".docx"):
-                doc = DocxDocument(file)
-                text = "\n".join([p.text for p in doc.paragraphs])
-            elif name.endswith(".pptx"):
-                ppt = Presentation(file)
-                for slide in ppt.slides:
-                    for shape in slide.shapes:
-                        if hasattr(shape, "text"):
-                            text += shape.text + "\n"
-        except Exception:
-            pass
-        return text.strip()
+    if "video_history_id" not in st.session_state:
+        st.session_state.video_history_id = None  # History entry of the output on screen
+
+    def save_output(text, action, seconds, instruction=""):
+        # Every n8n output is kept in the history so it can be reopened without another call
+        st.session_state.video_history_id = history.record(
+            history.VIDEO, text, st.session_state.last_params,
+            title=st.session_state.last_params.get("query", ""),
+            action=action,
+            parent_id=st.session_state.video_history_id if action == "refine" else None,
+            instruction=instruction,
+            seconds=seconds,
+        )
 
     # -----------------------------------------------------------------------------
     # SIDEBAR: CONTENT CONFIGURATION
@@ -94,6 +82,33 @@ def show(navigate_to):
         cta_choice = st.selectbox("📢 Call-to-Action (CTA)", cta_options, key="video_cta_choice")
         
 
+        st.subheader("⚡ Output Streaming")
+        stream_output = st.checkbox(
+            "Show text as it is written",
+            value=True,
+            help="Renders the output progressively when the n8n webhook streams it; otherwise waits for the full response.",
+            key="video_stream_output",
+        )
+
+        st.subheader("♻️ Response Cache")
+        use_cache = st.checkbox(
+            "Reuse results for identical requests",
+            value=False,
+            help="Answers a repeated Generate with the same inputs from a local cache instead of calling n8n again.",
+            key="video_use_cache",
+        )
+
+        st.subheader("📚 Reference Context")
+        context_budget_kb = st.select_slider(
+            "Context budget (KB)",
+            options=["All", 8, 16, 24, 48, 96],
+            value=24,
+            help="Sends only the reference passages most relevant to the topic, up to this size. "
+                 "'All' sends every document (repeated boilerplate is still dropped).",
+            key="video_context_budget",
+        )
+        context_budget = 0 if context_budget_kb == "All" else context_budget_kb * 1024
+
     # -----------------------------------------------------------------------------
     # TOP SECTION: FILES & URLS
     # -----------------------------------------------------------------------------
@@ -114,9 +129,20 @@ def show(navigate_to):
         # Process files immediately to be ready for generation
         file_context = ""
         if uploaded_files:
-            for f in uploaded_files:
-                extracted_text = extract_text_from_file(f) 
-                file_context += f"--- Content from {f.name} ---\n{extracted_text}\n\n"
+            extraction_progress = st.progress(0.0)
+            file_context = library.build_file_context(
+                uploaded_files,
+                on_progress=lambda name, fraction: extraction_progress.progress(
+                    fraction, text=f"Extracting {name}..."
+                )
+            )
+            extraction_progress.empty()
+            stats = extraction.cache_stats()
+            st.caption(f"Extraction cache: {stats['hits']} hits · {stats['misses']} misses")
+
+        # Documents saved earlier (by any view) are attached without uploading or parsing again
+        library_docs = library_panel.document_picker("video")
+        file_context += library.build_context(library_docs)
 
     with col2:
         st.markdown("#### 🔗 Reference URLs")
@@ -129,6 +155,19 @@ def show(navigate_to):
         )
         url_list = [url.strip() for url in reference_urls.split(",") if url.strip()]
 
+        # Fetch the pages here (cached by URL) and send their text as context;
+        # only URLs that could not be fetched are left for n8n to fetch.
+        url_context, unfetched_urls = "", []
+        if url_list:
+            with st.spinner("Fetching reference URLs..."):
+                url_context, unfetched_urls, url_results = url_fetch.build_url_context(url_list)
+            cached = sum(result["source"] in (url_fetch.FRESH, url_fetch.REVALIDATED) for result in url_results)
+            fetched = sum(1 for result in url_results if result["text"])
+            st.caption(f"Reference pages: {fetched}/{len(url_results)} read · {cached} from cache")
+            for result in url_results:
+                if not result["text"]:
+                    st.warning(f"Could not read {result['url']}: {result['error'] or 'no text found'}")
+
     st.divider()
 
     # -----------------------------------------------------------------------------
@@ -142,7 +181,15 @@ def show(navigate_to):
         
 
         st.markdown("<br>", unsafe_allow_html=True)
+        breaker_warning = breaker.describe(N8N_WEBHOOK_URL)
+        if breaker_warning:
+            st.warning(breaker_warning)
         generate_button = st.button("Generate Video", type="primary", use_container_width=True)
+        regenerate_button = False
+        if use_cache:
+            regenerate_button = st.button("🔄 Regenerate (bypass cache)", use_container_width=True, key="video_regenerate")
+        if st.session_state.get("video_context_report"):
+            st.caption(context_select.describe(st.session_state.video_context_report))
         # -------------------------------------------------------------------------
         # REFINE SECTION (Only shows if we have output)
         # -------------------------------------------------------------------------
@@ -163,14 +210,25 @@ def show(navigate_to):
 
     with right:
         # st.markdown("### 📝 Output")
+
+        reopened = history_panel.history_panel(history.VIDEO)
+        if reopened:
+            st.session_state.video_output = reopened["content"]
+            st.session_state.last_params = reopened["params"]
+            st.session_state.video_history_id = reopened["id"]
+            st.rerun()
         
         # -------------------------------------------------------------------------
         # LOGIC: GENERATE NEW video
         # -------------------------------------------------------------------------
-        if generate_button and query:
+        if (generate_button or regenerate_button) and query:
             with st.spinner("🚀 Generating video via n8n..."):
                 
                 # 1. CAPTURE CONTEXT
+                # Only the reference passages relevant to the topic are sent (within the budget)
+                reference_context, st.session_state.video_context_report = context_select.select_context(
+                    file_context + url_context, " ".join([query, industry]), context_budget
+                )
                 # We save all inputs to session_state so we can re-send them during refinement
                 st.session_state.last_params = {
                     "query": query,
@@ -179,8 +237,8 @@ def show(navigate_to):
                     "industry": industry,
                     "time_limit": time_limit,
                     "cta_choice": cta_choice,
-                    "reference_urls": url_list,
-                    "reference_file_content": file_context  # CRITICAL: Keeps file text in memory
+                    "reference_urls": unfetched_urls,
+                    "reference_file_content": reference_context  # CRITICAL: Keeps file text in memory
                 }
 
                 # 2. PREPARE PAYLOAD
@@ -189,22 +247,49 @@ def show(navigate_to):
                     **st.session_state.last_params # Unpack all params
                 }
 
+                # 3. CHECK THE RESPONSE CACHE (opt-in)
+                cache_key = result_cache.payload_key(N8N_WEBHOOK_URL, payload)
+                cached_text = result_cache.get(cache_key) if use_cache and not regenerate_button else None
+                if use_cache:
+                    metrics.record_cache(N8N_WEBHOOK_URL, "generate", hit=cached_text is not None)
+
+                if cached_text is not None:
+                    st.session_state.video_output = cached_text
+                    st.session_state.video_history_id = None
+                    st.rerun()
+
+                started = time.perf_counter()
                 try:
-                    response = requests.post(N8N_WEBHOOK_URL, json=payload)
+                    if stream_output:
+                        result_text = streaming.render_markdown_stream(
+                            context_handles.stream_text(N8N_WEBHOOK_URL, payload, enabled=USE_CONTEXT_HANDLES),
+                            st.container(border=True)
+                        )
+                        if use_cache:
+                            result_cache.put(cache_key, result_text)
+                        st.session_state.video_output = result_text
+                        save_output(result_text, "generate", time.perf_counter() - started)
+                        st.rerun()
+
+                    response = context_handles.post(N8N_WEBHOOK_URL, payload, enabled=USE_CONTEXT_HANDLES)
                     
                     if response.status_code == 200:
                         try:
-                            data = response.json()
-                            result_text = data.get("output", data.get("text", str(data)))
+                            result_text = webhook.output_text(response.json())
                         except:
                             result_text = response.text
                             
+                        if use_cache:
+                            result_cache.put(cache_key, result_text)
                         st.session_state.video_output = result_text
+                        save_output(result_text, "generate", time.perf_counter() - started)
                         st.success("video generated successfully!")
                         st.rerun() # Rerun to show the Refine options
                     else:
                         st.error(f"Error {response.status_code}: {response.text}")
                         
+                except webhook.WebhookHTTPError as e:
+                    st.error(str(e))
                 except Exception as e:
                     st.error(f"Connection Error: {e}")
 
@@ -236,21 +321,33 @@ def show(navigate_to):
                     "time_limit": context_params.get("time_limit", 1.5)
                 }
                 
+                started = time.perf_counter()
                 try:
-                    response = requests.post(N8N_WEBHOOK_URL, json=payload)
+                    if stream_output:
+                        st.session_state.video_output = streaming.render_markdown_stream(
+                            context_handles.stream_text(N8N_WEBHOOK_URL, payload, enabled=USE_CONTEXT_HANDLES),
+                            st.container(border=True)
+                        )
+                        save_output(st.session_state.video_output, "refine", time.perf_counter() - started,
+                                    refine_instruction)
+                        st.rerun()
+
+                    response = context_handles.post(N8N_WEBHOOK_URL, payload, enabled=USE_CONTEXT_HANDLES)
                     
                     if response.status_code == 200:
                         try:
-                            data = response.json()
-                            result_text = data.get("output", data.get("text", str(data)))
+                            result_text = webhook.output_text(response.json())
                         except:
                             result_text = response.text
                             
                         st.session_state.video_output = result_text
+                        save_output(result_text, "refine", time.perf_counter() - started, refine_instruction)
                         st.success("Refinement applied!")
                         st.rerun()
                     else:
                         st.error("Failed to refine content.")
+                except webhook.WebhookHTTPError:
+                    st.error("Failed to refine content.")
                 except Exception as e:
                     st.error(f"Error: {e}")
 